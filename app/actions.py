@@ -1,30 +1,80 @@
 # Модуль, описывающий пользовательские функции (действия пользователя)
 
 
+import shutil
+import sys
+from typing import Iterable, Iterator
+
 import colorama
 
 from extra_inputs import (
     input_title, input_category, input_due_date, 
-    input_priority, input_task_id
+    input_priority, input_task_id, input_days
 )
 from managers import TaskManager
 from models import Task, Status
-from table import fill_table
+from stats import stats
+from pager import Pager, browse, iter_table
 
 
-def show_tasks(manager: TaskManager) -> None:
-    """Выводит на экран таблицу всех задач
+def task_rows(tasks: Iterable[dict]) -> list[list]:
+    """Преобразует задачи в строки таблицы
 
     Args:
-        manager (TaskManager): объект менеджера задач
+        tasks (Iterable[dict]): задачи
+
+    Returns:
+        list[list]: строки таблицы
     """
-    data = [
+    return [
         [task['id'], task['status'], task['title'], task['description'],
         task['category'], task['due_date'], task['priority']]
-        for task in manager.tasks
+        for task in tasks
     ]
-    table = fill_table(data)
-    print(table)
+
+
+def iter_task_rows(tasks: Iterable[dict]) -> Iterator[list]:
+    """Преобразует задачи в строки таблицы по одной
+
+    Args:
+        tasks (Iterable[dict]): задачи
+
+    Yields:
+        list: строка таблицы
+    """
+    for task in tasks:
+        yield [
+            task['id'], task['status'], task['title'], task['description'],
+            task['category'], task['due_date'], task['priority']
+        ]
+
+
+def print_tasks(tasks: Iterable[dict]) -> None:
+    """Выводит на экран таблицу задач. В терминале таблица выводится
+    постранично и не шире терминала (см. модуль pager), иначе - целиком
+    и без ограничения ширины, но строки форматируются и выводятся
+    по мере чтения задач. Длинные значения переносятся, а не обрезаются
+
+    Args:
+        tasks (Iterable[dict]): задачи
+    """
+    if not sys.stdout.isatty():
+        with stats.timer("render_table"):
+            for line in iter_table(iter_task_rows(tasks)):
+                print(line)
+        return
+    with stats.timer("render_table"):
+        pager = Pager(iter_task_rows(tasks), max_width=shutil.get_terminal_size().columns)
+    browse(pager)
+
+
+def show_tasks(manager: TaskManager) -> None:
+    """Выводит на экран таблицу всех задач
+
+    Args:
+        manager (TaskManager): объект менеджера задач
+    """
+    print_tasks(manager.iter_tasks())
 
 
 def show_tasks_for_category(manager: TaskManager) -> None:
@@ -34,14 +84,7 @@ def show_tasks_for_category(manager: TaskManager) -> None:
         manager (TaskManager): объект менеджера задач
     """
     category = input("Введите категорию: ").lower()
-    data = [
-        [task['id'], task['status'], task['title'], task['description'],
-        task['category'], task['due_date'], task['priority']]
-        for task in manager.tasks
-        if task['category'].lower() == category
-    ]
-    table = fill_table(data)
-    print(table)
+    print_tasks(manager.tasks_for_category(category))
 
 
 def add_task(manager: TaskManager) -> None:
@@ -100,7 +143,7 @@ def mark_task_as_done(manager: TaskManager) -> None:
     """
     task_id = input_task_id()
     try:
-        manager.change_task(task_id, status=Status.done)
+        manager.patch(task_id, status=Status.done)
         print(colorama.Back.GREEN + "Задача помечена как выполненная")
     except ValueError as e:
         print(colorama.Back.RED + str(e))
@@ -138,10 +181,39 @@ def search_task(manager: TaskManager) -> None:
         manager (TaskManager): объект менеджера задач
     """
     query = input("Введите запрос: ")
-    data = [
-        [task['id'], task['status'], task['title'], task['description'],
-        task['category'], task['due_date'], task['priority']]
-        for task in manager.search_task(query)
-    ]
-    table = fill_table(data)
-    print(table)
+    print_tasks(manager.search_task(query))
+
+
+def show_overdue_tasks(manager: TaskManager) -> None:
+    """Выводит на экран таблицу просроченных задач
+
+    Args:
+        manager (TaskManager): объект менеджера задач
+    """
+    print_tasks(manager.overdue_tasks())
+
+
+def show_upcoming_tasks(manager: TaskManager) -> None:
+    """Выводит на экран таблицу задач, срок выполнения которых скоро наступит
+
+    Args:
+        manager (TaskManager): объект менеджера задач
+    """
+    days = input_days()
+    print_tasks(manager.upcoming_tasks(days))
+
+
+def show_stats(manager: TaskManager) -> None:
+    """Выводит на экран статистику операций: время выполнения
+    и объем работы (см. модуль stats)
+
+    Args:
+        manager (TaskManager): объект менеджера задач
+    """
+    print(stats.report())
+    print(f"Кэш задач: попаданий {manager.cache_hits}, перечитываний {manager.cache_reloads}")
+    results = manager.cache_stats()
+    print(
+        f"Кэш результатов: попаданий {results['hits']}, промахов {results['misses']}, "
+        f"вытеснено {results['evictions']}, устарело {results['expirations']}"
+    )
@@ -0,0 +1,105 @@
+# Модуль, описывающий кэш результатов запросов менеджера задач.
+#
+# Результат хранится под ключом из вида запроса, нормализованного
+# запроса и версии данных, от которых он зависит (см. TaskManager.data_version
+# и версии категорий). Изменение задач увеличивает версию, поэтому
+# устаревшие результаты больше не находятся и со временем вытесняются.
+# Кэш ограничен по количеству результатов (вытесняются давно не
+# использовавшиеся) и, при заданном ttl, по времени жизни результата.
+
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+
+class ResultCache:
+    """Ограниченный LRU-кэш результатов со временем жизни"""
+
+    def __init__(
+        self, size: int = 256, ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        """
+        Args:
+            size (int, optional): наибольшее количество результатов.
+                0 - кэш выключен. По умолчанию 256.
+            ttl (Optional[float], optional): время жизни результата в секундах.
+                По умолчанию не ограничено.
+            clock (Callable[[], float], optional): источник времени.
+                По умолчанию time.monotonic.
+        """
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        # Ключ -> (время сохранения, результат); порядок - от давно использованных
+        self._entries: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: object = None) -> object:
+        """Возвращает результат по ключу
+
+        Args:
+            key (Hashable): ключ
+            default (object, optional): значение, если результата нет или он устарел
+
+        Returns:
+            object: результат или default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[0] >= self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: object) -> None:
+        """Сохраняет результат, вытесняя давно не использовавшиеся
+
+        Args:
+            key (Hashable): ключ
+            value (object): результат
+        """
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Удаляет все результаты"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        """Возвращает метрики кэша
+
+        Returns:
+            dict: {"size": количество результатов, "hits": попадания,
+                "misses": промахи, "evictions": вытеснено при переполнении,
+                "expirations": удалено по времени жизни}
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,128 @@
+# Модуль, описывающий компактное колоночное хранение задач в памяти.
+#
+# Вместо словаря на каждую задачу каждое поле хранится в отдельной
+# колонке: числовые поля - в массивах array, статус и приоритет - кодами
+# по одному байту, категория - номером в общем списке категорий,
+# заголовки и описания - в одной куче байтов UTF-8 со смещениями.
+# Границей с остальным кодом остается формат Task.to_json.
+#
+# Это отдельный эксперимент: TaskManager хранит задачи записями-словарями
+# (см. models.compact_record), на которых построены его индексы, и колонки
+# не использует. Сравнение памяти - benchmarks/bench_memory.py.
+
+
+from array import array
+from datetime import date
+from typing import Iterable, Iterator
+
+from models import Task, Priority, Status
+
+
+_statuses = list(Status)
+_priorities = list(Priority)
+_status_codes = {status: code for code, status in enumerate(_statuses)}
+_priority_codes = {priority: code for code, priority in enumerate(_priorities)}
+
+
+class TaskColumns:
+    """Колоночное хранилище задач в памяти"""
+
+    def __init__(self, tasks: Iterable[dict] = ()) -> None:
+        """
+        Args:
+            tasks (Iterable[dict], optional): начальные задачи в формате Task.to_json
+        """
+        self.ids = array("q")
+        self.statuses = array("b")
+        self.priorities = array("b")
+        self.due_dates = array("l")
+        self.category_codes = array("l")
+        self.categories: list[str] = []
+        # Заголовок задачи в строке row занимает байты кучи с offsets[2 * row]
+        # по offsets[2 * row + 1], описание - с offsets[2 * row + 1] по offsets[2 * row + 2]
+        self._heap = bytearray()
+        self._offsets = array("q")
+        self._category_codes: dict[str, int] = {}
+        self.extend(tasks)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[dict]:
+        """Перебирает задачи в формате Task.to_json"""
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def append(self, task: dict) -> None:
+        """Добавляет задачу
+
+        Args:
+            task (dict): задача в формате Task.to_json
+        """
+        category = task['category']
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+
+        self.ids.append(task['id'])
+        self.statuses.append(_status_codes[task['status']])
+        self.priorities.append(_priority_codes[task['priority']])
+        self.due_dates.append(date.fromisoformat(task['due_date']).toordinal())
+        self.category_codes.append(code)
+        self._offsets.append(len(self._heap))
+        self._heap += task['title'].encode()
+        self._offsets.append(len(self._heap))
+        self._heap += task['description'].encode()
+
+    def extend(self, tasks: Iterable[dict]) -> None:
+        """Добавляет несколько задач
+
+        Args:
+            tasks (Iterable[dict]): задачи в формате Task.to_json
+        """
+        for task in tasks:
+            self.append(task)
+
+    def task(self, row: int) -> Task:
+        """Возвращает объект задачи по номеру строки
+
+        Args:
+            row (int): номер строки
+
+        Returns:
+            Task: объект задачи
+        """
+        return Task(
+            title=self._string(2 * row),
+            description=self._string(2 * row + 1),
+            category=self.categories[self.category_codes[row]],
+            due_date=date.fromordinal(self.due_dates[row]),
+            priority=_priorities[self.priorities[row]],
+            id=self.ids[row],
+            status=_statuses[self.statuses[row]]
+        )
+
+    def record(self, row: int) -> dict:
+        """Возвращает задачу в формате Task.to_json по номеру строки
+
+        Args:
+            row (int): номер строки
+
+        Returns:
+            dict: задача
+        """
+        return self.task(row).to_json()
+
+    def _string(self, index: int) -> str:
+        """Возвращает строку кучи по ее номеру
+
+        Args:
+            index (int): номер строки
+
+        Returns:
+            str: строка
+        """
+        start = self._offsets[index]
+        end = self._offsets[index + 1] if index + 1 < len(self._offsets) else len(self._heap)
+        return self._heap[start:end].decode()
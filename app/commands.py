@@ -0,0 +1,338 @@
+# Модуль, описывающий пакетный (неинтерактивный) режим менеджера задач.
+#
+# Команды читаются построчно в формате JSON Lines: каждая строка - объект
+# с полем "op" и параметрами команды, например
+#     {"op": "add", "title": "Отчет", "category": "Work", "due_date": "2124-01-01", "priority": "high"}
+#     {"op": "change", "id": 1, "title": "Новый заголовок"}
+#     {"op": "change", "id": 1, "title": "Новый заголовок", "version": "<версия из get>"}
+#     {"op": "done", "id": 1}
+#     {"op": "delete", "id": 2}
+#     {"op": "delete_category", "category": "Work"}
+#     {"op": "search", "query": "отчет"}
+#     {"op": "query", "status": "не выполнена", "order_by": "due_date", "limit": 10}
+#     {"op": "get", "id": 1}
+# Пустые строки и строки, начинающиеся с "#", пропускаются.
+#
+# На каждую команду выводится одна строка JSON с результатом:
+#     {"line": 1, "op": "add", "ok": true, "id": 4}
+#     {"line": 5, "op": "delete", "ok": false, "error": "Задачи с id '2' не существует", "not_found": true}
+# Команды выполняются порциями (по умолчанию по 1000): изменения порции
+# выполняются в одном пакете (см. TaskManager.batch) и сохраняются
+# в хранилище одной записью, и только после этого выводятся результаты
+# ее команд. Если порцию сохранить не удалось (например, другой процесс
+# удалил изменяемую задачу), ни одно ее изменение не сохраняется,
+# и для каждой ее команды выводится ошибка.
+
+
+import json
+import time
+from datetime import date
+from typing import Callable, Iterable, Optional, TextIO, Union
+
+from managers import TaskManager, TaskNotFoundError, check_field
+from models import Task, Priority, Status
+
+
+class CommandError(ValueError):
+    """Ошибка в команде: неизвестная операция или неверные параметры"""
+
+
+def _required(command: dict, name: str):
+    """Возвращает обязательный параметр команды
+
+    Args:
+        command (dict): команда
+        name (str): название параметра
+
+    Raises:
+        CommandError: если параметр не задан
+
+    Returns:
+        значение параметра
+    """
+    value = command.get(name)
+    if value is None or value == "":
+        raise CommandError(f"Не задан параметр '{name}'")
+    return value
+
+
+def _field(command: dict, name: str, required: bool = True):
+    """Возвращает параметр команды - поле задачи, проверенное
+    так же, как при изменении задачи (см. managers.check_field)
+
+    Args:
+        command (dict): команда
+        name (str): название поля
+        required (bool, optional): обязателен ли параметр. По умолчанию True.
+
+    Raises:
+        CommandError: если обязательный параметр не задан или значение неверно
+
+    Returns:
+        значение поля или None
+    """
+    value = _required(command, name) if required else command.get(name)
+    if value is None:
+        return None
+    try:
+        return check_field(name, value)
+    except ValueError as e:
+        raise CommandError(f"Параметр '{name}': {e}") from None
+
+
+def _string(command: dict, name: str, required: bool = True) -> Optional[str]:
+    value = _required(command, name) if required else command.get(name)
+    if value is not None and not isinstance(value, str):
+        raise CommandError(f"Параметр '{name}' должен быть строкой")
+    return value
+
+
+def _limit(command: dict) -> Optional[int]:
+    limit = command.get("limit")
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool)):
+        raise CommandError("Параметр 'limit' должен быть целым числом")
+    return limit
+
+
+def _task_id(command: dict) -> int:
+    task_id = _required(command, "id")
+    if not isinstance(task_id, int) or isinstance(task_id, bool):
+        raise CommandError("ID должно быть целым числом")
+    return task_id
+
+
+def _due_date(value: Optional[str]) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise CommandError("Неверный формат даты") from None
+
+
+def _enum(enum: type, value: Optional[str]):
+    """Преобразует название ("high") или значение ("высокий") в элемент
+    перечисления Priority или Status
+
+    Raises:
+        CommandError: если такого элемента нет
+    """
+    if value is None:
+        return None
+    if value in enum.__members__:
+        return enum[value]
+    try:
+        return enum(value)
+    except ValueError:
+        raise CommandError(f"Неверное значение '{value}'") from None
+
+
+def _new_task(command: dict) -> Task:
+    """Возвращает задачу из параметров команды add
+
+    Args:
+        command (dict): команда
+
+    Raises:
+        CommandError: если параметры неверны
+
+    Returns:
+        Task: объект задачи
+    """
+    return Task(
+        title=_field(command, "title"),
+        description=_field(command, "description", required=False) or "",
+        category=_field(command, "category"),
+        due_date=_due_date(_required(command, "due_date")),
+        priority=_enum(Priority, _required(command, "priority"))
+    )
+
+
+def _change(manager: TaskManager, command: dict) -> dict:
+    manager.change_task(
+        _task_id(command),
+        version=command.get("version"),
+        title=command.get("title"),
+        description=command.get("description"),
+        category=command.get("category"),
+        due_date=_due_date(command.get("due_date")),
+        priority=_enum(Priority, command.get("priority")),
+        status=_enum(Status, command.get("status"))
+    )
+    return {}
+
+
+def _done(manager: TaskManager, command: dict) -> dict:
+    manager.patch(_task_id(command), status=Status.done)
+    return {}
+
+
+def _delete(manager: TaskManager, command: dict) -> dict:
+    manager.delete_task_by_id(_task_id(command))
+    return {}
+
+
+def _delete_category(manager: TaskManager, command: dict) -> dict:
+    return {"deleted": manager.delete_task_by_category(_string(command, "category"))}
+
+
+def _search(manager: TaskManager, command: dict) -> dict:
+    return {"tasks": manager.search_task(_string(command, "query"), _limit(command))}
+
+
+def _query(manager: TaskManager, command: dict) -> dict:
+    conditions = {key: value for key, value in command.items() if key != "op"}
+    for name in ("category", "text"):
+        if name in conditions:
+            conditions[name] = _string(command, name, required=False)
+    for name in ("due_before", "due_after"):
+        if name in conditions:
+            conditions[name] = _due_date(conditions[name])
+    if "status" in conditions:
+        conditions['status'] = _enum(Status, conditions['status'])
+    if "priority" in conditions:
+        conditions['priority'] = _enum(Priority, conditions['priority'])
+    if "limit" in conditions:
+        conditions['limit'] = _limit(command)
+    order_by = conditions.get("order_by")
+    if order_by is not None and not (
+        isinstance(order_by, str)
+        or isinstance(order_by, list) and all(isinstance(field, str) for field in order_by)
+    ):
+        raise CommandError("Параметр 'order_by' должен быть строкой или списком строк")
+    return {"tasks": manager.query(**conditions)}
+
+
+def _get(manager: TaskManager, command: dict) -> dict:
+    task_id = _task_id(command)
+    return {"task": manager.get_task_from_id(task_id).to_json(), "version": manager.task_version(task_id)}
+
+
+# Команда add выполняется отдельно: идущие подряд добавления
+# объединяются в один вызов TaskManager.add_tasks
+commands: dict[str, Callable[[TaskManager, dict], dict]] = {
+    "change": _change,
+    "done": _done,
+    "delete": _delete,
+    "delete_category": _delete_category,
+    "search": _search,
+    "query": _query,
+    "get": _get
+}
+
+
+def execute(manager: TaskManager, batch: list[dict]) -> list[dict]:
+    """Выполняет команды по порядку. Ошибка в команде не прерывает
+    выполнение остальных. Id для идущих подряд команд add резервируются
+    одним обращением к хранилищу
+
+    Args:
+        manager (TaskManager): объект менеджера задач
+        batch (list[dict]): команды
+
+    Returns:
+        list[dict]: результаты команд: {"ok": True, ...} или
+            {"ok": False, "error": текст ошибки}; если задачи с id
+            команды не существует, в результат добавляется "not_found": True
+    """
+    results: list[Optional[dict]] = []
+    # Идущие подряд команды add: (номер результата, задача)
+    added: list[tuple[int, Task]] = []
+
+    def flush() -> None:
+        ids = manager.add_tasks([task for _, task in added])
+        for (position, _), task_id in zip(added, ids):
+            results[position] = {"ok": True, "id": task_id}
+        added.clear()
+
+    for command in batch:
+        try:
+            op = command.get("op")
+            if op == "add":
+                added.append((len(results), _new_task(command)))
+                results.append(None)
+                continue
+            if added:
+                flush()
+            if op not in commands:
+                raise CommandError(f"Неизвестная команда '{op}'")
+            results.append({"ok": True} | commands[op](manager, command))
+        except TaskNotFoundError as e:
+            results.append({"ok": False, "error": str(e), "not_found": True})
+        except (ValueError, TypeError) as e:
+            results.append({"ok": False, "error": str(e)})
+    if added:
+        flush()
+    return results
+
+
+def run_commands(
+    manager: TaskManager, lines: Iterable[str], output: TextIO,
+    chunk_size: int = 1000
+) -> dict:
+    """Выполняет команды порциями и выводит результат каждой команды
+    строкой JSON после того, как изменения ее порции сохранены. Ошибка
+    в команде не прерывает выполнение остальных: в результат команды
+    записывается текст ошибки
+
+    Args:
+        manager (TaskManager): объект менеджера задач
+        lines (Iterable[str]): строки с командами в формате JSON
+        output (TextIO): поток для вывода результатов
+        chunk_size (int, optional): сколько команд выполняется, сохраняется
+            одной записью и выводится за раз. По умолчанию 1000.
+
+    Returns:
+        dict: итог: {"commands": количество команд, "errors": количество
+            ошибок, "seconds": время выполнения, "per_second": команд в секунду}
+    """
+    executed = errors = 0
+    # Очередная порция команд: (номер строки, команда или ошибка разбора)
+    chunk: list[tuple[int, Union[dict, Exception]]] = []
+
+    def flush() -> None:
+        nonlocal executed, errors
+        commands = [command for _, command in chunk if isinstance(command, dict)]
+        try:
+            with manager.batch():
+                results = execute(manager, commands)
+        except Exception as e:
+            # Пакет отменен: ни одно изменение порции не сохранено
+            results = [{"ok": False, "error": f"Изменения не сохранены: {e}"} for _ in commands]
+        results = iter(results)
+        for number, command in chunk:
+            result = {"line": number}
+            if isinstance(command, dict):
+                result['op'] = command.get("op")
+                result |= next(results)
+            else:
+                result |= {"ok": False, "error": str(command)}
+            executed += 1
+            errors += not result['ok']
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+        chunk.clear()
+
+    start = time.perf_counter()
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            command = json.loads(line)
+            if not isinstance(command, dict):
+                raise CommandError("Команда должна быть объектом JSON")
+        except ValueError as e:
+            command = e
+        chunk.append((number, command))
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+    # Время включает сохранение изменений в хранилище
+    seconds = time.perf_counter() - start
+    return {
+        "commands": executed,
+        "errors": errors,
+        "seconds": round(seconds, 6),
+        "per_second": round(executed / seconds, 1) if seconds else None
+    }
@@ -112,3 +112,21 @@ def input_task_id() -> int:
             return int(input("Введите id задачи: "))
         except (ValueError, TypeError):
             print(colorama.Back.RED + "ID должно быть целым числом")
+
+
+def input_days(default: int = 7) -> int:
+    """Функция для ввода количества дней
+
+    Args:
+        default (int, optional): значение при вводе пустой строки. По умолчанию 7.
+
+    Returns:
+        int: количество дней
+    """
+    while True:
+        days = input(f"Введите количество дней (по умолчанию {default}): ")
+        if days == "":
+            return default
+        if days.isdigit():
+            return int(days)
+        print(colorama.Back.RED + "Количество дней должно быть неотрицательным целым числом")
@@ -0,0 +1,411 @@
+# Модуль, описывающий индексы, которые менеджер задач строит
+# над задачами в памяти
+
+
+import bisect
+import heapq
+import itertools
+import math
+import re
+from array import array
+from typing import Callable, Hashable, Iterable, Iterator, Optional
+
+
+_word = re.compile(r"\w+")
+
+
+class HashIndex:
+    """Хеш-индекс: значение ключа задачи -> id задач с этим значением.
+    id внутри одного значения хранятся в порядке добавления"""
+
+    def __init__(self, key: Callable[[dict], Hashable]) -> None:
+        """
+        Args:
+            key (Callable[[dict], Hashable]): функция, вычисляющая ключ задачи
+        """
+        self.key = key
+        self._ids: dict[Hashable, dict[int, None]] = {}
+
+    def __len__(self) -> int:
+        """Возвращает количество различных значений ключа"""
+        return len(self._ids)
+
+    def get(self, value: Hashable) -> list[int]:
+        """Возвращает id задач с указанным значением ключа
+
+        Args:
+            value (Hashable): значение ключа
+
+        Returns:
+            list[int]: список id
+        """
+        return list(self._ids.get(value, ()))
+
+    def count(self, value: Hashable) -> int:
+        """Возвращает количество задач с указанным значением ключа
+
+        Args:
+            value (Hashable): значение ключа
+
+        Returns:
+            int: количество задач
+        """
+        return len(self._ids.get(value, ()))
+
+    def add(self, task: dict) -> None:
+        """Добавляет задачу в индекс
+
+        Args:
+            task (dict): задача
+        """
+        self._ids.setdefault(self.key(task), {})[task['id']] = None
+
+    def remove(self, task: dict) -> None:
+        """Удаляет задачу из индекса
+
+        Args:
+            task (dict): задача
+        """
+        value = self.key(task)
+        ids = self._ids.get(value)
+        if ids is None:
+            return
+        ids.pop(task['id'], None)
+        if not ids:
+            del self._ids[value]
+
+    def update(self, old: dict, new: dict) -> None:
+        """Обновляет индекс после изменения задачи
+
+        Args:
+            old (dict): задача до изменения
+            new (dict): задача после изменения
+        """
+        if self.key(old) != self.key(new):
+            self.remove(old)
+            self.add(new)
+
+    def rebuild(self, tasks: Iterable[dict]) -> None:
+        """Строит индекс заново
+
+        Args:
+            tasks (Iterable[dict]): все задачи
+        """
+        ids: dict[Hashable, dict[int, None]] = {}
+        key = self.key
+        for task in tasks:
+            value = key(task)
+            bucket = ids.get(value)
+            if bucket is None:
+                bucket = ids[value] = {}
+            bucket[task['id']] = None
+        self._ids = ids
+
+
+class SortedIndex:
+    """Упорядоченный индекс по целочисленному ключу задачи (например,
+    по сроку выполнения в виде порядкового номера даты).
+
+    Индекс хранит отсортированный массив чисел ключ * 2^32 + id задачи,
+    поэтому задачи с одинаковым ключом упорядочены по id, а поиск
+    позиции задачи и границ диапазона - двоичный поиск. Запрос
+    диапазона выполняется за O(log n + k), где k - размер результата.
+    id задач должны быть меньше 2^32"""
+
+    _shift = 32
+
+    def __init__(self, key: Callable[[dict], int]) -> None:
+        """
+        Args:
+            key (Callable[[dict], int]): функция, вычисляющая ключ задачи
+        """
+        self.key = key
+        self._entries = array("q")
+
+    def __len__(self) -> int:
+        """Возвращает количество задач в индексе"""
+        return len(self._entries)
+
+    def add(self, task: dict) -> None:
+        """Добавляет задачу в индекс
+
+        Args:
+            task (dict): задача
+        """
+        entry = self._entry(task)
+        self._entries.insert(bisect.bisect_left(self._entries, entry), entry)
+
+    def remove(self, task: dict) -> None:
+        """Удаляет задачу из индекса
+
+        Args:
+            task (dict): задача
+        """
+        entry = self._entry(task)
+        position = bisect.bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def update(self, old: dict, new: dict) -> None:
+        """Обновляет индекс после изменения задачи
+
+        Args:
+            old (dict): задача до изменения
+            new (dict): задача после изменения
+        """
+        if self.key(old) != self.key(new):
+            self.remove(old)
+            self.add(new)
+
+    def rebuild(self, tasks: Iterable[dict]) -> None:
+        """Строит индекс заново
+
+        Args:
+            tasks (Iterable[dict]): все задачи
+        """
+        self._entries = array("q", sorted(self._entry(task) for task in tasks))
+
+    def range(self, low: Optional[int] = None, high: Optional[int] = None) -> Iterator[int]:
+        """Перебирает id задач с ключом low <= ключ < high по возрастанию ключа
+
+        Args:
+            low (Optional[int], optional): нижняя граница (включительно)
+            high (Optional[int], optional): верхняя граница (не включительно)
+
+        Yields:
+            int: id задачи
+        """
+        start, end = self._bounds(low, high)
+        mask = (1 << self._shift) - 1
+        for position in range(start, end):
+            yield self._entries[position] & mask
+
+    def count(self, low: Optional[int] = None, high: Optional[int] = None) -> int:
+        """Возвращает количество задач с ключом low <= ключ < high за O(log n)
+
+        Args:
+            low (Optional[int], optional): нижняя граница (включительно)
+            high (Optional[int], optional): верхняя граница (не включительно)
+
+        Returns:
+            int: количество задач
+        """
+        start, end = self._bounds(low, high)
+        return max(end - start, 0)
+
+    def _bounds(self, low: Optional[int], high: Optional[int]) -> tuple[int, int]:
+        """Возвращает позиции начала и конца диапазона ключей в массиве"""
+        start = 0 if low is None else bisect.bisect_left(self._entries, low << self._shift)
+        end = len(self._entries) if high is None else bisect.bisect_left(self._entries, high << self._shift)
+        return start, end
+
+    def _entry(self, task: dict) -> int:
+        return self.key(task) << self._shift | task['id']
+
+
+def tokenize(text: str) -> list[str]:
+    """Разбивает текст на слова в нижнем регистре
+
+    Args:
+        text (str): текст
+
+    Returns:
+        list[str]: список слов
+    """
+    return _word.findall(text.lower())
+
+
+class TextIndex:
+    """Инвертированный индекс по словам текстовых полей задачи.
+
+    Для каждого слова хранится словарь id задачи -> вес слова в задаче
+    (количество вхождений, умноженное на вес поля). Отсортированный
+    словарь слов позволяет искать по префиксу двоичным поиском.
+
+    Синтаксис запроса:
+        "купить хлеб"     - задачи, в которых есть оба слова
+        "хлеб OR молоко"  - задачи, в которых есть хотя бы одно из слов
+                            (вместо OR можно писать |)
+        "мол*"            - слова, начинающиеся с "мол"
+    Результаты упорядочены по релевантности (TF-IDF)."""
+
+    def __init__(self, fields: dict[str, float]) -> None:
+        """
+        Args:
+            fields (dict[str, float]): индексируемые поля и их веса
+        """
+        self.fields = fields
+        self._postings: dict[str, dict[int, float]] = {}
+        self._terms: dict[int, dict[str, float]] = {}
+        self._vocabulary: list[str] = []
+
+    def __len__(self) -> int:
+        """Возвращает количество проиндексированных задач"""
+        return len(self._terms)
+
+    def add(self, task: dict) -> None:
+        """Добавляет задачу в индекс
+
+        Args:
+            task (dict): задача
+        """
+        terms = self._task_terms(task)
+        self._terms[task['id']] = terms
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                bisect.insort(self._vocabulary, term)
+            postings[task['id']] = weight
+
+    def remove(self, task: dict) -> None:
+        """Удаляет задачу из индекса
+
+        Args:
+            task (dict): задача
+        """
+        for term in self._terms.pop(task['id'], ()):
+            postings = self._postings[term]
+            del postings[task['id']]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+
+    def update(self, old: dict, new: dict) -> None:
+        """Обновляет индекс после изменения задачи
+
+        Args:
+            old (dict): задача до изменения
+            new (dict): задача после изменения
+        """
+        if any(old[field] != new[field] for field in self.fields):
+            self.remove(old)
+            self.add(new)
+
+    def rebuild(self, tasks: Iterable[dict]) -> None:
+        """Строит индекс заново
+
+        Args:
+            tasks (Iterable[dict]): все задачи
+        """
+        self._postings = {}
+        self._terms = {}
+        self._vocabulary = []
+        for task in tasks:
+            terms = self._task_terms(task)
+            self._terms[task['id']] = terms
+            for term, weight in terms.items():
+                self._postings.setdefault(term, {})[task['id']] = weight
+        self._vocabulary = sorted(self._postings)
+
+    def search(self, query: str, limit: Optional[int] = None) -> list[int]:
+        """Возвращает id задач, подходящих под запрос, по убыванию релевантности
+
+        Args:
+            query (str): запрос
+            limit (Optional[int], optional): максимальное количество результатов
+
+        Returns:
+            list[int]: список id
+        """
+        scores: dict[int, float] = {}
+        for group in self._parse(query):
+            matches = self._match_all(group)
+            for task_id, score in matches.items():
+                scores[task_id] = scores.get(task_id, 0) + score
+
+        def rank(task_id: int) -> tuple[float, int]:
+            return -scores[task_id], task_id
+
+        if limit is not None:
+            return heapq.nsmallest(limit, scores, key=rank)
+        return sorted(scores, key=rank)
+
+    def _task_terms(self, task: dict) -> dict[str, float]:
+        """Возвращает слова задачи с их весами
+
+        Args:
+            task (dict): задача
+
+        Returns:
+            dict[str, float]: слово -> вес
+        """
+        terms: dict[str, float] = {}
+        for field, weight in self.fields.items():
+            for term in tokenize(task[field]):
+                terms[term] = terms.get(term, 0) + weight
+        return terms
+
+    @staticmethod
+    def _parse(query: str) -> list[list[str]]:
+        """Разбирает запрос на группы слов, объединенные через OR.
+        Слова внутри группы объединены через AND
+
+        Args:
+            query (str): запрос
+
+        Returns:
+            list[list[str]]: группы слов
+        """
+        groups = [[]]
+        for word in query.split():
+            if word in ("OR", "|"):
+                groups.append([])
+                continue
+            prefix = word.endswith("*")
+            terms = tokenize(word)
+            if prefix and terms:
+                terms[-1] += "*"
+            groups[-1].extend(terms)
+        return [group for group in groups if group]
+
+    def _match_all(self, terms: list[str]) -> dict[int, float]:
+        """Возвращает задачи, в которых есть все слова, с их весами
+
+        Args:
+            terms (list[str]): слова запроса
+
+        Returns:
+            dict[int, float]: id задачи -> вес
+        """
+        postings = sorted((self._match(term) for term in terms), key=len)
+        if not postings or not postings[0]:
+            return {}
+        scores = {}
+        for task_id, score in postings[0].items():
+            for other in postings[1:]:
+                if task_id not in other:
+                    break
+                score += other[task_id]
+            else:
+                scores[task_id] = score
+        return scores
+
+    def _match(self, term: str) -> dict[int, float]:
+        """Возвращает задачи, в которых есть слово (или слова с префиксом,
+        если term оканчивается на *), с весами TF-IDF
+
+        Args:
+            term (str): слово запроса
+
+        Returns:
+            dict[int, float]: id задачи -> вес
+        """
+        if term.endswith("*"):
+            prefix = term[:-1]
+            start = bisect.bisect_left(self._vocabulary, prefix)
+            terms = []
+            for word in itertools.islice(self._vocabulary, start, None):
+                if not word.startswith(prefix):
+                    break
+                terms.append(word)
+        else:
+            terms = [term] if term in self._postings else []
+
+        scores: dict[int, float] = {}
+        for word in terms:
+            postings = self._postings[word]
+            idf = math.log(1 + len(self._terms) / len(postings))
+            for task_id, weight in postings.items():
+                scores[task_id] = max(scores.get(task_id, 0), weight * idf)
+        return scores
@@ -0,0 +1,171 @@
+# Модуль, описывающий блокировки, которыми менеджер задач защищает
+# базу данных от одновременного изменения
+
+
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows: межпроцессная блокировка недоступна
+    fcntl = None
+
+
+class FileLock:
+    """Межпроцессная блокировка на основе fcntl.flock.
+
+    with lock: - исключительная блокировка (для изменения базы данных),
+    with lock.shared(): - разделяемая (для чтения): ее одновременно
+    держат несколько читателей, но не писатель.
+
+    Исключительная блокировка повторно входимая: поток, который уже
+    владеет ей, может захватить ее снова, а разделяемая блокировка
+    внутри исключительной ничего не делает. Внутри процесса потоки
+    дополнительно разделяются обычной блокировкой threading.RLock"""
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): путь к файлу блокировки
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+        self._owner = None
+
+    def __enter__(self) -> "FileLock":
+        self._lock.acquire()
+        if self._depth == 0:
+            try:
+                self._file = open(self.path, "a")
+                if fcntl is not None:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._lock.release()
+                raise
+        self._depth += 1
+        self._owner = threading.get_ident()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._owner = None
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._lock.release()
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """Разделяемая блокировка на время блока with"""
+        if self._owner == threading.get_ident():
+            yield
+            return
+        # flock относится к открытому файлу: у каждого читателя свой
+        with open(self.path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+class RWLock:
+    """Блокировка читателей и писателя между потоками одного процесса.
+
+    with lock.read(): - блок чтения: его одновременно выполняют
+    несколько потоков, with lock.write(): - блок записи: его выполняет
+    один поток, и только когда нет читателей. Ожидающий писатель
+    пропускается вперед новых читателей, поэтому поток читателей
+    не откладывает запись бесконечно.
+
+    Обе блокировки повторно входимые, а чтение внутри записи ничего
+    не делает. Запись внутри чтения невозможна (два читателя, которые
+    ждут друг друга, заблокировались бы навсегда)"""
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer = None
+        self._local = threading.local()
+
+    def reading(self) -> bool:
+        """Определяет, выполняет ли текущий поток блок чтения
+        (и не блок записи)
+
+        Returns:
+            bool: True/False
+        """
+        return getattr(self._local, "depth", 0) > 0
+
+    def writing(self) -> bool:
+        """Определяет, выполняет ли текущий поток блок записи
+
+        Returns:
+            bool: True/False
+        """
+        return self._writer == threading.get_ident()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Блок чтения"""
+        if self.writing():
+            yield
+            return
+        if self.reading():
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        self._local.depth = 1
+        try:
+            yield
+        finally:
+            self._local.depth = 0
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Блок записи
+
+        Raises:
+            RuntimeError: если текущий поток выполняет блок чтения
+        """
+        if self.writing():
+            yield
+            return
+        if self.reading():
+            raise RuntimeError("Запись внутри блока чтения невозможна")
+        with self._condition:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = threading.get_ident()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
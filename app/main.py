@@ -4,12 +4,26 @@
 #
 # Приложение для управления списком задач с возможностью добавления,
 # выполнения, удаления и поиска задач.
+#
+# Без параметров приложение работает в интерактивном режиме. С параметром
+# --exec команды читаются из файла (или из stdin, если вместо файла
+# указан "-") и выполняются без вопросов (см. модуль commands):
+#     python3 app/main.py --db tasks.json --exec commands.jsonl
+#     python3 app/main.py --db tasks.json --exec - < commands.jsonl
+
 
+import argparse
+import contextlib
+import json
+import sys
 
 import colorama
 
+from commands import run_commands
 from managers import TaskManager
 from menu import menu, print_menu
+from stats import install_hooks
+from storages import backends
 
 
 def main(manager: TaskManager) -> None:
@@ -25,10 +39,51 @@ def main(manager: TaskManager) -> None:
             menu[action](manager)
 
 
+def execute(file: str, commands_file: str, backend: str = None) -> int:
+    """Пакетный режим: выполняет команды из файла и выводит результаты
+    в stdout строками JSON, а итог с производительностью - в stderr
+
+    Args:
+        file (str): путь к базе данных
+        commands_file (str): путь к файлу команд или "-" для stdin
+        backend (str, optional): тип хранилища
+
+    Returns:
+        int: код завершения: 0 - все команды выполнены, 1 - были ошибки
+    """
+    # В stdout выводятся только результаты команд
+    with contextlib.redirect_stdout(sys.stderr):
+        manager = TaskManager(file, backend)
+    try:
+        if commands_file == "-":
+            summary = run_commands(manager, sys.stdin, sys.stdout)
+        else:
+            with open(commands_file, "r", encoding="utf-8") as lines:
+                summary = run_commands(manager, lines, sys.stdout)
+    finally:
+        manager.close()
+    print(json.dumps(summary), file=sys.stderr)
+    return 1 if summary['errors'] else 0
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Менеджер задач")
+    parser.add_argument("--db", help="путь к базе данных")
+    parser.add_argument("--backend", choices=backends, help="тип хранилища")
+    parser.add_argument("--exec", dest="commands", metavar="FILE",
+                        help="выполнить команды из файла JSON Lines ('-' - из stdin)")
+    args = parser.parse_args()
+    install_hooks()
+    # Без терминала (например, в пакетном режиме с перенаправленным
+    # выводом) colorama убирает из вывода цветовые коды
     colorama.init(autoreset=True)
-    
-    file = input("Введите имя файла базы данных: ")
-    manager = TaskManager(file)
+
+    if args.commands is not None:
+        if args.db is None:
+            parser.error("для --exec нужно указать --db")
+        sys.exit(execute(args.db, args.commands, args.backend))
+
+    file = args.db or input("Введите имя файла базы данных: ")
+    manager = TaskManager(file, args.backend)
     
     main(manager)
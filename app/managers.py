@@ -1,53 +1,345 @@
 # Модуль, описывающий менеджер задач TaskManager
 
 
+import functools
+import itertools
 import os
-import json
-from datetime import datetime
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional
 
 import colorama
-from models import Task, Status
+from cache import ResultCache
+from indexes import HashIndex, SortedIndex, TextIndex
+from locks import RWLock
+from models import Task, Priority, Status, compact_record, record_version
+from queries import Query
+from stats import stats
+from storages import ADD, PATCH, DELETE, open_storage
+
+
+class ConflictError(ValueError):
+    """Задача изменилась после того, как была прочитана версия,
+    на основе которой сделано изменение (см. TaskManager.change_task)"""
+
+
+class TaskNotFoundError(ValueError):
+    """Задачи с указанным id не существует"""
+
+
+def _text(value: str) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError("Значение должно быть непустой строкой")
+    return value
+
+
+def _description(value: str) -> str:
+    if not isinstance(value, str):
+        raise ValueError("Описание должно быть строкой")
+    return value
+
+
+def _due_date(value) -> str:
+    if isinstance(value, date):
+        return str(value)
+    try:
+        return str(date.fromisoformat(value))
+    except (TypeError, ValueError):
+        raise ValueError("Неверный формат даты") from None
+
+
+def _member(enum: type) -> Callable:
+    def convert(value) -> str:
+        try:
+            return str(enum(value))
+        except ValueError:
+            raise ValueError(f"Неверное значение '{value}'") from None
+    return convert
+
+
+# Поля задачи, которые изменяет TaskManager.patch, и функции,
+# приводящие значение к виду, в котором оно хранится в записи задачи
+_patchable: dict[str, Callable] = {
+    "title": _text,
+    "description": _description,
+    "category": _text,
+    "due_date": _due_date,
+    "priority": _member(Priority),
+    "status": _member(Status)
+}
+
+
+def check_field(name: str, value):
+    """Проверяет значение поля задачи и приводит его к виду, в котором
+    оно хранится в записи задачи (так же, как TaskManager.patch)
+
+    Args:
+        name (str): название поля
+        value: значение
+
+    Raises:
+        ValueError: если поле нельзя изменить или значение неверно
+
+    Returns:
+        значение поля
+    """
+    if name not in _patchable:
+        raise ValueError(f"Поле '{name}' нельзя изменить")
+    return _patchable[name](value)
+
+
+def _reader(method: Callable) -> Callable:
+    """Декоратор метода чтения: в потокобезопасном режиме метод
+    выполняется в блоке чтения (см. TaskManager._snapshot)"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._rwlock is None:
+            return method(self, *args, **kwargs)
+        with self._snapshot():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _writer(method: Callable) -> Callable:
+    """Декоратор метода изменения: в потокобезопасном режиме
+    методы изменения выполняются по одному"""
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._serial:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class TaskManager:
     """Менеджер задач.
     Этот класс непосредственно работает с базой данных"""
 
-    def __init__(self, file: str) -> None:
+    def __init__(
+        self, file: str, backend: Optional[str] = None,
+        exclusive: bool = False, thread_safe: bool = False,
+        cache_size: int = 256, cache_ttl: Optional[float] = None, **options
+    ) -> None:
         """
         Args:
-            file (str): путь к файлу базы данных
+            file (str): путь к файлу (или каталогу) базы данных
+            backend (Optional[str], optional): тип хранилища: "json" - один
+                JSON-файл, "jsonl" - файл JSON Lines, "journal" - JSON-снимок
+                с журналом изменений, "sqlite" - база данных SQLite, "mapped" -
+                записи фиксированного размера, отображенные в память, "sharded" -
+                каталог с отдельным файлом для каждой категории.
+                По умолчанию определяется по расширению файла (.jsonl - JSON Lines,
+                .sqlite, .sqlite3, .db - SQLite, .tmdb - записи фиксированного
+                размера, .shards или существующий каталог - по категориям, иначе JSON).
+            exclusive (bool, optional): если True, база данных изменяется только
+                через этот менеджер: загруженные задачи не сверяются с хранилищем,
+                и чтение не обращается к диску. По умолчанию False.
+            thread_safe (bool, optional): если True, менеджер можно вызывать
+                из нескольких потоков: чтение выполняется параллельно над
+                задачами в памяти, а изменения - по одному. Запись на диск
+                выполняется после применения изменения в памяти и не
+                задерживает читателей. По умолчанию False.
+            cache_size (int, optional): сколько результатов поиска и выборок
+                по категории хранит кэш результатов (0 - кэш выключен).
+                По умолчанию 256.
+            cache_ttl (Optional[float], optional): время жизни результата
+                в кэше в секундах. По умолчанию не ограничено.
+            options: параметры хранилища (см. open_storage), например
+                snapshot=True - хранить бинарный снимок JSON-базы данных
+
+        Raises:
+            ValueError: если тип хранилища неизвестен
         """
+        exists = os.path.exists(file)
         self.file = file
-        if not os.path.isfile(file):
-            with open(self.file, "w", encoding="utf-8"):
-                print(colorama.Back.YELLOW + f"База данных '{file}' не найдена")
-                print(colorama.Back.GREEN + f"Создана новая база данных '{file}'")
+        self.exclusive = exclusive
+        self.storage = open_storage(file, backend, **options)
+        self.cache_hits = 0
+        self.cache_reloads = 0
+        self._tasks: Optional[dict[int, dict]] = None
+        self._signature: Optional[tuple] = None
+        self._indexes = {
+            "category": HashIndex(lambda task: task['category'].lower()),
+            "status": HashIndex(lambda task: task['status']),
+            "priority": HashIndex(lambda task: task['priority']),
+            "due_date": SortedIndex(lambda task: date.fromisoformat(task['due_date']).toordinal())
+        }
+        # Полнотекстовый индекс строится при первом поиске
+        self._text_index = TextIndex({"title": 2.0, "description": 1.0})
+        self._text_index_ready = False
+        self._text_index_lock = threading.Lock()
+        self._max_id: Optional[int] = None
+        # Кэш результатов поиска и выборок по категории. Ключ включает версию
+        # данных, от которых зависит результат: data_version увеличивается
+        # при любом изменении задач, а версия категории - только при изменении
+        # задач этой категории, поэтому выборки других категорий остаются в кэше
+        self._results = ResultCache(cache_size, cache_ttl)
+        self.data_version = 0
+        self._category_versions: dict[str, int] = {}
+        # Операции, накопленные внутри batch(), или None вне пакета
+        self._pending: Optional[list[tuple]] = None
+        # Потокобезопасный режим: блокировка читателей и писателя над задачами
+        # в памяти и взаимное исключение методов изменения
+        self._rwlock = RWLock() if thread_safe else None
+        self._serial = threading.RLock() if thread_safe else nullcontext()
+        # Изменения применены к кэшу, но еще записываются в хранилище
+        self._unsaved = False
+        if not exists:
+            print(colorama.Back.YELLOW + f"База данных '{file}' не найдена")
+            print(colorama.Back.GREEN + f"Создана новая база данных '{file}'")
         else:
             print(colorama.Back.GREEN + f"Подключено к базе данных '{file}'")
 
     @property
+    @_reader
     def tasks(self) -> list[dict]:
-        """Возвращает список задач
+        """Возвращает список задач.
+        Файл базы данных перечитывается только если он изменился
+        с момента последнего чтения
 
         Returns:
             list[dict]: список задач
         """
-        with open(self.file, "r", encoding="utf-8") as json_file:
+        return list(self._load().values())
+
+    @_reader
+    def iter_tasks(self, predicate: Optional[Callable[[dict], bool]] = None) -> Iterator[dict]:
+        """Перебирает задачи, не загружая их все в память.
+        Если задачи уже загружены и не устарели, перебираются они,
+        иначе задачи читаются из хранилища по одной (для JSON и JSON Lines
+        - потоковым разбором файла), и первые результаты доступны
+        до прочтения всего файла
+
+        Args:
+            predicate (Optional[Callable[[dict], bool]], optional): фильтр задач
+
+        Yields:
+            dict: задача
+        """
+        tasks = self._fresh_tasks()
+        source = self.storage.iter_tasks() if tasks is None else list(tasks.values())
+        return filter(predicate, source) if predicate else iter(source)
+
+    @stats.timed()
+    @_writer
+    def refresh(self) -> None:
+        """Принудительно перечитывает файл базы данных"""
+        with self._exclusive():
+            self.invalidate()
+            self._load()
+
+    def invalidate(self) -> None:
+        """Сбрасывает кэш задач. Следующее обращение перечитает файл"""
+        with self._exclusive():
+            self._tasks = None
+            self._signature = None
+
+    @contextmanager
+    def batch(self) -> Iterator["TaskManager"]:
+        """Пакетное изменение задач. Все изменения внутри блока with
+        применяются в памяти и сохраняются в хранилище одной записью
+        при выходе из блока. Если в блоке возникло исключение,
+        изменения отменяются. Вложенные пакеты объединяются с внешним
+
+        Пример:
+            with manager.batch():
+                manager.add_task(task)
+                manager.change_task(1, status=Status.done)
+
+        Yields:
+            TaskManager: этот же менеджер задач
+        """
+        if self._pending is not None:
+            yield self
+            return
+
+        with self._serial:
+            with self.stage() as ops:
+                yield self
+            self.__sync(ops, applied=True)
+
+    transaction = batch
+
+    @contextmanager
+    def stage(self) -> Iterator[list[tuple]]:
+        """Как batch, но изменения не сохраняются при выходе из блока:
+        операции добавляются в возвращаемый список, и сохранить их нужно
+        методом persist. До сохранения кэш менеджера новее хранилища,
+        поэтому запись можно выполнить в другом потоке, пока менеджер
+        отвечает на запросы на чтение (см. модуль server)
+
+        Yields:
+            list[tuple]: список операций (заполняется при выходе из блока)
+
+        Raises:
+            RuntimeError: если изменения уже накапливаются в пакете
+        """
+        with self._serial:
+            if self._pending is not None:
+                raise RuntimeError("Изменения уже накапливаются в пакете")
+
+            self._load()
+            self._pending = []
+            staged = []
             try:
-                return json.load(json_file)
-            except json.JSONDecodeError:
-                return []
+                yield staged
+            except BaseException:
+                # В хранилище ничего не записано: отмена - это перечитывание
+                self._pending = None
+                self.invalidate()
+                raise
+            staged.extend(self._pending)
+            self._pending = None
+
+    @_writer
+    def persist(self, ops: list[tuple]) -> None:
+        """Сохраняет в хранилище операции, накопленные в stage
+
+        Args:
+            ops (list[tuple]): список операций
+        """
+        self.__sync(ops, applied=True)
+
+    @stats.timed()
+    @_writer
+    def compact(self) -> None:
+        """Уплотняет хранилище (например, переносит журнал изменений в снимок
+        или вырезает из JSON-файла задачи, отмеченные надгробиями)"""
+        # Незагруженные задачи хранилище уплотняет потоково, не читая их в память
+        if self.storage.incremental or (self.storage.streaming and self._tasks is None):
+            self.storage.compact()
+            return
+        tasks = self.tasks
+        # Если хранилище изменил другой процесс после чтения задач,
+        # хранилище не использует их (см. Storage.compact)
+        self.storage.compact(tasks, None if self.exclusive else self._signature)
 
+    def compaction_stats(self) -> dict:
+        """Возвращает статистику уплотнения хранилища (см. Storage.compaction_stats)
+
+        Returns:
+            dict: статистика
+        """
+        return self.storage.compaction_stats()
+
+    def close(self) -> None:
+        """Закрывает хранилище"""
+        self.storage.close()
+
+    @_reader
     def get_new_id(self) -> int:
-        """Возвращает уникальный id для новой задачи
+        """Возвращает уникальный id для новой задачи, не резервируя его.
+        id только растут: id удаленных задач не выдаются повторно
 
         Returns:
             int: id
         """
-        ids = [task['id'] for task in self.tasks]
-        return max(ids, default=0) + 1
+        return self.storage.next_id(self._id_floor())
 
+    @stats.timed()
+    @_reader
     def get_task_from_id(self, task_id: int) -> Task:
         """Возвращает объект Task по id
 
@@ -60,19 +352,10 @@ class TaskManager:
         Returns:
             Task: объект задачи
         """
-        for task in self.tasks:
-            if task['id'] == task_id:
-                return Task(
-                    title=task['title'],
-                    description=task['description'],
-                    category=task['category'],
-                    due_date=datetime.strptime(task['due_date'], "%Y-%m-%d").date(),
-                    priority=task['priority'],
-                    id=task['id'],
-                    status=task['status']
-                )
-        raise ValueError(f"Задачи с id '{task_id}' не существует")
+        return self._to_task(self._get_existing_record(task_id))
 
+    @stats.timed()
+    @_reader
     def task_exists(self, task_id: int) -> bool:
         """Определяет, существует ли задача с указанным id
 
@@ -82,7 +365,123 @@ class TaskManager:
         Returns:
             bool: True/False
         """
-        return any([task['id'] == task_id for task in self.tasks])
+        return self._get_record(task_id) is not None
+
+    @stats.timed()
+    @_reader
+    def tasks_for_category(self, category: str) -> list[dict]:
+        """Возвращает задачи категории (без учета регистра)
+
+        Args:
+            category (str): категория задач
+
+        Returns:
+            list[dict]: список задач
+        """
+        if self._native("category"):
+            return self.storage.find(category=category)
+        self._load()
+        key = category.lower()
+        return self._cached(
+            ("category", key, self._category_versions.get(key, 0)),
+            lambda: self._lookup("category", key)
+        )
+
+    @stats.timed()
+    @_reader
+    def tasks_with_status(self, status: Status) -> list[dict]:
+        """Возвращает задачи с указанным статусом
+
+        Args:
+            status (Status): статус задачи
+
+        Returns:
+            list[dict]: список задач
+        """
+        if self._native("status"):
+            return self.storage.find(status=status)
+        return self._lookup("status", status)
+
+    @stats.timed()
+    @_reader
+    def tasks_with_priority(self, priority: Priority) -> list[dict]:
+        """Возвращает задачи с указанным приоритетом
+
+        Args:
+            priority (Priority): приоритет задачи
+
+        Returns:
+            list[dict]: список задач
+        """
+        return self._lookup("priority", priority)
+
+    @stats.timed()
+    @_reader
+    def tasks_due(
+        self, start: Optional[date] = None, end: Optional[date] = None,
+        status: Optional[Status] = None, limit: Optional[int] = None
+    ) -> list[dict]:
+        """Возвращает задачи со сроком выполнения с start по end включительно,
+        упорядоченные по сроку выполнения. Задачи берутся из упорядоченного
+        индекса по сроку выполнения за O(log n + k)
+
+        Args:
+            start (Optional[date], optional): начало периода. По умолчанию не ограничено.
+            end (Optional[date], optional): конец периода. По умолчанию не ограничен.
+            status (Optional[Status], optional): статус задач. По умолчанию любой.
+            limit (Optional[int], optional): максимальное количество результатов
+
+        Returns:
+            list[dict]: список задач
+        """
+        tasks = self._load()
+        ids = self._indexes["due_date"].range(
+            None if start is None else start.toordinal(),
+            None if end is None else end.toordinal() + 1
+        )
+        found = (tasks[task_id] for task_id in ids)
+        if status is not None:
+            found = (task for task in found if task['status'] == status)
+        return list(itertools.islice(found, limit))
+
+    def overdue_tasks(self, today: Optional[date] = None) -> list[dict]:
+        """Возвращает невыполненные задачи, срок выполнения которых прошел
+
+        Args:
+            today (Optional[date], optional): текущая дата. По умолчанию сегодня.
+
+        Returns:
+            list[dict]: список задач по возрастанию срока выполнения
+        """
+        today = today or date.today()
+        return self.tasks_due(end=today - timedelta(days=1), status=Status.not_done)
+
+    def upcoming_tasks(self, days: int = 7, today: Optional[date] = None) -> list[dict]:
+        """Возвращает невыполненные задачи, срок выполнения которых
+        наступает сегодня или не позже чем через days дней
+
+        Args:
+            days (int, optional): количество дней. По умолчанию 7.
+            today (Optional[date], optional): текущая дата. По умолчанию сегодня.
+
+        Returns:
+            list[dict]: список задач по возрастанию срока выполнения
+        """
+        today = today or date.today()
+        return self.tasks_due(today, today + timedelta(days=days), status=Status.not_done)
+
+    def nearest_deadlines(self, count: int, today: Optional[date] = None) -> list[dict]:
+        """Возвращает count невыполненных задач с ближайшими сроками выполнения,
+        которые еще не прошли
+
+        Args:
+            count (int): количество задач
+            today (Optional[date], optional): текущая дата. По умолчанию сегодня.
+
+        Returns:
+            list[dict]: список задач по возрастанию срока выполнения
+        """
+        return self.tasks_due(today or date.today(), status=Status.not_done, limit=count)
 
     def add_task(self, task: Task) -> None:
         """Добавляет задачу в базу данных
@@ -90,51 +489,169 @@ class TaskManager:
         Args:
             task (Task): объект задачи
         """
-        tasks = self.tasks
-        task_json = task.to_json()
-        extra = {
-            "id": self.get_new_id(),
-            "status": str(Status.not_done)
-        }
-        tasks.append(task_json | extra)
-        self.__rewrite_tasks(new_data=tasks)
+        self.add_tasks([task])
 
-    def change_task(self, task_id: int, **kwargs) -> None:
-        """Редактирует задачу
+    @stats.timed()
+    @_writer
+    def add_tasks(self, tasks: Iterable[Task]) -> list[int]:
+        """Добавляет несколько задач в базу данных одной записью
+
+        Args:
+            tasks (Iterable[Task]): объекты задач
+
+        Returns:
+            list[int]: id добавленных задач
+        """
+        tasks = list(tasks)
+        if not tasks:
+            return []
+        start = self.storage.allocate_ids(len(tasks), self._id_floor())
+        ops = [
+            (ADD, task.to_json() | {"id": task_id, "status": str(Status.not_done)})
+            for task_id, task in zip(itertools.count(start), tasks)
+        ]
+        self.__commit(ops=ops)
+        return [op[1]['id'] for op in ops]
+
+    @stats.timed()
+    def change_task(self, task_id: int, version: Optional[str] = None, **kwargs) -> None:
+        """Редактирует задачу. Пустые значения полей не меняют задачу,
+        остальные - как в patch
 
         Args:
             task_id (int): id задачи
+            version (Optional[str], optional): версия задачи (см. task_version),
+                на основе которой сделано изменение
+
+        Raises:
+            ValueError: если задача не найдена или значение поля неверно
+            ConflictError: если задача изменилась после чтения версии version
         """
-        
-        task: Task = self.get_task_from_id(task_id)
-
-        if (title := kwargs.get('title')):
-            task.title = title
-            
-        if (description := kwargs.get('description')):
-            task.description = description
-        
-        if (category := kwargs.get('category')):
-            task.category = category
-        
-        if (due_date := kwargs.get('due_date')):
-            task.due_date = due_date
-            
-        if (priority := kwargs.get('priority')):
-            task.priority = priority
-            
-        if (status := kwargs.get('status')):
-            task.status = status
-
-        tasks = []
-        for item in self.tasks:
-            if item['id'] == task_id:
-                tasks.append(task.to_json())
-            else:
-                tasks.append(item)
+        self.patch(task_id, version, **{key: value for key, value in kwargs.items() if value})
 
-        self.__rewrite_tasks(new_data=tasks)
+    @stats.timed()
+    @_writer
+    def patch(self, task_id: int, version: Optional[str] = None, **fields) -> None:
+        """Изменяет поля задачи. Значения проверяются и записываются прямо
+        в запись задачи, без создания объекта Task, а хранилище получает
+        только действительно измененные поля (JSON-хранилище дописывает
+        их в файл надгробий, не перезаписывая базу данных). Если ни одно
+        поле не меняется, хранилище не изменяется.
 
+        Без version изменение накладывается на актуальное состояние задачи:
+        поля, измененные тем временем другими процессами, сохраняются.
+        С version изменение выполняется, только если задача не менялась
+        с момента чтения этой версии (оптимистическая блокировка)
+
+        Пример:
+            manager.patch(1, status=Status.done)
+            manager.patch(2, title="Отчет", due_date="2124-01-01")
+
+        Args:
+            task_id (int): id задачи
+            version (Optional[str], optional): версия задачи (см. task_version),
+                на основе которой сделано изменение
+            fields: новые значения полей title, description, category,
+                due_date (date или строка ГГГГ-ММ-ДД), priority, status.
+                None - поле не меняется
+
+        Raises:
+            ValueError: если задача не найдена, поле нельзя изменить
+                или значение неверно
+            ConflictError: если задача изменилась после чтения версии version
+        """
+        op = self._patch_op(task_id, fields)
+        if version is not None:
+            if record_version(op[1]) != version:
+                raise ConflictError(f"Задача с id '{task_id}' была изменена")
+            # Операция помечается как изменение по версии: в пакете она
+            # сохраняется позже и тоже не должна затереть чужие изменения
+            op += (True,)
+        if op[2]:
+            self.__commit(ops=[op], strict=version is not None)
+
+    @_reader
+    def task_version(self, task_id: int) -> str:
+        """Возвращает версию задачи - хеш ее содержимого. Версия меняется
+        при любом изменении задачи
+
+        Args:
+            task_id (int): id задачи
+
+        Raises:
+            ValueError: если задача не найдена
+
+        Returns:
+            str: версия
+        """
+        return record_version(self._get_existing_record(task_id))
+
+    @stats.timed()
+    @_writer
+    def change_tasks(self, changes: dict[int, dict]) -> None:
+        """Редактирует несколько задач одной записью
+
+        Args:
+            changes (dict[int, dict]): id задачи -> новые значения полей
+                (как в change_task)
+
+        Raises:
+            ValueError: если какой-либо задачи не существует. В этом случае
+                ни одна задача не изменяется
+        """
+        self.__commit(ops=[
+            self._patch_op(task_id, {key: value for key, value in fields.items() if value})
+            for task_id, fields in changes.items()
+        ])
+
+    @stats.timed()
+    @_writer
+    def delete_tasks(self, task_ids: Iterable[int]) -> int:
+        """Удаляет несколько задач одной записью
+
+        Args:
+            task_ids (Iterable[int]): id задач
+
+        Raises:
+            ValueError: если какой-либо задачи не существует. В этом случае
+                ни одна задача не удаляется
+
+        Returns:
+            int: количество удаленных задач
+        """
+        ops = [
+            (DELETE, self._get_existing_record(task_id))
+            for task_id in dict.fromkeys(task_ids)
+        ]
+        self.__commit(ops=ops)
+        return len(ops)
+
+    def _patch_op(self, task_id: int, fields: dict) -> tuple:
+        """Возвращает операцию изменения полей задачи (см. patch)
+
+        Args:
+            task_id (int): id задачи
+            fields (dict): новые значения полей
+
+        Raises:
+            ValueError: если задача не найдена, поле нельзя изменить
+                или значение неверно
+
+        Returns:
+            tuple: операция PATCH с действительно измененными полями
+        """
+        item = self._get_existing_record(task_id)
+        changed = {}
+        for name, value in fields.items():
+            if value is None:
+                continue
+            value = check_field(name, value)
+            if item.get(name) != value:
+                changed[name] = value
+        return PATCH, item, changed
+
+    @stats.timed()
+    @_writer
     def delete_task_by_id(self, task_id: int) -> None:
         """Удаляет задачу по ее id
 
@@ -144,12 +661,10 @@ class TaskManager:
         Raises:
             ValueError: если task_id не существует
         """
-        if not self.task_exists(task_id):
-            raise ValueError(f"Задачи с id '{task_id}' не существует")
-
-        tasks = [task for task in self.tasks if task['id'] != task_id]
-        self.__rewrite_tasks(new_data=tasks)
+        self.__commit(ops=[(DELETE, self._get_existing_record(task_id))])
 
+    @stats.timed()
+    @_writer
     def delete_task_by_category(self, category: str) -> int:
         """Удаляет задачи заданной категории
 
@@ -159,36 +674,640 @@ class TaskManager:
         Returns:
             int: количество удаленных задач
         """
-        number_of_deleted_tasks = 0
-        tasks = []
-        for task in self.tasks:
-            if task['category'] != category:
-                tasks.append(task)
+        dropped = self.__stream_delete(lambda task: task['category'] == category)
+        if dropped is not None:
+            return dropped
+        ops = [
+            (DELETE, task) for task in self.tasks_for_category(category)
+            if task['category'] == category
+        ]
+        self.__commit(ops=ops)
+        return len(ops)
+
+    def __stream_delete(self, drop: Callable[[dict], bool]) -> Optional[int]:
+        """Удаляет задачи потоковой перезаписью хранилища (см. Storage.rewrite),
+        если задачи еще не загружены в память, а хранилище это умеет:
+        тогда в памяти не оказываются ни все задачи, ни их отфильтрованная
+        копия, и память не зависит от размера базы данных
+
+        Args:
+            drop (Callable[[dict], bool]): условие удаления задачи
+
+        Returns:
+            Optional[int]: количество удаленных задач или None, если
+                задачи нужно удалить обычным способом
+        """
+        if not self.storage.streaming or self._tasks is not None or self._pending is not None:
+            return None
+        with self.storage.lock:
+            with self._exclusive():
+                if self._tasks is not None:
+                    return None
+                dropped, last = self.storage.rewrite(drop)
+                if dropped:
+                    self.storage.reserve_ids(last + 1)
+                    self.invalidate()
+        return dropped
+
+    @stats.timed()
+    @_reader
+    def search_task(self, query: str, limit: Optional[int] = None) -> list[dict]:
+        """Поиск по ключевым словам, категории или статусу выполнения.
+
+        Слова ищутся в заголовке и описании задачи по полнотекстовому
+        индексу (см. TextIndex): несколько слов через пробел - все слова
+        сразу, через OR - любое из них, слово со * на конце - поиск по
+        префиксу. Результаты упорядочены по релевантности, после них
+        идут задачи, категория или статус которых совпадают с запросом
+
+        Args:
+            query (str): запрос
+            limit (Optional[int], optional): максимальное количество результатов
+
+        Returns:
+            list[dict]: список задач
+        """
+        tasks = self._load()
+        value = query.strip().lower()
+        # Регистр слов не важен, кроме оператора OR
+        operators = tuple(position for position, word in enumerate(query.split()) if word == "OR")
+
+        def search() -> list[dict]:
+            ids = dict.fromkeys(self._text_search(query, limit))
+            ids.update(dict.fromkeys(self._indexes["category"].get(value)))
+            ids.update(dict.fromkeys(self._indexes["status"].get(value)))
+            return [tasks[task_id] for task_id in itertools.islice(ids, limit)]
+
+        return self._cached(("search", value, operators, limit, self.data_version), search)
+
+    def cache_stats(self) -> dict:
+        """Возвращает метрики кэша результатов (см. ResultCache.stats)
+
+        Returns:
+            dict: метрики
+        """
+        return self._results.stats()
+
+    def _cached(self, key: tuple, compute: Callable[[], list]) -> list:
+        """Возвращает результат из кэша результатов, вычисляя его при промахе
+
+        Args:
+            key (tuple): ключ с версией данных, от которых зависит результат
+            compute (Callable[[], list]): вычисление результата
+
+        Returns:
+            list: копия результата
+        """
+        result = self._results.get(key)
+        if result is None:
+            stats.count("result_cache_misses")
+            result = compute()
+            self._results.put(key, result)
+        else:
+            stats.count("result_cache_hits")
+        return list(result)
+
+    @stats.timed()
+    @_reader
+    def query(self, **conditions) -> list[dict]:
+        """Возвращает задачи, удовлетворяющие всем условиям.
+
+        Для отбора кандидатов выбирается самый избирательный индекс
+        (полнотекстовый или хеш-индекс по категории, статусу или
+        приоритету), остальные условия проверяются за один проход по
+        кандидатам. Если подходящего индекса нет, просматриваются все
+        задачи. Пока задачи не загружены, а хранилище само выполняет
+        запросы по категории и статусу, запрос выполняет хранилище
+
+        Пример:
+            manager.query(category="работа", status=Status.not_done,
+                          due_before=date.today(), order_by="-priority", limit=10)
+
+        Args:
+            category (str, optional): категория (без учета регистра)
+            status (str, optional): статус
+            priority (str, optional): приоритет
+            due_before (date | str, optional): срок выполнения раньше указанной даты
+            due_after (date | str, optional): срок выполнения позже указанной даты
+            text (str, optional): запрос к заголовку и описанию (как в search_task)
+            order_by (str | Sequence[str], optional): поля сортировки,
+                "-" перед полем - по убыванию. Без сортировки задачи идут
+                по релевантности, если задан text, иначе по id
+            limit (int, optional): максимальное количество результатов
+
+        Raises:
+            ValueError: если поле сортировки не поддерживается
+
+        Returns:
+            list[dict]: список задач
+        """
+        query = Query(**conditions)
+        tasks = filter(query.matches, self._plan(query)[1])
+        if query.order_by is None and query.limit is not None:
+            return list(itertools.islice(tasks, query.limit))
+        return query.sort(tasks)
+
+    @_reader
+    def explain(self, **conditions) -> str:
+        """Возвращает план, по которому будет выполнен запрос query:
+        "storage" - запрос выполняет хранилище, "text" - кандидаты
+        берутся из полнотекстового индекса, "index:<поле>" - из хеш-индекса
+        по полю, "scan" - просматриваются все задачи
+
+        Args:
+            conditions: условия запроса (как в query)
+
+        Returns:
+            str: план запроса
+        """
+        return self._plan(Query(**conditions))[0]
+
+    @stats.timed()
+    @_writer
+    def delete_where(self, **conditions) -> int:
+        """Удаляет одной записью задачи, удовлетворяющие условиям запроса
+
+        Args:
+            conditions: условия запроса (как в query)
+
+        Raises:
+            ValueError: если не задано ни одного условия
+
+        Returns:
+            int: количество удаленных задач
+        """
+        ops = [(DELETE, task) for task in self._where(conditions)]
+        self.__commit(ops=ops)
+        return len(ops)
+
+    @stats.timed()
+    @_writer
+    def update_where(self, changes: dict, **conditions) -> int:
+        """Редактирует одной записью задачи, удовлетворяющие условиям запроса
+
+        Args:
+            changes (dict): новые значения полей (как в change_task)
+            conditions: условия запроса (как в query)
+
+        Raises:
+            ValueError: если не задано ни одного условия
+
+        Returns:
+            int: количество измененных задач
+        """
+        tasks = self._where(conditions)
+        self.change_tasks({task['id']: changes for task in tasks})
+        return len(tasks)
+
+    def _where(self, conditions: dict) -> list[dict]:
+        """Возвращает задачи для пакетного изменения или удаления
+
+        Args:
+            conditions (dict): условия запроса
+
+        Raises:
+            ValueError: если не задано ни одного условия
+
+        Returns:
+            list[dict]: список задач
+        """
+        if not Query(**conditions).conditions():
+            raise ValueError("Не задано ни одного условия")
+        return self.query(**conditions)
+
+    def _plan(self, query: Query) -> tuple[str, Iterable[dict]]:
+        """Выбирает способ отбора кандидатов для запроса
+
+        Args:
+            query (Query): запрос
+
+        Returns:
+            tuple[str, Iterable[dict]]: план запроса (см. explain) и кандидаты
+        """
+        conditions = query.conditions()
+        if conditions and all(self._native(condition) for condition in conditions):
+            return "storage", self.storage.find(query.category, query.status)
+
+        tasks = self._load()
+        # Самый избирательный индекс: (количество кандидатов, поле, функция, возвращающая id)
+        best = None
+        for name in ("category", "status", "priority"):
+            value = getattr(query, name)
+            if value is not None:
+                index = self._indexes[name]
+                count = index.count(value)
+                if best is None or count < best[0]:
+                    best = count, name, lambda index=index, value=value: index.get(value)
+        if query.due_before is not None or query.due_after is not None:
+            index, bounds = self._indexes["due_date"], query.due_range()
+            count = index.count(*bounds)
+            if best is None or count < best[0]:
+                best = count, "due_date", lambda: index.range(*bounds)
+
+        if query.text is not None:
+            ranked = self._text_search(query.text)
+            if best is None or len(ranked) <= best[0]:
+                return "text", (tasks[task_id] for task_id in ranked)
+            rank = {task_id: position for position, task_id in enumerate(ranked)}
+            ids = [task_id for task_id in best[2]() if task_id in rank]
+            ids.sort(key=rank.__getitem__)
+        elif best is not None:
+            ids = sorted(best[2]())
+        else:
+            return "scan", tasks.values()
+        return f"index:{best[1]}", (tasks[task_id] for task_id in ids)
+
+    def _text_search(self, query: str, limit: Optional[int] = None) -> list[int]:
+        """Ищет задачи по полнотекстовому индексу, строя его при первом поиске
+
+        Args:
+            query (str): запрос
+            limit (Optional[int], optional): максимальное количество результатов
+
+        Returns:
+            list[int]: id задач по убыванию релевантности
+        """
+        tasks = self._load()
+        if not self._text_index_ready:
+            # Индекс может строиться при чтении, поэтому потоки строят его по очереди
+            with self._text_index_lock:
+                if not self._text_index_ready:
+                    with stats.timer("TextIndex.rebuild"):
+                        self._text_index.rebuild(tasks.values())
+                    self._text_index_ready = True
+        return self._text_index.search(query, limit)
+
+    def __commit(self, ops: list[tuple], strict: bool = False) -> None:
+        """Применяет операции к кэшу и сохраняет их в хранилище.
+        Если хранилищу достаточно самих операций, а задачи еще не
+        загружены, операции сохраняются без загрузки задач
+
+        Args:
+            ops (list[tuple]): список операций
+            strict (bool, optional): см. _rebase
+        """
+        if not ops:
+            return
+        if self._pending is not None:
+            with self._exclusive():
+                self._apply(ops)
+            self._pending.extend(ops)
+            return
+        if self.storage.incremental and self._tasks is None and not strict:
+            self.__store(ops)
+            return
+        self.__sync(ops, applied=False, strict=strict)
+
+    def __sync(self, ops: list[tuple], applied: bool, strict: bool = False) -> None:
+        """Сохраняет операции под межпроцессной блокировкой хранилища.
+        Если хранилище тем временем изменил другой процесс, задачи
+        перечитываются, и операции накладываются на новое состояние,
+        поэтому чужие изменения не теряются. Операции применяются к кэшу
+        в блоке записи, а сохраняются уже после него: читатели из других
+        потоков не ждут записи на диск
+
+        Args:
+            ops (list[tuple]): список операций
+            applied (bool): применены ли операции к кэшу
+            strict (bool, optional): см. _rebase
+        """
+        if not ops:
+            return
+        with self.storage.lock:
+            with self._exclusive():
+                if self._tasks is None or (
+                    not self.exclusive and self.storage.signature() != self._signature
+                ):
+                    self.invalidate()
+                    self._load()
+                    applied = False
+                if not applied:
+                    try:
+                        ops = self._rebase(ops, strict)
+                    except BaseException:
+                        # Часть операций уже применена к кэшу, а хранилище
+                        # не изменено: следующее чтение перечитает его
+                        self.invalidate()
+                        raise
+                self._unsaved = True
+            try:
+                self.__persist(ops)
+            finally:
+                self._unsaved = False
+
+    def _rebase(self, ops: list[tuple], strict: bool) -> list[tuple]:
+        """Накладывает операции на загруженные задачи и применяет их.
+        Изменение задачи сохраняет только поля, которые действительно
+        меняются; удаление уже удаленной задачи пропускается
+
+        Args:
+            ops (list[tuple]): список операций
+            strict (bool): если True, изменение задачи, которая отличается
+                от записи в операции, не выполняется. Для изменений по версии
+                (операция PATCH с четвертым элементом True) это проверяется всегда
+
+        Raises:
+            ValueError: если изменяемой задачи больше не существует
+            ConflictError: если strict и задача изменилась
+
+        Returns:
+            list[tuple]: примененные операции
+        """
+        rebased = []
+        for op in ops:
+            kind, record = op[0], op[1]
+            if kind != ADD:
+                current = self._tasks.get(record['id'])
+                if current is None:
+                    if kind == DELETE:
+                        continue
+                    raise TaskNotFoundError(f"Задачи с id '{record['id']}' не существует")
+                if (strict or op[3:] == (True,)) and current != record:
+                    raise ConflictError(f"Задача с id '{record['id']}' была изменена")
+                if kind == DELETE:
+                    op = (DELETE, current)
+                else:
+                    fields = {key: value for key, value in op[2].items() if current.get(key) != value}
+                    if not fields:
+                        continue
+                    op = (PATCH, current, fields)
+            # Операции применяются по одной: следующая может изменять
+            # задачу, добавленную предыдущей
+            self._apply([op])
+            rebased.append(op)
+        return rebased
+
+    def __persist(self, ops: list[tuple]) -> None:
+        """Сохраняет в хранилище операции, уже примененные к кэшу
+
+        Args:
+            ops (list[tuple]): список операций
+        """
+        if not ops:
+            return
+        try:
+            self.__store(ops)
+        except Exception:
+            # Кэш уже изменен, а хранилище - нет: следующее чтение перечитает его
+            self.invalidate()
+            raise
+        self._signature = self.storage.signature()
+
+    def __store(self, ops: list[tuple]) -> None:
+        """Записывает операции в хранилище. Если удаляется задача
+        с наибольшим id, хранилище запоминает его, чтобы не выдать повторно
+
+        Args:
+            ops (list[tuple]): список операций
+        """
+        self.storage.commit(ops, None if self.storage.incremental else self._tasks.values())
+        deleted = [op[1]['id'] for op in ops if op[0] == DELETE]
+        if deleted:
+            self.storage.reserve_ids(max(deleted) + 1)
+
+    def _id_floor(self) -> Optional[int]:
+        """Возвращает наибольший id загруженных задач + 1.
+        Если задачи не загружены, а хранилище само находит задачи по id,
+        возвращает None: хранилище вычислит его само
+
+        Returns:
+            Optional[int]: наименьший допустимый id новой задачи
+        """
+        if self._native("id") and self._pending is None:
+            return None
+        tasks = self._load()
+        if self._max_id is None:
+            self._max_id = max(tasks, default=0)
+        return self._max_id + 1
+
+    def _apply(self, ops: list[tuple]) -> None:
+        """Применяет операции к загруженным задачам и индексам.
+        Записи задач не изменяются на месте, а заменяются новыми
+
+        Args:
+            ops (list[tuple]): список операций
+        """
+        for op in ops:
+            kind, record = op[0], op[1]
+            self._bump(record['category'])
+            if kind == PATCH and "category" in op[2]:
+                self._bump(op[2]['category'])
+            if kind == ADD:
+                record = compact_record(record)
+                self._tasks[record['id']] = record
+                if self._max_id is not None:
+                    self._max_id = max(self._max_id, record['id'])
+                for index in self._all_indexes():
+                    index.add(record)
+            elif kind == PATCH:
+                old = self._tasks[record['id']]
+                new = compact_record(old | op[2])
+                self._tasks[record['id']] = new
+                for index in self._all_indexes():
+                    index.update(old, new)
             else:
-                number_of_deleted_tasks += 1
-        self.__rewrite_tasks(new_data=tasks)
-        return number_of_deleted_tasks
+                old = self._tasks.pop(record['id'])
+                if old['id'] == self._max_id:
+                    self._max_id = None
+                for index in self._all_indexes():
+                    index.remove(old)
 
-    def search_task(self, query: str) -> list[dict]:
-        """Поиск по ключевым словам, категории или статусу выполнения
+    def _bump(self, category: str) -> None:
+        """Увеличивает версию данных и версию категории: результаты
+        в кэше, вычисленные по прежним версиям, больше не используются
+
+        Args:
+            category (str): категория измененной задачи
+        """
+        self.data_version += 1
+        key = category.lower()
+        self._category_versions[key] = self._category_versions.get(key, 0) + 1
+
+    def _all_indexes(self) -> list:
+        """Возвращает все индексы, которые нужно обновлять при изменениях
+
+        Returns:
+            list: список индексов
+        """
+        indexes = list(self._indexes.values())
+        if self._text_index_ready:
+            indexes.append(self._text_index)
+        return indexes
+
+    def _lookup(self, index: str, value) -> list[dict]:
+        """Возвращает задачи по значению индекса
+
+        Args:
+            index (str): название индекса
+            value: значение ключа индекса
 
         Returns:
             list[dict]: список задач
         """
-        query = query.lower()
-        tasks = []
-        for task in self.tasks:
-            if (query in task['title'].lower().split() 
-                or query == task['category'].lower()
-                or query == task['status']):
-                    tasks.append(task)
-        return tasks
+        tasks = self._load()
+        return [tasks[task_id] for task_id in self._indexes[index].get(value)]
 
-    def __rewrite_tasks(self, new_data: list[dict]) -> None:
-        """Перезаписывает файл базы данных с новыми данными
+    def _native(self, query: str) -> bool:
+        """Определяет, нужно ли выполнить запрос средствами хранилища:
+        так делается, если хранилище умеет выполнять такой запрос,
+        а задачи еще не загружены в память
 
         Args:
-            new_data (list[dict]): новые данные
+            query (str): вид запроса (см. Storage.native_queries)
+
+        Returns:
+            bool: True/False
         """
-        with open(self.file, "w", encoding="utf-8") as json_file:
-            json.dump(new_data, json_file, ensure_ascii=False, indent=4)
+        return self._tasks is None and query in self.storage.native_queries
+
+    def _get_record(self, task_id: int) -> Optional[dict]:
+        """Возвращает запись задачи по id
+
+        Args:
+            task_id (int): id задачи
+
+        Returns:
+            Optional[dict]: запись задачи или None
+        """
+        if self._native("id"):
+            return self.storage.get(task_id)
+        return self._load().get(task_id)
+
+    def _get_existing_record(self, task_id: int) -> dict:
+        """Возвращает запись существующей задачи по id
+
+        Args:
+            task_id (int): id задачи
+
+        Raises:
+            ValueError: если задача не найдена
+
+        Returns:
+            dict: запись задачи
+        """
+        task = self._get_record(task_id)
+        if task is None:
+            raise TaskNotFoundError(f"Задачи с id '{task_id}' не существует")
+        return task
+
+    @staticmethod
+    @stats.timed()
+    def _to_task(task: dict) -> Task:
+        """Преобразует запись задачи в объект Task
+
+        Args:
+            task (dict): запись задачи
+
+        Returns:
+            Task: объект задачи
+        """
+        return Task(
+            title=task['title'],
+            description=task['description'],
+            category=task['category'],
+            due_date=datetime.strptime(task['due_date'], "%Y-%m-%d").date(),
+            priority=task['priority'],
+            id=task['id'],
+            status=task['status']
+        )
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[None]:
+        """Блок изменения задач в памяти: в потокобезопасном режиме
+        читатели ждут его окончания"""
+        if self._rwlock is None:
+            yield
+            return
+        with self._serial, self._rwlock.write():
+            yield
+
+    @contextmanager
+    def _snapshot(self) -> Iterator[None]:
+        """Блок чтения потокобезопасного режима. Устаревшие задачи
+        перечитываются до начала блока (в блоке записи), а внутри блока
+        не перечитываются, даже если хранилище изменил другой процесс:
+        читатель видит задачи такими, какими они были в начале блока"""
+        if self._rwlock.reading() or self._rwlock.writing():
+            yield
+            return
+        while True:
+            self._load()
+            with self._rwlock.read():
+                # Между загрузкой и началом блока кэш мог быть сброшен
+                if self._tasks is not None:
+                    yield
+                    return
+
+    def _reading(self) -> bool:
+        """Определяет, выполняет ли текущий поток блок чтения
+        потокобезопасного режима
+
+        Returns:
+            bool: True/False
+        """
+        return self._rwlock is not None and self._rwlock.reading()
+
+    def _fresh_tasks(self) -> Optional[dict[int, dict]]:
+        """Возвращает закэшированные задачи, если они не устарели,
+        не перечитывая хранилище
+
+        Returns:
+            Optional[dict[int, dict]]: задачи по id или None
+        """
+        if self._pending is not None or (self._unsaved and self._tasks is not None):
+            return self._tasks
+        if self._tasks is not None and (
+            self.exclusive or self._reading() or self.storage.signature() == self._signature
+        ):
+            return self._tasks
+        return None
+
+    def _load(self) -> dict[int, dict]:
+        """Возвращает закэшированные задачи, перечитывая хранилище
+        только при изменении его отпечатка. При перечитывании индексы
+        строятся заново. Возвращаемый словарь нельзя изменять на месте.
+        В потокобезопасном режиме задачи перечитываются в блоке записи
+
+        Returns:
+            dict[int, dict]: задачи по id
+        """
+        if self._pending is not None or (self._unsaved and self._tasks is not None):
+            # Внутри пакета и во время сохранения кэш новее хранилища
+            self.cache_hits += 1
+            return self._tasks
+        if self._tasks is not None and (self.exclusive or self._reading()):
+            self.cache_hits += 1
+            return self._tasks
+
+        signature = self.storage.signature()
+        if self._tasks is not None and signature == self._signature:
+            self.cache_hits += 1
+            return self._tasks
+
+        # Отпечаток снят до чтения: если хранилище изменится во время
+        # чтения, следующее обращение просто перечитает его еще раз
+        with self._exclusive():
+            if self._rwlock is not None:
+                # Пока поток ждал блока записи, задачи мог перечитать
+                # или изменить другой поток
+                signature = self.storage.signature()
+                if self._tasks is not None and signature == self._signature:
+                    return self._tasks
+            with stats.timer("TaskManager.reload"):
+                if self.storage.compact_records:
+                    tasks = {task['id']: task for task in self.storage.load()}
+                else:
+                    tasks = {task['id']: compact_record(task) for task in self.storage.load()}
+                for index in self._indexes.values():
+                    index.rebuild(tasks.values())
+            stats.count("records_loaded", len(tasks))
+            self._text_index_ready = False
+            self._max_id = None
+            # Версии категорий не сбрасываются, а только растут: иначе ключи
+            # новых результатов совпали бы с ключами устаревших
+            self._results.clear()
+            self.data_version += 1
+            self._tasks = tasks
+            self._signature = signature
+            self.cache_reloads += 1
+        return tasks
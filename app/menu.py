@@ -4,7 +4,8 @@
 from actions import (
     show_tasks, show_tasks_for_category,
     add_task, change_task, mark_task_as_done,
-    delete_task_by_id, delete_task_by_category, search_task
+    delete_task_by_id, delete_task_by_category, search_task,
+    show_stats, show_overdue_tasks, show_upcoming_tasks
 )
 
 
@@ -20,6 +21,9 @@ def print_menu():
     print("6) Удалить задачу по ID")
     print("7) Удалить задачи по категории")
     print("8) Поиск задач")
+    print("9) Статистика")
+    print("10) Просроченные задачи")
+    print("11) Задачи с ближайшим сроком выполнения")
     print("0) Выход\n")
     
     
@@ -31,5 +35,8 @@ menu = {
     "5": mark_task_as_done,
     "6": delete_task_by_id,
     "7": delete_task_by_category,
-    "8": search_task
+    "8": search_task,
+    "9": show_stats,
+    "10": show_overdue_tasks,
+    "11": show_upcoming_tasks
 }
\ No newline at end of file
@@ -0,0 +1,28 @@
+# Утилита для переноса базы данных задач в другое хранилище.
+#
+# Пример: перенос JSON-базы данных в SQLite
+#     python3 app/migrate.py tasks.json tasks.sqlite3
+
+
+import argparse
+
+from storages import backends, migrate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Перенос базы данных задач в другое хранилище")
+    parser.add_argument("source", help="путь к исходной базе данных")
+    parser.add_argument("target", help="путь к новой базе данных")
+    parser.add_argument("--source-backend", choices=backends, help="тип исходного хранилища")
+    parser.add_argument("--target-backend", choices=backends, help="тип нового хранилища")
+    args = parser.parse_args()
+
+    try:
+        count = migrate(args.source, args.target, args.source_backend, args.target_backend)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Перенесено задач: {count}")
+
+
+if __name__ == "__main__":
+    main()
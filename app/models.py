@@ -1,6 +1,9 @@
 # Модуль, описывающий модели, с которыми работает менеджер задач
 
 
+import hashlib
+import json
+import sys
 from dataclasses import dataclass
 from datetime import date
 from enum import StrEnum
@@ -22,7 +25,7 @@ class Status(StrEnum):
     not_done = "не выполнена"
 
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     """Модель задачи"""
     
@@ -44,4 +47,41 @@ class Task:
             "id": self.id,
             "status": self.status
         }
-    
\ No newline at end of file
+
+
+# Поля записи задачи, значения которых повторяются во многих задачах
+_shared_fields = ("category", "status", "priority")
+
+
+def compact_record(record: dict) -> dict:
+    """Возвращает запись задачи, в которой ключи и повторяющиеся значения
+    (категория, статус, приоритет) заменены общими для всех записей
+    экземплярами строк. Так одинаковые строки хранятся в памяти один раз
+
+    Args:
+        record (dict): запись задачи
+
+    Returns:
+        dict: запись задачи
+    """
+    record = {sys.intern(key): value for key, value in record.items()}
+    for field in _shared_fields:
+        value = record.get(field)
+        if isinstance(value, str):
+            # Значения перечислений (Status, Priority) тоже становятся
+            # обычными строками, чтобы запись можно было сохранить в снимок
+            record[field] = sys.intern(str(value))
+    return record
+
+
+def record_version(record: dict) -> str:
+    """Возвращает версию записи задачи - короткий хеш ее содержимого
+
+    Args:
+        record (dict): запись задачи
+
+    Returns:
+        str: версия
+    """
+    data = json.dumps(record, ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=8).hexdigest()
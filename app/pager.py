@@ -0,0 +1,189 @@
+# Модуль, описывающий постраничный вывод таблицы задач.
+#
+# Строки берутся из итератора по мере перелистывания страниц, поэтому
+# первая страница выводится сразу, без чтения и форматирования всех
+# задач. Ширина столбцов вычисляется по первому окну строк (sample),
+# не больше ширины терминала, и дальше не меняется; более длинные
+# значения переносятся на следующие строки (см. table.PlainTable).
+# Уже показанные строки запоминаются, чтобы можно было вернуться назад.
+
+
+import shutil
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, Sequence
+
+from table import PlainTable
+
+
+class Pager:
+    """Постраничный просмотр строк таблицы"""
+
+    def __init__(
+        self, rows: Iterable[Sequence], page_size: Optional[int] = None,
+        sample: int = 200, max_width: Optional[int] = None
+    ) -> None:
+        """
+        Args:
+            rows (Iterable[Sequence]): строки таблицы (итератор читается по мере просмотра)
+            page_size (Optional[int], optional): количество строк на странице.
+                По умолчанию по высоте терминала.
+            sample (int, optional): по скольким первым строкам вычисляется
+                ширина столбцов. По умолчанию 200.
+            max_width (Optional[int], optional): наибольшая ширина таблицы.
+                По умолчанию не ограничена.
+        """
+        if page_size is None:
+            # Рамки, заголовок и строка подсказки
+            page_size = max(shutil.get_terminal_size().lines - 6, 5)
+        self.page_size = page_size
+        self._rows = iter(rows)
+        self._seen: list[Sequence] = list(islice(self._rows, max(sample, page_size)))
+        self._exhausted = len(self._seen) < max(sample, page_size)
+        self.table = PlainTable.from_sample(self._seen, max_width=max_width)
+        self.page = 0
+
+    def _read_until(self, count: int) -> None:
+        """Дочитывает строки из итератора, пока их не станет count"""
+        if not self._exhausted and len(self._seen) < count:
+            self._seen.extend(islice(self._rows, count - len(self._seen)))
+            self._exhausted = len(self._seen) < count
+
+    def has_page(self, page: int) -> bool:
+        """Проверяет, есть ли страница с номером page (с нуля)
+
+        Args:
+            page (int): номер страницы
+
+        Returns:
+            bool: True, если на странице есть строки (первая страница есть всегда)
+        """
+        if page == 0:
+            return True
+        if page < 0:
+            return False
+        self._read_until(page * self.page_size + 1)
+        return len(self._seen) > page * self.page_size
+
+    @property
+    def pages(self) -> Optional[int]:
+        """Количество страниц, если все строки уже прочитаны, иначе None"""
+        if not self._exhausted:
+            return None
+        return max((len(self._seen) - 1) // self.page_size + 1, 1)
+
+    def rows(self, page: int) -> list[Sequence]:
+        """Возвращает строки страницы
+
+        Args:
+            page (int): номер страницы (с нуля)
+
+        Returns:
+            list[Sequence]: строки
+        """
+        start = page * self.page_size
+        self._read_until(start + self.page_size)
+        return self._seen[start:start + self.page_size]
+
+    def render(self, page: Optional[int] = None) -> str:
+        """Возвращает страницу в виде таблицы
+
+        Args:
+            page (Optional[int], optional): номер страницы (с нуля). По умолчанию текущая.
+
+        Returns:
+            str: таблица
+        """
+        return self.table.render(self.rows(self.page if page is None else page))
+
+    def next(self) -> bool:
+        """Переходит на следующую страницу
+
+        Returns:
+            bool: False, если следующей страницы нет
+        """
+        return self.jump(self.page + 1)
+
+    def prev(self) -> bool:
+        """Переходит на предыдущую страницу
+
+        Returns:
+            bool: False, если текущая страница первая
+        """
+        return self.jump(self.page - 1)
+
+    def jump(self, page: int) -> bool:
+        """Переходит на страницу с номером page (с нуля)
+
+        Args:
+            page (int): номер страницы
+
+        Returns:
+            bool: False, если такой страницы нет
+        """
+        if not self.has_page(page):
+            return False
+        self.page = page
+        return True
+
+    def status(self) -> str:
+        """Возвращает строку с номером страницы, например "Страница 2 из 5"
+
+        Returns:
+            str: строка
+        """
+        pages = self.pages
+        return f"Страница {self.page + 1}" + (f" из {pages}" if pages is not None else "")
+
+
+def iter_table(rows: Iterable[Sequence], sample: int = 200) -> Iterator[str]:
+    """Перебирает строки таблицы без навигации: ширина столбцов вычисляется
+    по первым sample строкам, а остальные форматируются по мере чтения
+    (значения длиннее столбца переносятся). Ширина таблицы не ограничена
+
+    Args:
+        rows (Iterable[Sequence]): строки таблицы
+        sample (int, optional): по скольким первым строкам вычисляется
+            ширина столбцов. По умолчанию 200.
+
+    Yields:
+        str: строки таблицы вместе с рамками
+    """
+    rows = iter(rows)
+    first = list(islice(rows, sample))
+    table = PlainTable.from_sample(first)
+    yield from table.header()
+    for row in first:
+        yield table.format_row(row)
+    for row in rows:
+        yield table.format_row(row)
+    yield table.border
+
+
+def browse(pager: Pager, read: Callable[[str], str] = input, write: Callable[[str], None] = print) -> None:
+    """Показывает страницы таблицы, пока пользователь не выйдет из просмотра.
+    Команды: Enter или n - следующая страница, p - предыдущая,
+    номер - переход на страницу, q - выход
+
+    Args:
+        pager (Pager): постраничный просмотр
+        read (Callable[[str], str], optional): ввод команды. По умолчанию input.
+        write (Callable[[str], None], optional): вывод страницы. По умолчанию print.
+    """
+    write(pager.render())
+    while pager.has_page(1):
+        command = read(f"{pager.status()}. Enter/n - далее, p - назад, номер - перейти, q - выход: ")
+        command = command.strip().lower()
+        if command == "q":
+            break
+        if command in ("", "n"):
+            moved = pager.next()
+            if not moved and command == "":
+                break
+        elif command == "p":
+            moved = pager.prev()
+        elif command.isdigit():
+            moved = pager.jump(int(command) - 1)
+        else:
+            continue
+        if moved:
+            write(pager.render())
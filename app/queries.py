@@ -0,0 +1,112 @@
+# Модуль, описывающий запросы к задачам менеджера (см. TaskManager.query).
+#
+# Запрос - набор условий на поля задачи, порядок сортировки и ограничение
+# количества результатов. Менеджер выбирает самый избирательный индекс
+# для отбора кандидатов, а все условия запроса проверяются одной
+# функцией matches за один проход по кандидатам.
+
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Optional, Sequence, Union
+
+from models import Priority
+
+
+# Поля, по которым можно сортировать результаты
+sort_fields = ("id", "title", "description", "category", "due_date", "priority", "status")
+
+# Приоритеты по убыванию важности: сортировка по приоритету
+# ставит первыми самые важные задачи
+_priority_ranks = {priority: rank for rank, priority in enumerate(Priority)}
+
+
+@dataclass(slots=True)
+class Query:
+    """Запрос к задачам. Условия объединяются через AND,
+    условие со значением None не проверяется"""
+
+    category: Optional[str] = None
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    due_before: Optional[Union[date, str]] = None
+    due_after: Optional[Union[date, str]] = None
+    text: Optional[str] = None
+    order_by: Optional[Union[str, Sequence[str]]] = None
+    limit: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        if self.category is not None:
+            self.category = self.category.lower()
+        # Даты в записях задач хранятся строками ISO 8601,
+        # которые сравниваются так же, как сами даты
+        if self.due_before is not None:
+            self.due_before = str(self.due_before)
+        if self.due_after is not None:
+            self.due_after = str(self.due_after)
+        if isinstance(self.order_by, str):
+            self.order_by = [self.order_by]
+        for field in self.order_by or ():
+            if field.lstrip("-") not in sort_fields:
+                raise ValueError(f"Сортировка по полю '{field}' не поддерживается")
+
+    def conditions(self) -> set[str]:
+        """Возвращает названия заданных условий запроса
+
+        Returns:
+            set[str]: названия условий
+        """
+        return {
+            name for name in ("category", "status", "priority", "due_before", "due_after", "text")
+            if getattr(self, name) is not None
+        }
+
+    def due_range(self) -> tuple[Optional[int], Optional[int]]:
+        """Возвращает границы срока выполнения в виде порядковых номеров
+        дат: нижнюю (включительно) и верхнюю (не включительно)
+
+        Returns:
+            tuple[Optional[int], Optional[int]]: границы или None, если граница не задана
+        """
+        low = None if self.due_after is None else date.fromisoformat(self.due_after).toordinal() + 1
+        high = None if self.due_before is None else date.fromisoformat(self.due_before).toordinal()
+        return low, high
+
+    def matches(self, task: dict) -> bool:
+        """Проверяет все условия запроса, кроме текстового
+
+        Args:
+            task (dict): задача
+
+        Returns:
+            bool: True/False
+        """
+        return (
+            (self.category is None or task['category'].lower() == self.category)
+            and (self.status is None or task['status'] == self.status)
+            and (self.priority is None or task['priority'] == self.priority)
+            and (self.due_before is None or task['due_date'] < self.due_before)
+            and (self.due_after is None or task['due_date'] > self.due_after)
+        )
+
+    def sort(self, tasks: Iterable[dict]) -> list[dict]:
+        """Сортирует задачи по полям order_by и оставляет первые limit.
+        Поле с минусом в начале (например, "-due_date") сортируется
+        по убыванию. Без order_by порядок задач сохраняется
+
+        Args:
+            tasks (Iterable[dict]): задачи
+
+        Returns:
+            list[dict]: задачи
+        """
+        tasks = list(tasks)
+        # Сортировка устойчива: сортируем с последнего поля до первого
+        for field in reversed(self.order_by or ()):
+            name = field.lstrip("-")
+            if name == "priority":
+                key = lambda task: _priority_ranks.get(task['priority'], len(_priority_ranks))
+            else:
+                key = lambda task, name=name: task[name]
+            tasks.sort(key=key, reverse=field.startswith("-"))
+        return tasks if self.limit is None else tasks[:self.limit]
@@ -0,0 +1,317 @@
+# Локальный HTTP-сервер с JSON API менеджера задач (только стандартная библиотека).
+#
+# Сервер держит в памяти один TaskManager, поэтому файл базы данных
+# разбирается один раз при запуске. Запросы на чтение выполняются сразу
+# по задачам в памяти и не обращаются к диску. Изменения ставятся
+# в очередь единственной задачи-писателя: она забирает из очереди все
+# накопившиеся изменения, применяет их в памяти и сохраняет в хранилище
+# одной записью (групповая фиксация) в отдельном потоке. Ответ на
+# изменение отправляется после того, как оно записано. Ошибка в команде
+# (например, неверное поле) - ответ 400 только на эту команду; если
+# команда выбросила исключение, группа отменяется и выполняется заново
+# по одной команде, так что 500 получает только она.
+#
+# Запуск (из корня проекта):
+#     python3 app/server.py --db tasks.json --port 8080
+#
+# Маршруты (тело запроса и ответ - JSON, параметры как в модуле commands):
+#     GET    /tasks?category=&status=&priority=&due_before=&due_after=&text=&order_by=&limit=
+#     POST   /tasks                 - добавить задачу
+#     GET    /tasks/<id>            - задача по id
+#     PATCH  /tasks/<id>            - изменить задачу
+#     POST   /tasks/<id>/done       - отметить задачу как выполненную
+#     DELETE /tasks/<id>            - удалить задачу
+#     DELETE /categories/<category> - удалить задачи категории
+#     GET    /search?query=&limit=  - поиск задач
+#     GET    /stats                 - статистика (см. модуль stats)
+# Ответ на выполненную команду - 200 {"ok": true, ...}, на ошибку
+# в команде - 400 {"ok": false, "error": ...}, а если задачи с id
+# из запроса не существует - 404.
+
+
+import argparse
+import asyncio
+import contextlib
+import json
+import sys
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from commands import execute
+from managers import TaskManager
+from stats import install_hooks, stats
+from storages import backends
+
+
+# Команды, которые изменяют задачи и выполняются писателем
+mutations = frozenset({"add", "change", "done", "delete", "delete_category"})
+
+_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """Ошибка запроса, на которую отвечают указанным кодом"""
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class TaskServer:
+    """HTTP-сервер с одним общим менеджером задач"""
+
+    def __init__(self, manager: TaskManager, max_group: int = 1024, max_body: int = 1024 * 1024) -> None:
+        """
+        Args:
+            manager (TaskManager): менеджер задач. База данных должна
+                изменяться только через сервер (TaskManager(exclusive=True))
+            max_group (int, optional): наибольшее количество изменений
+                в одной групповой фиксации. По умолчанию 1024.
+            max_body (int, optional): наибольший размер тела запроса в байтах.
+                По умолчанию 1 МБ.
+        """
+        self.manager = manager
+        self.max_group = max_group
+        self.max_body = max_body
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> asyncio.Server:
+        """Загружает задачи, запускает писателя и начинает принимать соединения
+
+        Args:
+            host (str, optional): адрес. По умолчанию 127.0.0.1.
+            port (int, optional): порт (0 - любой свободный). По умолчанию 8080.
+
+        Returns:
+            asyncio.Server: сервер
+        """
+        self.manager.refresh()
+        self._queue = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_loop())
+        return await asyncio.start_server(self._serve, host, port)
+
+    async def stop(self) -> None:
+        """Останавливает писателя и закрывает хранилище"""
+        if self._writer is not None:
+            self._writer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._writer
+        self.manager.close()
+
+    async def handle(self, method: str, target: str, body: bytes) -> tuple[int, object]:
+        """Выполняет запрос
+
+        Args:
+            method (str): метод HTTP
+            target (str): путь с параметрами запроса
+            body (bytes): тело запроса
+
+        Raises:
+            HttpError: если маршрут не найден или тело запроса неверно
+
+        Returns:
+            tuple[int, object]: код ответа и ответ
+        """
+        if method == "GET" and urlsplit(target).path == "/stats":
+            return 200, stats.snapshot()
+        command = self._route(method, target, body)
+        if command['op'] in mutations:
+            future = asyncio.get_running_loop().create_future()
+            self._queue.put_nowait((command, future))
+            result = await future
+        else:
+            with stats.timer(f"server.{command['op']}"):
+                result = execute(self.manager, [command])[0]
+        if result['ok']:
+            return 200, result
+        return (404 if result.get("not_found") else 400), result
+
+    def _route(self, method: str, target: str, body: bytes) -> dict:
+        """Преобразует запрос в команду (см. модуль commands)
+
+        Raises:
+            HttpError: если маршрут не найден или тело запроса неверно
+
+        Returns:
+            dict: команда
+        """
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if "limit" in params:
+            params['limit'] = self._integer(params['limit'])
+        if "order_by" in params:
+            params['order_by'] = params['order_by'].split(",")
+
+        if parts == ["tasks"] and method == "GET":
+            return {"op": "query"} | params
+        if parts == ["tasks"] and method == "POST":
+            return self._body(body) | {"op": "add"}
+        if parts == ["search"] and method == "GET":
+            return {"op": "search"} | params
+        if len(parts) == 2 and parts[0] == "categories" and method == "DELETE":
+            return {"op": "delete_category", "category": parts[1]}
+        if len(parts) in (2, 3) and parts[0] == "tasks":
+            task_id = self._integer(parts[1], status=404)
+            if len(parts) == 3:
+                if parts[2] == "done" and method == "POST":
+                    return {"op": "done", "id": task_id}
+            elif method == "GET":
+                return {"op": "get", "id": task_id}
+            elif method == "PATCH":
+                return self._body(body) | {"op": "change", "id": task_id}
+            elif method == "DELETE":
+                return {"op": "delete", "id": task_id}
+        raise HttpError(404, f"Маршрут {method} {url.path} не найден")
+
+    @staticmethod
+    def _integer(value: str, status: int = 400) -> int:
+        try:
+            return int(value)
+        except ValueError:
+            raise HttpError(status, f"'{value}' - не целое число") from None
+
+    @staticmethod
+    def _body(body: bytes) -> dict:
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Тело запроса должно быть JSON") from None
+        if not isinstance(data, dict):
+            raise HttpError(400, "Тело запроса должно быть объектом JSON")
+        return data
+
+    async def _write_loop(self) -> None:
+        """Писатель: применяет накопившиеся изменения в памяти и сохраняет
+        их одной записью. Пока запись выполняется в отдельном потоке,
+        новые изменения копятся в очереди и попадут в следующую группу"""
+        while True:
+            group = [await self._queue.get()]
+            while len(group) < self.max_group and not self._queue.empty():
+                group.append(self._queue.get_nowait())
+            commands = [command for command, _ in group]
+            try:
+                results = await self._commit(commands)
+            except Exception:
+                # Исключение одной команды отменило всю группу: команды
+                # выполняются по одной, и ошибку получает только она
+                results = []
+                for command in commands:
+                    try:
+                        results.append((await self._commit([command]))[0])
+                    except Exception as e:
+                        results.append(e)
+            for (_, future), result in zip(group, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    async def _commit(self, commands: list[dict]) -> list[dict]:
+        """Выполняет команды в памяти и сохраняет их одной записью
+        в отдельном потоке. Если возникло исключение, ничего не сохраняется
+
+        Args:
+            commands (list[dict]): команды
+
+        Returns:
+            list[dict]: результаты команд (см. commands.execute)
+        """
+        with stats.timer("server.group_commit"):
+            with self.manager.stage() as ops:
+                results = execute(self.manager, commands)
+            await asyncio.get_running_loop().run_in_executor(None, self.manager.persist, ops)
+        stats.count("group_commits")
+        stats.count("group_commit_requests", len(commands))
+        return results
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обслуживает одно соединение. Соединения HTTP/1.1 по умолчанию
+        остаются открытыми для следующих запросов"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length") or 0)
+                if length > self.max_body:
+                    await self._respond(writer, 413, {"ok": False, "error": "Слишком большое тело запроса"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                keep_alive = (
+                    headers.get("connection", "").lower() != "close"
+                    and (version == "HTTP/1.1" or headers.get("connection", "").lower() == "keep-alive")
+                )
+                try:
+                    status, payload = await self.handle(method, target, body)
+                except HttpError as e:
+                    status, payload = e.status, {"ok": False, "error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"ok": False, "error": str(e)}
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload: object, keep_alive: bool) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {_reasons[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+
+async def serve(file: str, host: str, port: int, backend: Optional[str] = None) -> None:
+    """Запускает сервер и обслуживает запросы до прерывания
+
+    Args:
+        file (str): путь к базе данных
+        host (str): адрес
+        port (int): порт
+        backend (Optional[str], optional): тип хранилища
+    """
+    with contextlib.redirect_stdout(sys.stderr):
+        manager = TaskManager(file, backend, exclusive=True)
+    server = TaskServer(manager)
+    listener = await server.start(host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"Сервер запущен: http://{address[0]}:{address[1]}", file=sys.stderr, flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP-сервер менеджера задач")
+    parser.add_argument("--db", required=True, help="путь к базе данных")
+    parser.add_argument("--backend", choices=backends, help="тип хранилища")
+    parser.add_argument("--host", default="127.0.0.1", help="адрес. По умолчанию 127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080, help="порт. По умолчанию 8080")
+    args = parser.parse_args()
+    install_hooks()
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve(args.db, args.host, args.port, args.backend))
+
+
+if __name__ == "__main__":
+    main()
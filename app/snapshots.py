@@ -0,0 +1,78 @@
+# Модуль, описывающий бинарные снимки базы данных.
+#
+# Снимок - копия списка задач в формате marshal, который читается в
+# несколько раз быстрее JSON. Снимок лежит рядом с файлом базы данных
+# ('<база>.snapshot') и хранит отпечаток файла, с которого он снят:
+# если файл изменился (например, его отредактировали вручную), снимок
+# считается устаревшим и не используется.
+#
+# Формат файла: заголовок (сигнатура, версия формата, версия marshal,
+# CRC32 и длина данных), затем данные marshal.dumps((отпечаток, задачи)).
+
+
+import marshal
+import os
+import struct
+import threading
+import zlib
+from typing import Optional
+
+
+SNAPSHOT_VARIABLE = "TASK_MANAGER_SNAPSHOT"
+MAGIC = b"TMSNAP"
+VERSION = 1
+_header = struct.Struct(f"<{len(MAGIC)}sHHIQ")
+
+
+def write_snapshot(path: str, tasks: list[dict], signature: tuple) -> None:
+    """Атомарно записывает снимок задач
+
+    Args:
+        path (str): путь к файлу снимка
+        tasks (list[dict]): список задач
+        signature (tuple): отпечаток файла базы данных, соответствующего снимку
+    """
+    payload = marshal.dumps((signature, tasks))
+    header = _header.pack(MAGIC, VERSION, marshal.version, zlib.crc32(payload), len(payload))
+    # Снимок могут одновременно записывать несколько читателей
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_file, "wb") as snapshot_file:
+        snapshot_file.write(header)
+        snapshot_file.write(payload)
+    os.replace(tmp_file, path)
+
+
+def read_snapshot(path: str, signature: tuple) -> Optional[list[dict]]:
+    """Читает снимок задач, если он есть, не поврежден и снят
+    с файла с указанным отпечатком
+
+    Args:
+        path (str): путь к файлу снимка
+        signature (tuple): текущий отпечаток файла базы данных
+
+    Returns:
+        Optional[list[dict]]: список задач или None, если снимок нельзя использовать
+    """
+    try:
+        with open(path, "rb") as snapshot_file:
+            data = snapshot_file.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < _header.size:
+        return None
+
+    magic, version, marshal_version, crc, size = _header.unpack_from(data)
+    payload = memoryview(data)[_header.size:]
+    if (
+        magic != MAGIC or version != VERSION or marshal_version != marshal.version
+        or size != len(payload) or crc != zlib.crc32(payload)
+    ):
+        return None
+    try:
+        snapshot_signature, tasks = marshal.loads(payload)
+    except (EOFError, ValueError, TypeError):
+        return None
+    if tuple(snapshot_signature) != tuple(signature):
+        return None
+    return tasks
+
@@ -0,0 +1,197 @@
+# Модуль, описывающий встроенную статистику менеджера задач.
+#
+# Операции менеджера и хранилищ засекаются таймерами, а объем работы
+# (прочитанные и записанные байты, разборы и перезаписи файлов,
+# просмотренные записи) накапливается в счетчиках. Отчет выводится
+# пунктом меню "Статистика" или при завершении программы, если задана
+# переменная окружения TASK_MANAGER_STATS. Переменная окружения
+# TASK_MANAGER_PROFILE включает профилирование всей программы через
+# cProfile: если ее значение - путь к файлу, результаты сохраняются в
+# него (для pstats или snakeviz), иначе самые долгие функции выводятся
+# в stderr при завершении.
+
+
+import atexit
+import functools
+import io
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+
+STATS_VARIABLE = "TASK_MANAGER_STATS"
+PROFILE_VARIABLE = "TASK_MANAGER_PROFILE"
+
+
+class Stats:
+    """Таймеры и счетчики операций.
+
+    Таймер накапливает для каждой операции количество вызовов, суммарное
+    и наибольшее время выполнения. Вложенные операции засекаются
+    независимо: время add_task включает время сохранения в хранилище"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Обнуляет все таймеры и счетчики"""
+        with self._lock:
+            # Название операции -> [вызовов, суммарное время, наибольшее время]
+            self.timers: dict[str, list] = {}
+            self.counters: dict[str, int] = {}
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """Увеличивает счетчик
+
+        Args:
+            name (str): название счетчика
+            amount (int, optional): величина увеличения. По умолчанию 1.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """Засекает время выполнения блока with
+
+        Args:
+            name (str): название операции
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name: Optional[str] = None) -> Callable:
+        """Декоратор, засекающий время выполнения функции
+
+        Args:
+            name (Optional[str], optional): название операции.
+                По умолчанию - полное имя функции (например, "TaskManager.add_task")
+
+        Returns:
+            Callable: декоратор
+        """
+        def decorator(func: Callable) -> Callable:
+            operation = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(operation, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def record(self, name: str, elapsed: float) -> None:
+        """Учитывает один вызов операции
+
+        Args:
+            name (str): название операции
+            elapsed (float): время выполнения в секундах
+        """
+        with self._lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, elapsed, elapsed]
+                return
+            timer[0] += 1
+            timer[1] += elapsed
+            if elapsed > timer[2]:
+                timer[2] = elapsed
+
+    def snapshot(self) -> dict:
+        """Возвращает копию таймеров и счетчиков
+
+        Returns:
+            dict: {"timers": {операция: {"calls", "total_ms", "max_ms"}},
+                "counters": {счетчик: значение}}
+        """
+        with self._lock:
+            return {
+                "timers": {
+                    name: {"calls": calls, "total_ms": total * 1000, "max_ms": longest * 1000}
+                    for name, (calls, total, longest) in self.timers.items()
+                },
+                "counters": dict(self.counters)
+            }
+
+    def report(self, limit: Optional[int] = None) -> str:
+        """Возвращает текстовый отчет: операции по убыванию суммарного
+        времени, затем счетчики
+
+        Args:
+            limit (Optional[int], optional): сколько самых долгих операций показать
+
+        Returns:
+            str: отчет
+        """
+        snapshot = self.snapshot()
+        timers = sorted(snapshot['timers'].items(), key=lambda item: -item[1]['total_ms'])
+        lines = [f"{'Операция':<36}{'Вызовов':>10}{'Всего, мс':>14}{'Среднее, мс':>14}{'Макс, мс':>12}"]
+        for name, timer in timers[:limit]:
+            lines.append(
+                f"{name:<36}{timer['calls']:>10}{timer['total_ms']:>14.3f}"
+                f"{timer['total_ms'] / timer['calls']:>14.3f}{timer['max_ms']:>12.3f}"
+            )
+        if snapshot['counters']:
+            lines.append("")
+            lines.append(f"{'Счетчик':<36}{'Значение':>10}")
+            for name, value in sorted(snapshot['counters'].items()):
+                lines.append(f"{name:<36}{value:>10}")
+        return "\n".join(lines)
+
+
+stats = Stats()
+
+
+def install_hooks(environ: Optional[dict] = None) -> Optional["cProfile.Profile"]:
+    """Включает отчеты при завершении программы, заданные переменными
+    окружения TASK_MANAGER_STATS и TASK_MANAGER_PROFILE
+
+    Args:
+        environ (Optional[dict], optional): переменные окружения.
+            По умолчанию os.environ.
+
+    Returns:
+        Optional[cProfile.Profile]: запущенный профилировщик или None
+    """
+    environ = os.environ if environ is None else environ
+    if environ.get(STATS_VARIABLE):
+        atexit.register(lambda: print(stats.report(), file=sys.stderr))
+
+    target = environ.get(PROFILE_VARIABLE)
+    if not target:
+        return None
+    # cProfile и pstats импортируются только при включенном профилировании
+    import cProfile
+
+    profiler = cProfile.Profile()
+    atexit.register(_dump_profile, profiler, target)
+    profiler.enable()
+    return profiler
+
+
+def _dump_profile(profiler: "cProfile.Profile", target: str) -> None:
+    """Останавливает профилировщик и сохраняет или выводит результаты
+
+    Args:
+        profiler (cProfile.Profile): профилировщик
+        target (str): путь к файлу результатов или "1" для вывода в stderr
+    """
+    profiler.disable()
+    if target != "1":
+        profiler.dump_stats(target)
+        return
+    import pstats
+
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(25)
+    print(output.getvalue(), file=sys.stderr)
@@ -0,0 +1,1717 @@
+# Модуль, описывающий хранилища базы данных задач.
+#
+# Менеджер задач держит список задач в памяти, а хранилище отвечает только
+# за его сохранение. Каждое изменение передается хранилищу в виде списка
+# операций (ops):
+#     ("add", record)            - добавление новой задачи
+#     ("patch", record, fields)  - изменение полей fields задачи record
+#     ("delete", record)         - удаление задачи record
+# где record - запись задачи до изменения.
+
+
+import copy
+import heapq
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import date
+from typing import Callable, Collection, Iterable, Iterator, Optional, TextIO
+
+from locks import FileLock
+from models import Priority, Status, compact_record
+from snapshots import SNAPSHOT_VARIABLE, read_snapshot, write_snapshot
+from stats import stats
+from streams import iter_json_array, iter_json_lines
+
+
+ADD = "add"
+PATCH = "patch"
+DELETE = "delete"
+
+
+def file_signature(path: str) -> Optional[tuple[int, int, int]]:
+    """Возвращает отпечаток файла: время изменения, размер и inode
+
+    Args:
+        path (str): путь к файлу
+
+    Returns:
+        Optional[tuple[int, int, int]]: отпечаток файла или None, если файла нет
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def read_json_tasks(path: str) -> list[dict]:
+    """Читает список задач из JSON-файла. Пустой файл - пустой список
+
+    Args:
+        path (str): путь к файлу
+
+    Raises:
+        json.JSONDecodeError: если файл не пустой, но поврежден. Такой файл
+            нельзя считать пустой базой данных: следующая запись стерла бы задачи
+
+    Returns:
+        list[dict]: список задач
+    """
+    with open(path, "r", encoding="utf-8") as json_file:
+        stats.count("parses")
+        stats.count("bytes_read", os.fstat(json_file.fileno()).st_size)
+        try:
+            tasks = json.load(json_file)
+        except json.JSONDecodeError:
+            json_file.seek(0)
+            if json_file.read().strip():
+                raise
+            return []
+    stats.count("records_scanned", len(tasks))
+    return tasks
+
+
+def dump_json_tasks(tasks: Iterable[dict], json_file: TextIO) -> None:
+    """Записывает задачи в открытый файл JSON-массивом в том же виде,
+    что json.dump(tasks, indent=4). Итератор задач записывается по одной
+    задаче, и весь массив в памяти не собирается
+
+    Args:
+        tasks (Iterable[dict]): задачи (список или итератор)
+        json_file (TextIO): файл, открытый на запись
+    """
+    if isinstance(tasks, list):
+        json.dump(tasks, json_file, ensure_ascii=False, indent=4)
+        return
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=4)
+    separator = "[\n"
+    for task in tasks:
+        json_file.write(separator + "    " + encoder.encode(task).replace("\n", "\n    "))
+        separator = ",\n"
+    json_file.write("[]" if separator == "[\n" else "\n]")
+
+
+def write_json_tasks(path: str, tasks: Iterable[dict], atomic: bool = False) -> None:
+    """Записывает задачи в JSON-файл
+
+    Args:
+        path (str): путь к файлу
+        tasks (Iterable[dict]): задачи (список или итератор)
+        atomic (bool, optional): если True, данные пишутся во временный файл
+            с уникальным именем (один файл могут одновременно перезаписывать
+            несколько процессов), который затем атомарно подменяет исходный.
+            По умолчанию False.
+    """
+    if not atomic:
+        with open(path, "w", encoding="utf-8") as json_file:
+            dump_json_tasks(tasks, json_file)
+            stats.count("bytes_written", json_file.tell())
+        stats.count("rewrites")
+        return
+    descriptor, target = tempfile.mkstemp(
+        prefix=f"{os.path.basename(path)}.", suffix=".tmp", dir=os.path.dirname(path) or "."
+    )
+    try:
+        # mkstemp создает файл с правами 0600: права исходного файла сохраняются
+        try:
+            os.chmod(target, os.stat(path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        with open(descriptor, "w", encoding="utf-8") as json_file:
+            dump_json_tasks(tasks, json_file)
+            json_file.flush()
+            os.fsync(json_file.fileno())
+            stats.count("bytes_written", json_file.tell())
+        os.replace(target, path)
+    except BaseException:
+        if os.path.exists(target):
+            os.remove(target)
+        raise
+    stats.count("rewrites")
+
+
+class Storage:
+    """Базовый класс хранилища базы данных задач.
+
+    Атрибуты класса:
+        incremental (bool): если True, для сохранения изменений хранилищу
+            достаточно списка операций, и менеджер может не загружать
+            все задачи в память
+        native_queries (frozenset): запросы, которые хранилище выполняет
+            само, без загрузки всех задач: "id" - get, "category" и
+            "status" - find
+        compact_records (bool): если True, load возвращает записи, уже
+            обработанные models.compact_record
+        streaming (bool): если True, хранилище умеет удалять задачи
+            потоковой перезаписью (см. rewrite), и менеджер может не
+            загружать все задачи в память
+
+    Следующий свободный id хранится в файле метаданных '<база>.meta' и
+    только растет, поэтому id удаленных задач не выдаются повторно.
+    Изменение счетчика защищено межпроцессной блокировкой '<база>.lock'."""
+
+    incremental = False
+    native_queries = frozenset()
+    compact_records = False
+    streaming = False
+
+    def __init__(self, file: str) -> None:
+        """
+        Args:
+            file (str): путь к файлу базы данных
+        """
+        self.file = file
+        self.meta_file = f"{file}.meta"
+        self.lock = FileLock(f"{file}.lock")
+
+    def signature(self) -> tuple:
+        """Возвращает отпечаток хранилища. Отпечаток меняется при любом
+        изменении данных на диске
+
+        Returns:
+            tuple: отпечаток хранилища
+        """
+        raise NotImplementedError
+
+    def load(self) -> list[dict]:
+        """Читает все задачи из хранилища
+
+        Returns:
+            list[dict]: список задач
+        """
+        raise NotImplementedError
+
+    def iter_tasks(self) -> Iterator[dict]:
+        """Перебирает задачи хранилища. Хранилища, которые умеют читать
+        задачи по одной, не загружают их все в память
+
+        Yields:
+            dict: задача
+        """
+        yield from self.load()
+
+    def commit(self, ops: list[tuple], tasks: Optional[Collection[dict]]) -> None:
+        """Сохраняет изменения
+
+        Args:
+            ops (list[tuple]): список операций
+            tasks (Optional[Collection[dict]]): задачи после применения операций
+                (например, dict.values() кэша менеджера: копировать их в список
+                нужно, только если хранилище перезаписывает файл целиком).
+                Для инкрементальных хранилищ может быть None
+        """
+        raise NotImplementedError
+
+    def get(self, task_id: int) -> Optional[dict]:
+        """Возвращает задачу по id
+
+        Args:
+            task_id (int): id задачи
+
+        Returns:
+            Optional[dict]: задача или None, если ее нет
+        """
+        for task in self.load():
+            if task['id'] == task_id:
+                return task
+        return None
+
+    def find(self, category: Optional[str] = None, status: Optional[str] = None) -> list[dict]:
+        """Возвращает задачи категории category (без учета регистра)
+        и/или со статусом status
+
+        Args:
+            category (Optional[str], optional): категория задач
+            status (Optional[str], optional): статус задач
+
+        Returns:
+            list[dict]: список задач
+        """
+        return [
+            task for task in self.load()
+            if (category is None or task['category'].lower() == category.lower())
+            and (status is None or task['status'] == status)
+        ]
+
+    def next_id(self, floor: Optional[int] = None) -> int:
+        """Возвращает id, который получит следующая задача, не резервируя его
+
+        Args:
+            floor (Optional[int], optional): наименьший допустимый id
+                (наибольший id существующих задач + 1). Если не передан,
+                вычисляется по задачам хранилища
+
+        Returns:
+            int: id
+        """
+        if floor is None:
+            floor = max((task['id'] for task in self.iter_tasks()), default=0) + 1
+        return max(self._read_next_id(), floor)
+
+    def allocate_ids(self, count: int, floor: Optional[int] = None) -> int:
+        """Резервирует count идущих подряд id для новых задач.
+        Разные процессы никогда не получают одинаковые id
+
+        Args:
+            count (int): количество id
+            floor (Optional[int], optional): наименьший допустимый id (см. next_id)
+
+        Returns:
+            int: первый зарезервированный id
+        """
+        with self.lock:
+            start = self.next_id(floor)
+            self._write_next_id(start + count)
+        return start
+
+    def reserve_ids(self, next_id: int) -> None:
+        """Запоминает, что все id меньше next_id уже использованы
+
+        Args:
+            next_id (int): наименьший еще не использованный id
+        """
+        with self.lock:
+            if next_id > self._read_next_id():
+                self._write_next_id(next_id)
+
+    def compact(self, tasks: Optional[list[dict]] = None, signature: Optional[tuple] = None) -> None:
+        """Уплотняет хранилище
+
+        Args:
+            tasks (Optional[list[dict]], optional): актуальный список задач
+            signature (Optional[tuple], optional): отпечаток хранилища, при
+                котором список tasks актуален (см. signature). Если хранилище
+                с тех пор изменилось (например, другим процессом), tasks
+                не используется
+        """
+
+    def rewrite(self, drop: Callable[[dict], bool]) -> tuple[int, int]:
+        """Удаляет задачи, для которых drop возвращает True, потоковой
+        перезаписью хранилища (только если streaming)
+
+        Args:
+            drop (Callable[[dict], bool]): условие удаления задачи
+
+        Returns:
+            tuple[int, int]: количество удаленных задач и наибольший
+                id среди них (0, если задачи не удалялись)
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища"""
+
+    def compaction_stats(self) -> dict:
+        """Возвращает статистику уплотнения хранилища
+
+        Returns:
+            dict: статистика (для каждого хранилища своя)
+        """
+        return {}
+
+    def _read_next_id(self) -> int:
+        try:
+            with open(self.meta_file, "r", encoding="utf-8") as meta_file:
+                return json.load(meta_file)['next_id']
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            return 1
+
+    def _write_next_id(self, next_id: int) -> None:
+        tmp_file = f"{self.meta_file}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as meta_file:
+            json.dump({"next_id": next_id}, meta_file)
+        os.replace(tmp_file, self.meta_file)
+
+
+class JsonStorage(Storage):
+    """Хранилище в одном JSON-файле.
+    Изменение перезаписывает файл целиком, кроме удаления и изменения задач.
+
+    Удаленные задачи не вырезаются из файла сразу, а отмечаются
+    надгробиями: их id дописываются в файл '<база>.tombstones', и при
+    чтении такие задачи пропускаются. Так же изменение задачи дописывает
+    в этот файл строку JSON с id и измененными полями ("заплатку"),
+    которая при чтении накладывается на задачу. Файл базы данных
+    перезаписывается с учетом надгробий и заплаток (уплотняется), когда
+    доля устаревших записей достигает compact_ratio или их количество -
+    compact_count, при любой другой перезаписи файла или при явном вызове
+    compact. Надгробия действительны только для того файла базы данных,
+    при котором они записаны: если файл изменился в обход хранилища,
+    они не учитываются.
+
+    Если включены снимки, рядом с файлом хранится бинарный снимок
+    задач (см. модуль snapshots): пока файл не изменился, задачи
+    читаются из снимка без разбора JSON.
+
+    Уплотнение без списка задач и rewrite перезаписывают файл потоково:
+    задачи читаются по одной, пишутся во временный файл рядом с базой,
+    и он атомарно подменяет ее, поэтому память не зависит от размера файла"""
+
+    streaming = True
+
+    def __init__(
+        self, file: str,
+        snapshot: Optional[bool] = None,
+        tombstones: bool = True,
+        compact_ratio: float = 0.25,
+        compact_count: int = 10000,
+        background: bool = False
+    ) -> None:
+        """
+        Args:
+            file (str): путь к файлу базы данных
+            snapshot (Optional[bool], optional): хранить ли бинарный снимок
+                '<база>.snapshot'. По умолчанию снимки включаются переменной
+                окружения TASK_MANAGER_SNAPSHOT.
+            tombstones (bool, optional): записывать ли удаление и изменение
+                задач надгробиями и заплатками вместо перезаписи файла.
+                По умолчанию True.
+            compact_ratio (float, optional): доля устаревших записей среди всех
+                записей файла, при которой запускается уплотнение. По умолчанию 0.25.
+            compact_count (int, optional): количество устаревших записей, при
+                котором запускается уплотнение. По умолчанию 10000.
+            background (bool, optional): уплотнять ли файл в фоновом потоке.
+                По умолчанию False.
+        """
+        super().__init__(file)
+        if snapshot is None:
+            snapshot = bool(os.environ.get(SNAPSHOT_VARIABLE))
+        self.snapshot_file = f"{file}.snapshot" if snapshot else None
+        # Снимок хранит записи после compact_record: marshal сохраняет
+        # общие строки, и менеджеру не нужно обрабатывать записи заново
+        self.compact_records = snapshot
+        self.tombstones_file = f"{file}.tombstones" if tombstones else None
+        self.compact_ratio = compact_ratio
+        self.compact_count = compact_count
+        self.background = background
+        self._compaction: Optional[threading.Thread] = None
+        self._compactions = {"compactions": 0, "reclaimed": 0, "last_ms": 0.0, "total_ms": 0.0}
+        if not os.path.isfile(file):
+            with open(file, "w", encoding="utf-8"):
+                pass
+
+    def signature(self) -> tuple:
+        if self.tombstones_file is None:
+            return (file_signature(self.file),)
+        return file_signature(self.file), file_signature(self.tombstones_file)
+
+    @stats.timed()
+    def load(self) -> list[dict]:
+        # Файл базы данных, надгробия и снимок читаются согласованно:
+        # писатель не может изменить их посередине чтения
+        with self.lock.shared():
+            return self._load()
+
+    def _load(self) -> list[dict]:
+        """Читает задачи без блокировки (см. load)
+
+        Returns:
+            list[dict]: список задач
+        """
+        tombstones, patches = self._read_tombstones()
+        if self.snapshot_file is None:
+            tasks = self._read()
+        else:
+            # Отпечаток снят до чтения: если файл изменится во время чтения,
+            # снимок окажется устаревшим и не будет использован
+            signature = file_signature(self.file)
+            tasks = read_snapshot(self.snapshot_file, signature)
+            if tasks is not None:
+                stats.count("snapshot_hits")
+            else:
+                tasks = [compact_record(task) for task in self._read()]
+                write_snapshot(self.snapshot_file, tasks, signature)
+        if tombstones or patches:
+            tasks = list(self._overlay(tasks, tombstones, patches))
+        return tasks
+
+    def iter_tasks(self) -> Iterator[dict]:
+        tombstones, patches = self._read_tombstones()
+        tasks = self._iter()
+        if tombstones or patches:
+            return self._overlay(tasks, tombstones, patches)
+        return tasks
+
+    def _overlay(self, tasks: Iterable[dict], tombstones: set[int], patches: dict[int, dict]) -> Iterator[dict]:
+        """Пропускает удаленные задачи и накладывает заплатки
+
+        Args:
+            tasks (Iterable[dict]): задачи из файла базы данных
+            tombstones (set[int]): id удаленных задач
+            patches (dict[int, dict]): id задачи -> измененные поля
+
+        Yields:
+            dict: задача
+        """
+        for task in tasks:
+            task_id = task['id']
+            if task_id in tombstones:
+                continue
+            if task_id in patches:
+                task = task | patches[task_id]
+                if self.compact_records:
+                    task = compact_record(task)
+            yield task
+
+    @stats.timed()
+    def commit(self, ops: list[tuple], tasks: Optional[Collection[dict]]) -> None:
+        with self.lock:
+            tombstones, patches = self._read_tombstones()
+            fresh = not tombstones and not patches
+            deleted = {op[1]['id'] for op in ops if op[0] == DELETE}
+            if self.tombstones_file is not None and all(op[0] != ADD for op in ops):
+                # Устаревшие записи файла: удаленные и измененные задачи
+                dead = len(tombstones | deleted) + len(
+                    (patches.keys() | {op[1]['id'] for op in ops if op[0] == PATCH})
+                    - tombstones - deleted
+                )
+                if not self._compaction_due(dead, len(tasks)):
+                    self._append_tombstones(ops, fresh)
+                    return
+                if self.background:
+                    self._append_tombstones(ops, fresh)
+                    if not self._compacting():
+                        self._compaction = threading.Thread(
+                            target=self._compact_later, args=(list(tasks), self.signature()),
+                            name="json-compaction"
+                        )
+                        self._compaction.start()
+                    return
+            tasks = list(tasks)
+            if not fresh:
+                self._rewrite(tasks, dead=len(tombstones | deleted) + len(patches.keys() - deleted))
+            else:
+                self._write(ops, tasks)
+                self._write_snapshot(tasks)
+
+    def compact(self, tasks: Optional[list[dict]] = None, signature: Optional[tuple] = None) -> None:
+        """Перезаписывает файл базы данных без удаленных задач
+
+        Args:
+            tasks (Optional[list[dict]], optional): актуальный список задач.
+                Если не передан, задачи читаются из файла потоково.
+            signature (Optional[tuple], optional): отпечаток хранилища, при
+                котором список tasks актуален. Если файл базы данных или
+                надгробия с тех пор изменились, задачи читаются из файла
+        """
+        self.wait()
+        with self.lock:
+            self._compact(tasks, signature)
+
+    @stats.timed()
+    def rewrite(self, drop: Callable[[dict], bool]) -> tuple[int, int]:
+        self.wait()
+        with self.lock:
+            tombstones, patches = self._read_tombstones()
+            return self._stream_rewrite(tombstones, patches, drop)
+
+    def compaction_stats(self) -> dict:
+        """Возвращает статистику надгробий, заплаток и уплотнений
+
+        Returns:
+            dict: {"tombstones": количество надгробий, "patches": количество
+                измененных задач, "ratio": доля устаревших записей среди
+                записей файла, "compactions": количество уплотнений,
+                "reclaimed": устаревших записей заменено при уплотнениях,
+                "last_ms", "total_ms": время последнего и всех уплотнений}
+        """
+        tombstones, patches = self._read_tombstones()
+        result = dict(self._compactions, tombstones=len(tombstones), patches=len(patches), ratio=0.0)
+        if tombstones or patches:
+            alive = sum(1 for _ in self.iter_tasks())
+            result['ratio'] = (len(tombstones) + len(patches)) / (len(tombstones) + alive)
+        return result
+
+    def close(self) -> None:
+        self.wait()
+
+    def wait(self) -> None:
+        """Дожидается завершения фонового уплотнения"""
+        if self._compaction is not None:
+            self._compaction.join()
+            self._compaction = None
+
+    def _compacting(self) -> bool:
+        return self._compaction is not None and self._compaction.is_alive()
+
+    def _compaction_due(self, dead: int, alive: int) -> bool:
+        """Определяет, пора ли уплотнять файл базы данных
+
+        Args:
+            dead (int): количество надгробий
+            alive (int): количество неудаленных задач
+
+        Returns:
+            bool: True/False
+        """
+        return dead >= self.compact_count or dead >= self.compact_ratio * (dead + alive)
+
+    def _compact_later(self, tasks: list[dict], signature: tuple) -> None:
+        """Уплотняет файл в фоновом потоке (см. _compact)"""
+        with self.lock:
+            self._compact(tasks, signature)
+
+    def _compact(self, tasks: Optional[list[dict]], signature: Optional[tuple]) -> None:
+        """Уплотняет файл под блокировкой. Список tasks записывается,
+        только если хранилище не изменилось с момента, когда он был
+        актуален: отпечаток учитывает и изменения других процессов,
+        и надгробия, дописанные после этого. Иначе задачи читаются
+        из файла потоково и накладываются на них текущие надгробия
+
+        Args:
+            tasks (Optional[list[dict]]): список задач
+            signature (Optional[tuple]): отпечаток хранилища, при котором
+                список tasks актуален. None - список актуален
+        """
+        tombstones, patches = self._read_tombstones()
+        if not tombstones and not patches:
+            return
+        if tasks is None or (signature is not None and signature != self.signature()):
+            self._stream_rewrite(tombstones, patches, lambda task: False)
+        else:
+            self._rewrite(tasks, dead=len(tombstones) + len(patches))
+
+    @stats.timed("JsonStorage.compact")
+    def _rewrite(self, tasks: list[dict], dead: int) -> None:
+        """Перезаписывает файл базы данных списком задач и удаляет надгробия
+        и заплатки. Они удаляются после записи файла, но до этого момента
+        уже не относятся к новому файлу и не учитываются при чтении
+
+        Args:
+            tasks (list[dict]): список задач
+            dead (int): количество удаляемых из файла записей
+        """
+        start = time.perf_counter()
+        self._write([], tasks)
+        self._write_snapshot(tasks)
+        self._compacted(start, dead)
+
+    def _compacted(self, start: float, dead: int) -> None:
+        """Удаляет надгробия и заплатки после перезаписи файла базы данных
+        и учитывает уплотнение в статистике
+
+        Args:
+            start (float): время начала уплотнения (time.perf_counter)
+            dead (int): количество удаленных из файла записей
+        """
+        if self.tombstones_file is not None:
+            try:
+                os.remove(self.tombstones_file)
+            except FileNotFoundError:
+                pass
+        elapsed = (time.perf_counter() - start) * 1000
+        self._compactions['compactions'] += 1
+        self._compactions['reclaimed'] += dead
+        self._compactions['last_ms'] = elapsed
+        self._compactions['total_ms'] += elapsed
+        stats.count("compactions")
+
+    @stats.timed("JsonStorage.compact")
+    def _stream_rewrite(
+        self, tombstones: set[int], patches: dict[int, dict], drop: Callable[[dict], bool]
+    ) -> tuple[int, int]:
+        """Перезаписывает файл базы данных, читая задачи из него же по
+        одной: надгробия и заплатки применяются, задачи, для которых drop
+        возвращает True, пропускаются. Если ни одна запись не устарела
+        и ни одна задача не удалена, файл не подменяется
+
+        Args:
+            tombstones (set[int]): id удаленных задач
+            patches (dict[int, dict]): id задачи -> измененные поля
+            drop (Callable[[dict], bool]): условие удаления задачи
+
+        Returns:
+            tuple[int, int]: количество удаленных задач и наибольший id среди них
+        """
+        start = time.perf_counter()
+        dropped = last = 0
+
+        def keep(tasks: Iterable[dict]) -> Iterator[dict]:
+            nonlocal dropped, last
+            for task in tasks:
+                if drop(task):
+                    dropped += 1
+                    last = max(last, task['id'])
+                else:
+                    yield task
+
+        dead = len(tombstones) + len(patches)
+        target = self._write_tmp(keep(self._overlay(self._iter(), tombstones, patches)))
+        if not dropped and not dead:
+            os.remove(target)
+            return 0, 0
+        os.replace(target, self.file)
+        stats.count("rewrites")
+        self._compacted(start, dead)
+        return dropped, last
+
+    def _read_tombstones(self) -> tuple[set[int], dict[int, dict]]:
+        """Читает надгробия и заплатки: строка с числом - id удаленной
+        задачи, строка с объектом JSON - id и измененные поля задачи.
+        Заплатки одной задачи объединяются по порядку. Файл, записанный
+        для другой версии файла базы данных, и недописанная последняя
+        строка не учитываются
+
+        Returns:
+            tuple[set[int], dict[int, dict]]: id удаленных задач и
+                измененные поля задач по id
+        """
+        tombstones, patches = set(), {}
+        if self.tombstones_file is None:
+            return tombstones, patches
+        try:
+            with open(self.tombstones_file, "r", encoding="utf-8") as tombstones_file:
+                lines = tombstones_file.read().splitlines()
+        except FileNotFoundError:
+            return tombstones, patches
+        try:
+            signature = json.loads(lines[0])
+        except (IndexError, json.JSONDecodeError):
+            return tombstones, patches
+        if tuple(signature) != file_signature(self.file):
+            return tombstones, patches
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(entry, int):
+                tombstones.add(entry)
+                patches.pop(entry, None)
+            elif isinstance(entry, dict) and "id" in entry:
+                task_id = entry.pop("id")
+                patches[task_id] = patches.get(task_id, {}) | entry
+        return tombstones, patches
+
+    def _append_tombstones(self, ops: list[tuple], fresh: bool) -> None:
+        """Дописывает надгробия удаленных задач и заплатки измененных
+
+        Args:
+            ops (list[tuple]): операции DELETE и PATCH
+            fresh (bool): если True, файл надгробий создается заново
+                для текущей версии файла базы данных
+        """
+        lines = "".join(
+            f"{op[1]['id']}\n" if op[0] == DELETE
+            else json.dumps({"id": op[1]['id']} | op[2], ensure_ascii=False) + "\n"
+            for op in ops
+        )
+        if fresh:
+            # Новый файл надгробий подменяет старый атомарно
+            lines = json.dumps(file_signature(self.file)) + "\n" + lines
+            target = f"{self.tombstones_file}.tmp"
+        else:
+            target = self.tombstones_file
+        with open(target, "w" if fresh else "a", encoding="utf-8") as tombstones_file:
+            tombstones_file.write(lines)
+            tombstones_file.flush()
+            os.fsync(tombstones_file.fileno())
+        if fresh:
+            os.replace(target, self.tombstones_file)
+        stats.count("bytes_written", len(lines))
+        stats.count("appends")
+        stats.count("tombstones", len(ops))
+
+    def _write_snapshot(self, tasks: list[dict]) -> None:
+        if self.snapshot_file is not None:
+            write_snapshot(self.snapshot_file, tasks, file_signature(self.file))
+
+    def _iter(self) -> Iterator[dict]:
+        """Потоково читает задачи из файла базы данных, включая удаленные
+
+        Yields:
+            dict: задача
+        """
+        return iter_json_array(self.file)
+
+    def _read(self) -> list[dict]:
+        """Читает все задачи из файла базы данных, включая удаленные
+
+        Returns:
+            list[dict]: список задач
+        """
+        return read_json_tasks(self.file)
+
+    def _write(self, ops: list[tuple], tasks: list[dict]) -> None:
+        """Записывает изменения в файл базы данных
+
+        Args:
+            ops (list[tuple]): список операций. Пустой список - файл
+                перезаписывается списком tasks целиком
+            tasks (list[dict]): список задач после применения операций
+        """
+        os.replace(self._write_tmp(tasks), self.file)
+        stats.count("rewrites")
+
+    def _write_tmp(self, tasks: Iterable[dict]) -> str:
+        """Записывает задачи во временный файл рядом с файлом базы данных,
+        который затем атомарно подменяет его
+
+        Args:
+            tasks (Iterable[dict]): задачи (список или итератор)
+
+        Returns:
+            str: путь к временному файлу
+        """
+        target = f"{self.file}.tmp"
+        with open(target, "w", encoding="utf-8") as json_file:
+            dump_json_tasks(tasks, json_file)
+            json_file.flush()
+            os.fsync(json_file.fileno())
+            stats.count("bytes_written", json_file.tell())
+        return target
+
+
+class JsonlStorage(JsonStorage):
+    """Хранилище в файле JSON Lines: каждая задача записана в отдельной строке.
+    Добавление задач дописывает строки в конец файла, удаление отмечает
+    задачи надгробиями (см. JsonStorage), остальные изменения
+    перезаписывают файл целиком. Файл читается построчно"""
+
+    def _iter(self) -> Iterator[dict]:
+        return iter_json_lines(self.file)
+
+    def _read(self) -> list[dict]:
+        return list(iter_json_lines(self.file))
+
+    def _write(self, ops: list[tuple], tasks: list[dict]) -> None:
+        if not ops or any(op[0] != ADD for op in ops):
+            super()._write(ops, tasks)
+            return
+        # Строка, недописанная в конец файла при сбое, при чтении пропускается
+        with open(self.file, "a", encoding="utf-8") as jsonl_file:
+            start = jsonl_file.tell()
+            self._dump([op[1] for op in ops], jsonl_file)
+            stats.count("bytes_written", jsonl_file.tell() - start)
+        stats.count("appends")
+
+    def _write_tmp(self, tasks: Iterable[dict]) -> str:
+        target = f"{self.file}.tmp"
+        with open(target, "w", encoding="utf-8") as jsonl_file:
+            self._dump(tasks, jsonl_file)
+            stats.count("bytes_written", jsonl_file.tell())
+        return target
+
+    @staticmethod
+    def _dump(tasks: Iterable[dict], jsonl_file: TextIO) -> None:
+        """Записывает задачи по одной в строке и сбрасывает файл на диск
+
+        Args:
+            tasks (Iterable[dict]): задачи
+            jsonl_file (TextIO): файл, открытый на запись
+        """
+        jsonl_file.writelines(json.dumps(task, ensure_ascii=False) + "\n" for task in tasks)
+        jsonl_file.flush()
+        os.fsync(jsonl_file.fileno())
+
+
+class JournalStorage(JsonStorage):
+    """Хранилище из базового JSON-снимка и журнала изменений.
+
+    Каждое изменение дописывается в конец журнала (файл '<база>.journal')
+    в виде JSON-строк, поэтому стоимость записи зависит только от размера
+    изменения. При чтении журнал накладывается на снимок. Когда журнал
+    превышает compact_threshold байт, снимок перезаписывается, а журнал
+    очищается (в фоновом потоке, если background=True).
+    Базовый снимок имеет обычный формат JSON-базы данных."""
+
+    incremental = True
+    streaming = False
+
+    def __init__(
+        self, file: str,
+        compact_threshold: int = 1024 * 1024,
+        background: bool = True
+    ) -> None:
+        """
+        Args:
+            file (str): путь к файлу базы данных (базовый снимок)
+            compact_threshold (int, optional): размер журнала в байтах,
+                после которого запускается уплотнение. По умолчанию 1 МБ.
+            background (bool, optional): уплотнять ли журнал в фоновом потоке.
+                По умолчанию True.
+        """
+        # Удаления записываются в журнал, надгробия не нужны
+        super().__init__(file, snapshot=False, tombstones=False, background=background)
+        self.journal_file = f"{file}.journal"
+        self.compact_threshold = compact_threshold
+
+    def signature(self) -> tuple:
+        return file_signature(self.file), file_signature(self.journal_file)
+
+    def _load(self) -> list[dict]:
+        tasks = {task['id']: task for task in read_json_tasks(self.file)}
+        for entry in self._read_journal():
+            self._replay(tasks, entry)
+        return list(tasks.values())
+
+    @stats.timed()
+    def commit(self, ops: list[tuple], tasks: Optional[Collection[dict]]) -> None:
+        lines = "".join(
+            json.dumps(self._journal_entry(op), ensure_ascii=False) + "\n"
+            for op in ops
+        )
+        with self.lock:
+            with open(self.journal_file, "a", encoding="utf-8") as journal:
+                start = journal.tell()
+                journal.write(lines)
+                size = journal.tell()
+            state = file_signature(self.file), size
+        stats.count("bytes_written", size - start)
+        stats.count("appends")
+
+        if size >= self.compact_threshold and not self._compacting():
+            if self.background:
+                self._compaction = threading.Thread(
+                    target=self._compact, args=(tasks, state), name="journal-compaction"
+                )
+                self._compaction.start()
+            else:
+                self._compact(tasks, state)
+
+    def compact(self, tasks: Optional[list[dict]] = None) -> None:
+        """Переносит журнал в базовый снимок и очищает его
+
+        Args:
+            tasks (Optional[list[dict]], optional): актуальный список задач.
+                Если не передан, он будет прочитан из хранилища.
+        """
+        self.wait()
+        with self.lock:
+            self._compact(tasks, (file_signature(self.file), self._journal_size()))
+
+    def compaction_stats(self) -> dict:
+        """Возвращает статистику журнала
+
+        Returns:
+            dict: {"journal_bytes": размер журнала в байтах}
+        """
+        return {"journal_bytes": self._journal_size()}
+
+    @stats.timed()
+    def _compact(self, tasks: Optional[list[dict]], state: tuple) -> None:
+        """Записывает снимок tasks, соответствующий базовому снимку и первым
+        size байтам журнала, и удаляет эти байты из журнала. Записи,
+        дописанные в журнал после снятия снимка, сохраняются.
+
+        Все выполняется под исключительной блокировкой. Если с момента
+        снятия снимка журнал уплотнил другой процесс (изменился базовый
+        снимок или журнал стал короче), tasks устарел и не записывается:
+        задачи перечитываются из хранилища
+
+        Args:
+            tasks (Optional[list[dict]]): список задач. Если None, снимок
+                читается из хранилища
+            state (tuple): отпечаток базового снимка и размер журнала,
+                которым соответствует tasks
+        """
+        with self.lock:
+            base, size = state
+            if tasks is None or base != file_signature(self.file) or size > self._journal_size():
+                size = self._journal_size()
+                tasks = self._load()
+            write_json_tasks(self.file, tasks, atomic=True)
+            with open(self.journal_file, "rb") as journal:
+                journal.seek(size)
+                tail = journal.read()
+            tmp_file = f"{self.journal_file}.tmp"
+            with open(tmp_file, "wb") as journal:
+                journal.write(tail)
+                journal.flush()
+                os.fsync(journal.fileno())
+            os.replace(tmp_file, self.journal_file)
+
+    def _journal_size(self) -> int:
+        try:
+            return os.path.getsize(self.journal_file)
+        except FileNotFoundError:
+            return 0
+
+    def _read_journal(self):
+        """Возвращает записи журнала. Недописанная последняя строка
+        (например, после сбоя) пропускается"""
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as journal:
+                for line in journal:
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            return
+
+    @staticmethod
+    def _journal_entry(op: tuple) -> dict:
+        """Преобразует операцию в запись журнала"""
+        kind, record = op[0], op[1]
+        if kind == ADD:
+            return {"op": ADD, "task": record}
+        if kind == PATCH:
+            return {"op": PATCH, "id": record['id'], "fields": op[2]}
+        return {"op": DELETE, "id": record['id']}
+
+    @staticmethod
+    def _replay(tasks: dict[int, dict], entry: dict) -> None:
+        """Применяет запись журнала к задачам. Повторное применение
+        записи не меняет результат"""
+        if entry['op'] == ADD:
+            tasks[entry['task']['id']] = entry['task']
+        elif entry['op'] == PATCH:
+            if entry['id'] in tasks:
+                tasks[entry['id']] = tasks[entry['id']] | entry['fields']
+        elif entry['op'] == DELETE:
+            tasks.pop(entry['id'], None)
+
+
+class ShardedStorage(Storage):
+    """Хранилище, разделенное по категориям.
+
+    База данных - каталог, в котором задачи каждой категории (без учета
+    регистра) лежат в отдельном JSON-файле (шарде), а манифест
+    'manifest.json' хранит соответствие категорий и шардов. Изменение
+    перезаписывает только шарды затронутых категорий, выборка по
+    категории читает один шард, а шард, в котором не осталось задач,
+    удаляется. Манифест перезаписывается при каждом изменении, и его
+    отпечаток служит отпечатком всего хранилища. Манифест и шарды
+    читаются под разделяемой блокировкой, а шарды, которых больше нет
+    в манифесте, удаляются только после его замены"""
+
+    incremental = True
+    native_queries = frozenset({"category"})
+
+    def __init__(self, file: str) -> None:
+        """
+        Args:
+            file (str): путь к каталогу базы данных
+        """
+        os.makedirs(file, exist_ok=True)
+        super().__init__(file)
+        self.meta_file = os.path.join(file, "meta.json")
+        self.lock = FileLock(os.path.join(file, "lock"))
+        self.manifest_file = os.path.join(file, "manifest.json")
+        self._manifest: Optional[dict] = None
+        self._manifest_signature = None
+
+    def signature(self) -> tuple:
+        return (file_signature(self.manifest_file),)
+
+    @stats.timed()
+    def load(self) -> list[dict]:
+        tasks = []
+        with self.lock.shared():
+            for path in self._shard_files():
+                tasks.extend(read_json_tasks(path))
+        tasks.sort(key=lambda task: task['id'])
+        return tasks
+
+    def iter_tasks(self) -> Iterator[dict]:
+        # Шарды только открываются под блокировкой: открытый файл можно
+        # дочитать, даже если писатель потом подменит или удалит его
+        files = []
+        with self.lock.shared():
+            try:
+                for path in self._shard_files():
+                    files.append(open(path, "r", encoding="utf-8"))
+            except BaseException:
+                for shard_file in files:
+                    shard_file.close()
+                raise
+        # Задачи внутри шарда упорядочены по id, поэтому шарды сливаются потоково
+        return heapq.merge(
+            *(iter_json_array(shard_file) for shard_file in files),
+            key=lambda task: task['id']
+        )
+
+    @stats.timed()
+    def find(self, category: Optional[str] = None, status: Optional[str] = None) -> list[dict]:
+        if category is None:
+            return super().find(category, status)
+        with self.lock.shared():
+            shard = self._read_manifest()['shards'].get(category.lower())
+            if shard is None:
+                return []
+            tasks = read_json_tasks(os.path.join(self.file, shard['file']))
+        return [task for task in tasks if status is None or task['status'] == status]
+
+    @stats.timed()
+    def commit(self, ops: list[tuple], tasks: Optional[Collection[dict]]) -> None:
+        with self.lock:
+            # Кэш манифеста меняется только после успешной записи
+            manifest = copy.deepcopy(self._read_manifest())
+            # Категория (без учета регистра) -> задачи шарда по id
+            shards: dict[str, dict[int, dict]] = {}
+
+            def shard(category: str) -> dict[int, dict]:
+                key = category.lower()
+                if key not in shards:
+                    entry = manifest['shards'].get(key)
+                    shards[key] = {} if entry is None else {
+                        task['id']: task
+                        for task in read_json_tasks(os.path.join(self.file, entry['file']))
+                    }
+                return shards[key]
+
+            for op in ops:
+                kind, record = op[0], op[1]
+                if kind == ADD:
+                    shard(record['category'])[record['id']] = record
+                elif kind == PATCH:
+                    new = record | op[2]
+                    shard(record['category']).pop(record['id'], None)
+                    shard(new['category'])[record['id']] = new
+                else:
+                    shard(record['category']).pop(record['id'], None)
+
+            # Шарды опустевших категорий удаляются после замены манифеста:
+            # до этого старый манифест еще ссылается на них
+            removed = []
+            for key, shard_tasks in shards.items():
+                entry = manifest['shards'].get(key)
+                if not shard_tasks:
+                    if entry is not None:
+                        removed.append(os.path.join(self.file, entry['file']))
+                        del manifest['shards'][key]
+                    continue
+                if entry is None:
+                    entry = manifest['shards'][key] = {"file": f"shard-{manifest['next_shard']}.json"}
+                    manifest['next_shard'] += 1
+                ordered = sorted(shard_tasks.values(), key=lambda task: task['id'])
+                write_json_tasks(os.path.join(self.file, entry['file']), ordered, atomic=True)
+
+            manifest['generation'] += 1
+            tmp_file = f"{self.manifest_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as manifest_file:
+                json.dump(manifest, manifest_file, ensure_ascii=False, indent=4)
+            os.replace(tmp_file, self.manifest_file)
+            self._manifest = manifest
+            self._manifest_signature = file_signature(self.manifest_file)
+            for path in removed:
+                os.remove(path)
+
+    def _read_manifest(self) -> dict:
+        """Возвращает манифест, перечитывая его, только если он изменился
+
+        Returns:
+            dict: манифест
+        """
+        signature = file_signature(self.manifest_file)
+        if self._manifest is None or signature != self._manifest_signature:
+            if signature is None:
+                self._manifest = {"generation": 0, "next_shard": 1, "shards": {}}
+            else:
+                with open(self.manifest_file, "r", encoding="utf-8") as manifest_file:
+                    self._manifest = json.load(manifest_file)
+            self._manifest_signature = signature
+        return self._manifest
+
+    def _shard_files(self) -> list[str]:
+        return [
+            os.path.join(self.file, entry['file'])
+            for entry in self._read_manifest()['shards'].values()
+        ]
+
+
+class SQLiteStorage(Storage):
+    """Хранилище в базе данных SQLite.
+
+    Изменения применяются построчно в одной транзакции, без перезаписи
+    всей базы. Таблица задач проиндексирована по id, категории (без учета
+    регистра), статусу и сроку выполнения, поэтому поиск задачи по id и
+    выборка по категории или статусу не требуют загрузки всех задач.
+    База работает в режиме WAL: чтение не блокируется записью."""
+
+    incremental = True
+    native_queries = frozenset({"id", "category", "status"})
+
+    schema = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY,
+            status TEXT NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT NOT NULL,
+            category TEXT NOT NULL,
+            category_key TEXT NOT NULL,
+            due_date TEXT NOT NULL,
+            priority TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS tasks_category ON tasks (category_key);
+        CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+        CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks (due_date);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    # Запросы имеют постоянный текст, поэтому sqlite3 подготавливает
+    # каждый из них один раз и берет из кэша подготовленных выражений.
+    # Изменение задачи записывает только измененные столбцы (вариантов
+    # немного, они тоже попадают в кэш): полная запись строки, прочитанной
+    # до изменения, стерла бы изменения других процессов
+    columns = ("status", "title", "description", "category", "due_date", "priority")
+    select_sql = "SELECT id, status, title, description, category, due_date, priority FROM tasks"
+    insert_sql = (
+        "INSERT INTO tasks (id, status, title, description, category, category_key, due_date, priority) "
+        "VALUES (:id, :status, :title, :description, :category, :category_key, :due_date, :priority)"
+    )
+    delete_sql = "DELETE FROM tasks WHERE id = ?"
+
+    def __init__(self, file: str) -> None:
+        # sqlite3 импортируется только при открытии базы SQLite,
+        # чтобы не замедлять запуск с другими хранилищами
+        import sqlite3
+
+        super().__init__(file)
+        self.connection = sqlite3.connect(file, check_same_thread=False)
+        self.connection.row_factory = self._row_factory
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(self.schema)
+
+    def signature(self) -> tuple:
+        # data_version меняется при изменениях из других соединений,
+        # total_changes - при изменениях из этого соединения
+        data_version = self.connection.execute("PRAGMA data_version").fetchone()
+        return data_version['data_version'], self.connection.total_changes
+
+    @stats.timed()
+    def load(self) -> list[dict]:
+        tasks = self.connection.execute(f"{self.select_sql} ORDER BY id").fetchall()
+        stats.count("records_scanned", len(tasks))
+        return tasks
+
+    def iter_tasks(self) -> Iterator[dict]:
+        # Отдельный курсор, чтобы перебор не мешал другим запросам
+        yield from self.connection.cursor().execute(f"{self.select_sql} ORDER BY id")
+
+    @stats.timed()
+    def commit(self, ops: list[tuple], tasks: Optional[Collection[dict]]) -> None:
+        with self.connection:
+            for op in ops:
+                kind, record = op[0], op[1]
+                if kind == DELETE:
+                    self.connection.execute(self.delete_sql, (record['id'],))
+                    continue
+                source = record if kind == ADD else op[2]
+                params = {key: str(value) for key, value in source.items() if key in self.columns}
+                if "category" in params:
+                    params['category_key'] = params['category'].lower()
+                if kind == ADD:
+                    self.connection.execute(self.insert_sql, params | {"id": record['id']})
+                elif params:
+                    assignments = ", ".join(f"{key} = :{key}" for key in params)
+                    self.connection.execute(
+                        f"UPDATE tasks SET {assignments} WHERE id = :id", params | {"id": record['id']}
+                    )
+
+    @stats.timed()
+    def get(self, task_id: int) -> Optional[dict]:
+        return self.connection.execute(f"{self.select_sql} WHERE id = ?", (task_id,)).fetchone()
+
+    @stats.timed()
+    def find(self, category: Optional[str] = None, status: Optional[str] = None) -> list[dict]:
+        conditions, params = [], []
+        if category is not None:
+            conditions.append("category_key = ?")
+            params.append(category.lower())
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(str(status))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self.connection.execute(f"{self.select_sql}{where} ORDER BY id", params).fetchall()
+
+    def next_id(self, floor: Optional[int] = None) -> int:
+        if floor is None:
+            floor = self.connection.execute(
+                "SELECT coalesce(max(id), 0) + 1 AS floor FROM tasks"
+            ).fetchone()['floor']
+        return max(self._read_next_id(), floor)
+
+    def allocate_ids(self, count: int, floor: Optional[int] = None) -> int:
+        # BEGIN IMMEDIATE сразу берет блокировку записи, поэтому чтение
+        # и увеличение счетчика атомарны для всех соединений
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            start = self.next_id(floor)
+            self._write_next_id(start + count)
+        except BaseException:
+            self.connection.rollback()
+            raise
+        self.connection.commit()
+        return start
+
+    def reserve_ids(self, next_id: int) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO meta (key, value) VALUES ('next_id', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = max(value, excluded.value)",
+                (next_id,)
+            )
+
+    def compact(self, tasks: Optional[list[dict]] = None) -> None:
+        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.connection.execute("VACUUM")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _read_next_id(self) -> int:
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'next_id'").fetchone()
+        return 1 if row is None else row['value']
+
+    def _write_next_id(self, next_id: int) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_id', ?)", (next_id,)
+        )
+
+    @staticmethod
+    def _row_factory(cursor: "sqlite3.Cursor", row: tuple) -> dict:
+        return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class MappedStorage(Storage):
+    """Хранилище из записей фиксированного размера, читаемых через mmap.
+
+    Файл базы данных состоит из заголовка и записей фиксированного
+    размера: id, флаги, коды статуса и приоритета, срок выполнения
+    (порядковый номер даты) и ссылки (смещение и длина) на строки
+    заголовка, описания и категории. Сами строки в UTF-8 лежат в куче -
+    файле '<база>.heap.<номер>'. Оба файла отображаются в память, поэтому
+    поиск по id (двоичный поиск: записи упорядочены по id) и отбор по
+    категории или статусу читают поля прямо из отображения, а словарь
+    создается только для найденных задач.
+
+    Добавление дописывает записи и строки в конец файлов. Изменение
+    переписывает запись на месте, а новые строки дописывает в кучу;
+    изменение только статуса записывает один байт. Удаление ставит
+    флаг в записи. compact удаляет помеченные записи и неиспользуемые
+    строки, записывая кучу с новым номером"""
+
+    incremental = True
+    native_queries = frozenset({"id", "category", "status"})
+
+    magic = b"TMREC1"
+    version = 1
+    # Сигнатура, версия, номер изменения, количество записей, номер кучи, флаги
+    header = struct.Struct("<6sHQQIB3x")
+    # id, флаги, статус, приоритет, срок выполнения, ссылки на заголовок,
+    # описание и категорию (смещение в куче и длина)
+    record = struct.Struct("<qBBBxiQIQIQI")
+    deleted_flag = 1
+    unsorted_flag = 1
+    flags_offset = 8
+    status_offset = 9
+
+    _statuses = list(Status)
+    _priorities = list(Priority)
+    _status_codes = {str(status): code for code, status in enumerate(_statuses)}
+    _priority_codes = {str(priority): code for code, priority in enumerate(_priorities)}
+
+    def __init__(self, file: str) -> None:
+        super().__init__(file)
+        if not os.path.isfile(file):
+            with open(self._heap_file(0), "wb"):
+                pass
+            with open(file, "wb") as records_file:
+                records_file.write(self.header.pack(self.magic, self.version, 0, 0, 0, 0))
+        self._records = b""
+        self._heap = b""
+        self._mapped: Optional[tuple] = None
+        # Категория -> ссылка на ее строку в куче (одинаковые категории
+        # хранятся в куче один раз) и смещение строки -> категория в нижнем регистре
+        self._category_refs: dict[str, tuple[int, int]] = {}
+        self._category_keys: dict[int, str] = {}
+
+    def signature(self) -> tuple:
+        self._map()
+        return self._mapped, self._read_header()[2]
+
+    @stats.timed()
+    def load(self) -> list[dict]:
+        return list(self.iter_tasks())
+
+    def iter_tasks(self) -> Iterator[dict]:
+        self._map()
+        for fields in self._iter_records():
+            yield self._to_dict(fields)
+
+    @stats.timed()
+    def get(self, task_id: int) -> Optional[dict]:
+        self._map()
+        slot = self._find_slot(task_id)
+        if slot is None:
+            return None
+        fields = self.record.unpack_from(self._records, self._offset(slot))
+        return self._to_dict(fields)
+
+    @stats.timed()
+    def find(self, category: Optional[str] = None, status: Optional[str] = None) -> list[dict]:
+        self._map()
+        key = None if category is None else category.lower()
+        code = None if status is None else self._status_codes.get(str(status))
+        if status is not None and code is None:
+            return []
+        tasks = []
+        for fields in self._iter_records():
+            if code is not None and fields[2] != code:
+                continue
+            if key is not None and self._category_key(fields[9], fields[10]) != key:
+                continue
+            tasks.append(self._to_dict(fields))
+        return tasks
+
+    @stats.timed()
+    def commit(self, ops: list[tuple], tasks: Optional[Collection[dict]]) -> None:
+        with self.lock:
+            try:
+                self._write(ops)
+            except BaseException:
+                # Ссылки на строки, которые не попали в кучу, недействительны
+                self._category_refs = {}
+                raise
+            self._map()
+
+    def _write(self, ops: list[tuple]) -> None:
+        """Записывает операции в файлы базы данных
+
+        Args:
+            ops (list[tuple]): список операций
+        """
+        self._map()
+        _, _, generation, count, heap, flags = self._read_header()
+        heap_size = len(self._heap)
+        heap_tail = bytearray()
+        # Новые записи, еще не записанные в файл: id -> поля записи
+        added: dict[int, list] = {}
+        last_id = self._slot_id(count - 1) if count else None
+
+        def heap_ref(text: str) -> tuple[int, int]:
+            data = text.encode()
+            ref = heap_size + len(heap_tail), len(data)
+            heap_tail.extend(data)
+            return ref
+
+        def category_ref(category: str) -> tuple[int, int]:
+            ref = self._category_refs.get(category)
+            if ref is None:
+                ref = self._category_refs[category] = heap_ref(category)
+            return ref
+
+        # Измененные существующие записи: номер -> поля и измененные части
+        changed: dict[int, list] = {}
+        parts: dict[int, set] = {}
+        for op in ops:
+            kind, record = op[0], op[1]
+            task_id = record['id']
+            if kind == ADD:
+                if last_id is not None and task_id <= last_id:
+                    flags |= self.unsorted_flag
+                last_id = task_id
+                added[task_id] = [
+                    task_id, 0,
+                    self._status_codes[str(record['status'])],
+                    self._priority_codes[str(record['priority'])],
+                    date.fromisoformat(str(record['due_date'])).toordinal(),
+                    *heap_ref(record['title']), *heap_ref(record['description']),
+                    *category_ref(record['category'])
+                ]
+                continue
+
+            fields = added.get(task_id)
+            if fields is None:
+                slot = self._find_slot(task_id)
+                if slot is None:
+                    continue
+                if slot not in changed:
+                    changed[slot] = list(self.record.unpack_from(self._records, self._offset(slot)))
+                    parts[slot] = set()
+                fields = changed[slot]
+                parts[slot].add("flags" if kind == DELETE else "status" if op[2].keys() == {"status"} else "record")
+            if kind == DELETE:
+                fields[1] |= self.deleted_flag
+                continue
+
+            changes = op[2]
+            if "status" in changes:
+                fields[2] = self._status_codes[str(changes['status'])]
+            if "priority" in changes:
+                fields[3] = self._priority_codes[str(changes['priority'])]
+            if "due_date" in changes:
+                fields[4] = date.fromisoformat(str(changes['due_date'])).toordinal()
+            if "title" in changes:
+                fields[5:7] = heap_ref(changes['title'])
+            if "description" in changes:
+                fields[7:9] = heap_ref(changes['description'])
+            if "category" in changes:
+                fields[9:11] = category_ref(changes['category'])
+
+        # Изменения на месте: смещение в файле -> байты. Отметка
+        # о выполнении или удаление записывают один байт
+        writes = {}
+        for slot, fields in changed.items():
+            offset = self._offset(slot)
+            if "record" in parts[slot]:
+                writes[offset] = self.record.pack(*fields)
+                continue
+            if "flags" in parts[slot]:
+                writes[offset + self.flags_offset] = bytes([fields[1]])
+            if "status" in parts[slot]:
+                writes[offset + self.status_offset] = bytes([fields[2]])
+
+        if heap_tail:
+            with open(self._heap_file(heap), "ab") as heap_file:
+                heap_file.write(heap_tail)
+        with open(self.file, "r+b") as records_file:
+            for offset, data in writes.items():
+                os.pwrite(records_file.fileno(), data, offset)
+            if added:
+                records_file.seek(self._offset(count))
+                records_file.write(b"".join(self.record.pack(*fields) for fields in added.values()))
+            records_file.seek(0)
+            records_file.write(self.header.pack(
+                self.magic, self.version, generation + 1, count + len(added), heap, flags
+            ))
+        stats.count(
+            "bytes_written",
+            len(heap_tail) + sum(map(len, writes.values())) + len(added) * self.record.size
+        )
+
+    def compact(self, tasks: Optional[list[dict]] = None) -> None:
+        with self.lock:
+            self._map()
+            _, _, generation, _, heap, _ = self._read_header()
+            heap_tail = bytearray()
+            category_refs: dict[str, tuple[int, int]] = {}
+            records = bytearray()
+
+            def heap_ref(data: bytes) -> tuple[int, int]:
+                ref = len(heap_tail), len(data)
+                heap_tail.extend(data)
+                return ref
+
+            count = 0
+            unsorted = False
+            last_id = None
+            for fields in self._iter_records():
+                category = self._heap[fields[9]:fields[9] + fields[10]]
+                ref = category_refs.get(category)
+                if ref is None:
+                    ref = category_refs[category] = heap_ref(category)
+                records += self.record.pack(
+                    *fields[:5],
+                    *heap_ref(self._heap[fields[5]:fields[5] + fields[6]]),
+                    *heap_ref(self._heap[fields[7]:fields[7] + fields[8]]),
+                    *ref
+                )
+                unsorted = unsorted or (last_id is not None and fields[0] <= last_id)
+                last_id = fields[0]
+                count += 1
+
+            with open(self._heap_file(heap + 1), "wb") as heap_file:
+                heap_file.write(heap_tail)
+                heap_file.flush()
+                os.fsync(heap_file.fileno())
+            tmp_file = f"{self.file}.tmp"
+            with open(tmp_file, "wb") as records_file:
+                records_file.write(self.header.pack(
+                    self.magic, self.version, generation + 1, count, heap + 1,
+                    self.unsorted_flag if unsorted else 0
+                ))
+                records_file.write(records)
+                records_file.flush()
+                os.fsync(records_file.fileno())
+            os.replace(tmp_file, self.file)
+            os.remove(self._heap_file(heap))
+            self._map()
+
+    def close(self) -> None:
+        self._records = self._heap = b""
+        self._mapped = None
+
+    def next_id(self, floor: Optional[int] = None) -> int:
+        if floor is None:
+            self._map()
+            _, _, _, count, _, flags = self._read_header()
+            if flags & self.unsorted_flag:
+                floor = max((task['id'] for task in self.iter_tasks()), default=0) + 1
+            else:
+                # id удаленных записей тоже учитываются: они не выдаются повторно
+                floor = (self._slot_id(count - 1) if count else 0) + 1
+        return max(self._read_next_id(), floor)
+
+    def _heap_file(self, number: int) -> str:
+        return f"{self.file}.heap.{number}"
+
+    def _read_header(self) -> tuple:
+        header = self.header.unpack_from(self._records)
+        if header[0] != self.magic or header[1] != self.version:
+            raise ValueError(f"Файл '{self.file}' не является базой данных с записями фиксированного размера")
+        return header
+
+    def _map(self) -> None:
+        """Отображает файлы в память заново, если они изменились
+        (например, другим процессом)"""
+        records_stat = os.stat(self.file)
+        if self._mapped is None or self._mapped[:2] != (records_stat.st_ino, records_stat.st_size):
+            if self._mapped is None or self._mapped[0] != records_stat.st_ino:
+                # Файл заменен (уплотнен): ссылки на строки кучи устарели
+                self._category_refs = {}
+                self._category_keys = {}
+            with open(self.file, "rb") as records_file:
+                self._records = mmap.mmap(records_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._mapped = records_stat.st_ino, records_stat.st_size, None, None
+
+        heap = self._read_header()[4]
+        heap_file = self._heap_file(heap)
+        heap_size = os.path.getsize(heap_file)
+        if self._mapped[2:] != (heap, heap_size):
+            if heap_size:
+                with open(heap_file, "rb") as heap_stream:
+                    self._heap = mmap.mmap(heap_stream.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self._heap = b""
+            self._mapped = *self._mapped[:2], heap, heap_size
+
+    def _offset(self, slot: int) -> int:
+        return self.header.size + slot * self.record.size
+
+    def _slot_id(self, slot: int) -> int:
+        return struct.unpack_from("<q", self._records, self._offset(slot))[0]
+
+    def _find_slot(self, task_id: int) -> Optional[int]:
+        """Возвращает номер записи задачи с указанным id или None.
+        Записи упорядочены по id, поэтому используется двоичный поиск"""
+        _, _, _, count, _, flags = self._read_header()
+        if flags & self.unsorted_flag:
+            slots = (slot for slot in range(count) if self._slot_id(slot) == task_id)
+            slot = next(slots, None)
+        else:
+            low, high = 0, count
+            while low < high:
+                middle = (low + high) // 2
+                if self._slot_id(middle) < task_id:
+                    low = middle + 1
+                else:
+                    high = middle
+            slot = low if low < count and self._slot_id(low) == task_id else None
+        if slot is None:
+            return None
+        if self._records[self._offset(slot) + self.flags_offset] & self.deleted_flag:
+            return None
+        return slot
+
+    def _iter_records(self) -> Iterator[tuple]:
+        """Перебирает поля неудаленных записей, не создавая словарей"""
+        count = self._read_header()[3]
+        scanned = 0
+        with memoryview(self._records) as view:
+            for fields in self.record.iter_unpack(view[self.header.size:self._offset(count)]):
+                scanned += 1
+                if not fields[1] & self.deleted_flag:
+                    yield fields
+        stats.count("records_scanned", scanned)
+
+    def _category_key(self, offset: int, length: int) -> str:
+        """Возвращает категорию в нижнем регистре по ссылке на строку кучи"""
+        key = self._category_keys.get(offset)
+        if key is None:
+            category = self._string(offset, length)
+            self._category_refs.setdefault(category, (offset, length))
+            key = self._category_keys[offset] = category.lower()
+        return key
+
+    def _string(self, offset: int, length: int) -> str:
+        return self._heap[offset:offset + length].decode()
+
+    def _to_dict(self, fields: tuple) -> dict:
+        return {
+            "id": fields[0],
+            "status": str(self._statuses[fields[2]]),
+            "title": self._string(fields[5], fields[6]),
+            "description": self._string(fields[7], fields[8]),
+            "category": self._string(fields[9], fields[10]),
+            "due_date": date.fromordinal(fields[4]).isoformat(),
+            "priority": str(self._priorities[fields[3]])
+        }
+
+
+backends = {
+    "json": JsonStorage,
+    "jsonl": JsonlStorage,
+    "journal": JournalStorage,
+    "sqlite": SQLiteStorage,
+    "mapped": MappedStorage,
+    "sharded": ShardedStorage
+}
+
+extensions = {
+    ".jsonl": "jsonl",
+    ".tmdb": "mapped",
+    ".shards": "sharded",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+    ".db": "sqlite"
+}
+
+
+def open_storage(file: str, backend: Optional[str] = None, **options) -> Storage:
+    """Открывает хранилище базы данных
+
+    Args:
+        file (str): путь к файлу базы данных
+        backend (Optional[str], optional): тип хранилища ("json", "jsonl",
+            "journal", "sqlite", "mapped", "sharded"). По умолчанию определяется
+            по расширению файла, для каталога - "sharded".
+        options: параметры конструктора хранилища (например, snapshot=True
+            для JSON)
+
+    Raises:
+        ValueError: если тип хранилища неизвестен
+
+    Returns:
+        Storage: хранилище
+    """
+    if backend is None and os.path.isdir(file):
+        backend = "sharded"
+    if backend is None:
+        backend = extensions.get(os.path.splitext(file)[1].lower(), "json")
+    if backend not in backends:
+        raise ValueError(f"Неизвестный тип хранилища '{backend}'")
+    return backends[backend](file, **options)
+
+
+def migrate(
+    source: str, target: str,
+    source_backend: Optional[str] = None,
+    target_backend: Optional[str] = None
+) -> int:
+    """Переносит все задачи из одной базы данных в другую
+
+    Args:
+        source (str): путь к исходной базе данных
+        target (str): путь к новой базе данных
+        source_backend (Optional[str], optional): тип исходного хранилища
+        target_backend (Optional[str], optional): тип нового хранилища
+
+    Raises:
+        ValueError: если новая база данных не пуста
+
+    Returns:
+        int: количество перенесенных задач
+    """
+    source_storage = open_storage(source, source_backend)
+    target_storage = open_storage(target, target_backend)
+    try:
+        if target_storage.load():
+            raise ValueError(f"База данных '{target}' не пуста")
+        tasks = source_storage.load()
+        target_storage.commit([(ADD, task) for task in tasks], tasks)
+        target_storage.reserve_ids(source_storage.next_id())
+        return len(tasks)
+    finally:
+        source_storage.close()
+        target_storage.close()
@@ -0,0 +1,120 @@
+# Модуль, описывающий потоковое чтение файлов базы данных.
+# Задачи читаются по одной, без загрузки всего файла в память
+
+
+import json
+from typing import Iterator, TextIO, Union
+
+from stats import stats
+
+
+def iter_json_array(path: Union[str, TextIO], chunk_size: int = 64 * 1024) -> Iterator[dict]:
+    """Потоково читает элементы JSON-массива из файла.
+    В памяти одновременно находится не больше одного элемента
+    и одного блока файла. Пустой файл - пустой массив
+
+    Args:
+        path (Union[str, TextIO]): путь к файлу или уже открытый файл
+            (он закрывается после чтения)
+        chunk_size (int, optional): размер читаемого блока в символах.
+            По умолчанию 64 КБ.
+
+    Raises:
+        json.JSONDecodeError: если файл не является JSON-массивом
+
+    Yields:
+        dict: элемент массива
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") if isinstance(path, str) else path as json_file:
+        buffer = ""
+        pos = 0
+        eof = False
+        started = False
+        scanned = 0
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = json_file.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            return True
+
+        try:
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    pos += 1
+                if pos == len(buffer):
+                    if fill():
+                        continue
+                    if started:
+                        raise json.JSONDecodeError("Незавершенный массив", buffer, pos)
+                    return
+
+                if not started:
+                    if buffer[pos] != "[":
+                        raise json.JSONDecodeError("Ожидался массив", buffer, pos)
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == "]":
+                    return
+
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise
+                if end == len(buffer) and not eof and fill():
+                    # Значение может продолжаться в следующем блоке (например, число)
+                    continue
+                pos = end
+                scanned += 1
+                yield item
+        finally:
+            _count_read(json_file, scanned)
+
+
+def iter_json_lines(path: str) -> Iterator[dict]:
+    """Потоково читает файл, в каждой строке которого записан один JSON-объект.
+    Недописанная последняя строка (без перевода строки) пропускается
+
+    Args:
+        path (str): путь к файлу
+
+    Yields:
+        dict: объект из очередной строки
+    """
+    scanned = 0
+    with open(path, "r", encoding="utf-8") as jsonl_file:
+        try:
+            for line in jsonl_file:
+                if not line.strip():
+                    continue
+                try:
+                    task = json.loads(line)
+                except json.JSONDecodeError:
+                    if line.endswith("\n"):
+                        raise
+                    # Последняя строка, недописанная при сбое
+                    break
+                scanned += 1
+                yield task
+        finally:
+            _count_read(jsonl_file, scanned)
+
+
+def _count_read(stream, scanned: int) -> None:
+    """Учитывает в статистике один разбор файла
+
+    Args:
+        stream: открытый текстовый файл
+        scanned (int): количество прочитанных записей
+    """
+    stats.count("parses")
+    stats.count("records_scanned", scanned)
+    stats.count("bytes_read", stream.buffer.tell())
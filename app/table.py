@@ -1,22 +1,194 @@
 # Модуль для работы с таблицей PrettyTable.
 # Это таблица, которая выводится в консоль при выборе пользователем, например,
-# опции "Посмотреть все задачи"
+# опции "Посмотреть все задачи".
+# Библиотека prettytable импортируется при выводе первой таблицы,
+# а не при запуске программы
+#
+# Для больших выборок есть PlainTable - таблица того же вида, которая
+# выводится построчно: ширина столбцов вычисляется заранее по образцу
+# строк, поэтому строки не нужно собирать в памяти. Значения, которые
+# длиннее столбца, переносятся на следующие строки, а не обрезаются
 
 
-from prettytable import PrettyTable
+import re
+from typing import Iterable, Optional, Sequence
 
 
 field_names = [
     'ID', 'Статус', 'Заголовок', 'Описание', 'Категория', 'Срок выполнения', 'Приоритет'
 ]
 
+# Символы, ширина которых на экране может отличаться от 1: все, кроме
+# латиницы, греческого алфавита и кириллицы без комбинируемых знаков
+_complex_text = re.compile("[^\u0000-\u02ff\u0370-\u0482\u048a-\u04ff]")
+
+
 def fill_table(data: list) -> None:
     """Заполняет таблицу PrettyTable данными.
 
     Параметры:
         data (list): список с данными
     """
+    from prettytable import PrettyTable
+
     table = PrettyTable()
     table.field_names = field_names
     table.add_rows(data)
     return table
+
+
+def text_width(text: str) -> int:
+    """Возвращает ширину текста на экране. Для ASCII и кириллицы это
+    длина строки, и только для остальных символов (иероглифы, эмодзи,
+    комбинируемые знаки) используется wcwidth
+
+    Args:
+        text (str): текст
+
+    Returns:
+        int: количество позиций
+    """
+    if text.isascii() or not _complex_text.search(text):
+        return len(text)
+    from wcwidth import wcswidth
+
+    width = wcswidth(text)
+    return len(text) if width < 0 else width
+
+
+def wrap(text: str, width: int) -> list[str]:
+    """Разбивает текст на строки шириной не больше width, по возможности
+    по пробелам. Переводы строк в тексте сохраняются
+
+    Args:
+        text (str): текст
+        width (int): ширина
+
+    Returns:
+        list[str]: строки
+    """
+    lines = []
+    for paragraph in text.split("\n"):
+        while text_width(paragraph) > width:
+            end = min(width, len(paragraph))
+            while end > 1 and text_width(paragraph[:end]) > width:
+                end -= 1
+            space = paragraph.rfind(" ", 0, end + 1)
+            if space > 0:
+                end = space
+            lines.append(paragraph[:end].rstrip())
+            paragraph = paragraph[end:].lstrip()
+        lines.append(paragraph)
+    return lines
+
+
+def fit(text: str, width: int) -> str:
+    """Выравнивает текст по центру (как PrettyTable) или обрезает его
+    до ширины width
+
+    Args:
+        text (str): текст
+        width (int): ширина
+
+    Returns:
+        str: текст шириной width
+    """
+    size = text_width(text)
+    if size <= width:
+        left = (width - size) // 2
+        return " " * left + text + " " * (width - size - left)
+    # Обрезаем с конца, пока текст с многоточием не поместится
+    text = text[:width - 1]
+    while text and text_width(text) > width - 1:
+        text = text[:-1]
+    return text + "…" + " " * (width - 1 - text_width(text))
+
+
+class PlainTable:
+    """Таблица в стиле PrettyTable с заданной шириной столбцов,
+    которая форматирует строки по одной"""
+
+    def __init__(self, names: Sequence[str], widths: Sequence[int]) -> None:
+        """
+        Args:
+            names (Sequence[str]): заголовки столбцов
+            widths (Sequence[int]): ширина столбцов
+        """
+        self.names = list(names)
+        self.widths = list(widths)
+        self.border = "+" + "+".join("-" * (width + 2) for width in self.widths) + "+"
+
+    @classmethod
+    def from_sample(
+        cls, rows: Iterable[Sequence],
+        names: Sequence[str] = field_names,
+        max_width: Optional[int] = None
+    ) -> "PlainTable":
+        """Создает таблицу, ширина столбцов которой достаточна для строк
+        образца. Если таблица шире max_width, самые широкие столбцы
+        сужаются (не уже заголовка), и длинные значения в них переносятся
+
+        Args:
+            rows (Iterable[Sequence]): образец строк
+            names (Sequence[str], optional): заголовки столбцов
+            max_width (Optional[int], optional): наибольшая ширина таблицы
+                (например, ширина терминала). По умолчанию не ограничена.
+
+        Returns:
+            PlainTable: таблица
+        """
+        minimums = [text_width(name) for name in names]
+        widths = list(minimums)
+        for row in rows:
+            for column, value in enumerate(row):
+                size = max(map(text_width, str(value).split("\n")))
+                if size > widths[column]:
+                    widths[column] = size
+        if max_width is not None:
+            # Рамки и отступы: "| " в начале, " | " между столбцами, " |" в конце
+            excess = sum(widths) + 3 * len(widths) + 1 - max_width
+            while excess > 0:
+                column = max(range(len(widths)), key=lambda i: widths[i] - minimums[i])
+                if widths[column] <= minimums[column]:
+                    break
+                widths[column] -= 1
+                excess -= 1
+        return cls(names, widths)
+
+    def header(self) -> list[str]:
+        """Возвращает строки заголовка таблицы
+
+        Returns:
+            list[str]: строки
+        """
+        return [self.border, self.format_row(self.names), self.border]
+
+    def format_row(self, row: Sequence) -> str:
+        """Форматирует одну строку таблицы. Значения, которые не помещаются
+        в столбец, переносятся, и строка таблицы занимает несколько строк текста
+
+        Args:
+            row (Sequence): значения столбцов
+
+        Returns:
+            str: строка (строки текста разделены переводом строки)
+        """
+        cells = [wrap(str(value), width) for value, width in zip(row, self.widths)]
+        return "\n".join(
+            "| " + " | ".join(
+                fit(cell[line] if line < len(cell) else "", width)
+                for cell, width in zip(cells, self.widths)
+            ) + " |"
+            for line in range(max(map(len, cells)))
+        )
+
+    def render(self, rows: Iterable[Sequence]) -> str:
+        """Возвращает таблицу целиком
+
+        Args:
+            rows (Iterable[Sequence]): строки
+
+        Returns:
+            str: таблица
+        """
+        return "\n".join(self.header() + [self.format_row(row) for row in rows] + [self.border])
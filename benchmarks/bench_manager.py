@@ -0,0 +1,230 @@
+# Бенчмарк операций TaskManager на синтетических базах данных разного размера.
+#
+# Для каждого размера базы измеряются все операции менеджера и вывод
+# таблицы задач: пропускная способность, перцентили задержки и пиковая
+# память. Результаты сохраняются в JSON, их можно сравнить с прошлым
+# запуском, чтобы найти регрессии.
+#
+# Запуск (из корня проекта):
+#     python3 benchmarks/bench_manager.py --sizes 1000 10000 --output results.json
+#     python3 benchmarks/bench_manager.py --sizes 1000 10000 --compare results.json
+
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from typing import Callable, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from actions import iter_task_rows, task_rows
+from datagen import write_database
+from managers import TaskManager
+from models import Task, Priority, Status
+from pager import Pager, iter_table
+from storages import backends, migrate
+from table import fill_table
+
+
+def open_manager(file: str, backend: Optional[str]) -> TaskManager:
+    """Открывает менеджер задач, не печатая сообщений о подключении"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return TaskManager(file, backend)
+
+
+def create_database(directory: str, size: int, backend: str, options: dict) -> str:
+    """Создает синтетическую базу данных нужного типа
+
+    Args:
+        directory (str): каталог для базы данных
+        size (int): количество задач
+        backend (str): тип хранилища
+        options (dict): параметры generate_tasks
+
+    Returns:
+        str: путь к базе данных
+    """
+    source = os.path.join(directory, f"source-{size}.json")
+    write_database(source, size, **options)
+    if backend == "json":
+        return source
+    target = os.path.join(directory, f"tasks-{size}.{backend}")
+    migrate(source, target, target_backend=backend)
+    return target
+
+
+def measure(func: Callable[[int], object], repeat: int) -> dict:
+    """Измеряет операцию: repeat запусков для задержки и один
+    запуск под tracemalloc для пиковой памяти
+
+    Args:
+        func (Callable[[int], object]): операция, принимающая номер запуска
+        repeat (int): количество запусков
+
+    Returns:
+        dict: результаты измерения
+    """
+    latencies = []
+    for attempt in range(repeat):
+        start = time.perf_counter()
+        func(attempt)
+        latencies.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(repeat)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    quantiles = statistics.quantiles(latencies, n=100, method="inclusive") if repeat > 1 else latencies * 99
+    return {
+        "runs": repeat,
+        "throughput": repeat / sum(latencies),
+        "p50_ms": quantiles[49] * 1000,
+        "p90_ms": quantiles[89] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "max_ms": max(latencies) * 1000,
+        "peak_memory_bytes": peak
+    }
+
+
+def bench_size(file: str, size: int, backend: str, repeat: int, options: dict) -> dict:
+    """Измеряет все операции на базе данных одного размера
+
+    Args:
+        file (str): путь к базе данных
+        size (int): количество задач в базе
+        backend (str): тип хранилища
+        repeat (int): количество запусков каждой операции
+        options (dict): параметры generate_tasks
+
+    Returns:
+        dict: название операции -> результаты измерения
+    """
+    rng = random.Random(size)
+    words = [f"слово{i}" for i in range(options['vocabulary'])]
+    categories = [f"Категория {i}" for i in range(options['categories'])]
+    manager = open_manager(file, backend)
+    manager.tasks
+    ids = iter(rng.sample(range(1, size + 1), min(size, 3 * (repeat + 1))))
+
+    def new_task(attempt: int) -> Task:
+        return Task(
+            f"Новая задача {attempt}", "Описание", rng.choice(categories),
+            date(2124, 1, 1), Priority.medium
+        )
+
+    operations = {
+        "load": lambda _: open_manager(file, backend).tasks,
+        "get_task_from_id": lambda _: manager.get_task_from_id(rng.randint(1, size)),
+        "task_exists": lambda _: manager.task_exists(rng.randint(1, size)),
+        "tasks_for_category": lambda _: manager.tasks_for_category(rng.choice(categories)),
+        "search_task": lambda _: manager.search_task(rng.choice(words)),
+        "add_task": lambda attempt: manager.add_task(new_task(attempt)),
+        "change_task": lambda _: manager.change_task(next(ids), title="Измененная задача"),
+        "mark_task_as_done": lambda _: manager.patch(next(ids), status=Status.done),
+        "delete_task_by_id": lambda _: manager.delete_task_by_id(next(ids)),
+        "render_table": lambda _: fill_table(task_rows(manager.tasks)).get_string(),
+        "render_page": lambda _: Pager(iter_task_rows(manager.iter_tasks()), page_size=50).render(),
+        "render_stream": lambda _: sum(1 for _ in iter_table(iter_task_rows(manager.iter_tasks()))),
+        "delete_task_by_category": lambda _: manager.delete_task_by_category(categories.pop()),
+    }
+
+    results = {}
+    for name, operation in operations.items():
+        runs = min(repeat, len(categories) - 1) if name == "delete_task_by_category" else repeat
+        results[name] = measure(operation, max(runs, 1))
+        print(f"  {name:<24} p50 {results[name]['p50_ms']:10.3f} мс  "
+              f"{results[name]['throughput']:12.1f} оп/с  "
+              f"пик {results[name]['peak_memory_bytes'] / 2**20:8.1f} МБ")
+    manager.close()
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Сравнивает медианную задержку с прошлым запуском
+
+    Args:
+        results (dict): результаты текущего запуска
+        baseline (dict): результаты прошлого запуска
+        threshold (float): допустимый рост задержки (0.2 - на 20%)
+
+    Returns:
+        list[str]: описания регрессий
+    """
+    regressions = []
+    for size, operations in results.items():
+        for name, result in operations.items():
+            old = baseline.get(size, {}).get(name)
+            if old is None or old['p50_ms'] == 0:
+                continue
+            ratio = result['p50_ms'] / old['p50_ms']
+            if ratio > 1 + threshold:
+                regressions.append(
+                    f"{size} задач, {name}: {old['p50_ms']:.3f} -> {result['p50_ms']:.3f} мс (x{ratio:.2f})"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк операций TaskManager")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000],
+                        help="размеры баз данных")
+    parser.add_argument("--backend", choices=backends, default="json", help="тип хранилища")
+    parser.add_argument("--repeat", type=int, default=10, help="количество запусков каждой операции")
+    parser.add_argument("--categories", type=int, default=50, help="количество категорий")
+    parser.add_argument("--vocabulary", type=int, default=2000, help="количество различных слов")
+    parser.add_argument("--seed", type=int, default=0, help="начальное значение генератора данных")
+    parser.add_argument("--output", help="файл для сохранения результатов в JSON")
+    parser.add_argument("--compare", help="файл с результатами прошлого запуска")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="допустимый рост медианной задержки при сравнении")
+    args = parser.parse_args()
+
+    options = {"categories": args.categories, "vocabulary": args.vocabulary, "seed": args.seed}
+    results = {}
+    directory = tempfile.mkdtemp(prefix="task-manager-bench-")
+    try:
+        for size in args.sizes:
+            print(f"{size} задач ({args.backend}):")
+            file = create_database(directory, size, args.backend, options)
+            results[str(size)] = bench_size(file, size, args.backend, args.repeat, options)
+    finally:
+        shutil.rmtree(directory)
+
+    report = {
+        "meta": {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "repeat": args.repeat,
+            "options": options
+        },
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(report, output, ensure_ascii=False, indent=4)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as baseline:
+            regressions = compare(results, json.load(baseline)['results'], args.threshold)
+        for regression in regressions:
+            print(f"Регрессия: {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
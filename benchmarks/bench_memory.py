@@ -0,0 +1,97 @@
+# Бенчмарк памяти, занимаемой задачами в разных представлениях.
+#
+# Запуск (из корня проекта):
+#     python3 benchmarks/bench_memory.py --count 1000000
+
+
+import argparse
+import gc
+import glob
+import json
+import os
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from datetime import date
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from columns import TaskColumns
+from datagen import generate_tasks
+from managers import TaskManager
+from models import Task, compact_record
+
+
+@dataclass
+class DictTask:
+    """Модель задачи без __slots__ (как Task до появления слотов)"""
+
+    title: str
+    description: str
+    category: str
+    due_date: date
+    priority: str
+    id: int
+    status: str
+
+
+def measure(build) -> int:
+    """Возвращает объем памяти в байтах, занятый результатом build()"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Память, занимаемая задачами")
+    parser.add_argument("--count", type=int, default=1_000_000, help="количество задач")
+    parser.add_argument("--categories", type=int, default=50, help="количество категорий")
+    args = parser.parse_args()
+
+    text = json.dumps(list(generate_tasks(args.count, categories=args.categories)), ensure_ascii=False)
+
+    def task_objects(cls):
+        return [
+            cls(
+                title=task['title'], description=task['description'],
+                category=task['category'], due_date=date.fromisoformat(task['due_date']),
+                priority=task['priority'], id=task['id'], status=task['status']
+            )
+            for task in json.loads(text)
+        ]
+
+    def manager():
+        # Кэш работающего менеджера: записи задач и индексы по категории,
+        # статусу, приоритету и сроку выполнения
+        manager = TaskManager(database.name, exclusive=True)
+        manager.get_task_from_id(1)
+        return manager
+
+    representations = {
+        "dict (json.load)": lambda: json.loads(text),
+        "dict (compact_record)": lambda: [compact_record(task) for task in json.loads(text)],
+        "Task без __slots__": lambda: task_objects(DictTask),
+        "Task со __slots__": lambda: task_objects(Task),
+        "TaskManager": manager,
+        # Отдельный эксперимент: TaskManager колонки не использует
+        "TaskColumns": lambda: TaskColumns(json.loads(text))
+    }
+    with tempfile.NamedTemporaryFile("w", suffix=".json", encoding="utf-8", delete=False) as database:
+        database.write(text)
+    try:
+        print(f"Задач: {args.count}")
+        for name, build in representations.items():
+            size = measure(build)
+            print(f"{name:<24} {size / 2**20:9.1f} МБ  {size / args.count:7.1f} байт/задача")
+    finally:
+        for file in glob.glob(database.name + "*"):
+            os.remove(file)
+
+
+if __name__ == "__main__":
+    main()
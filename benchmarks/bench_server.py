@@ -0,0 +1,154 @@
+# Нагрузочный тест HTTP-сервера менеджера задач (app/server.py).
+#
+# Сервер запускается в отдельном процессе на временной базе данных.
+# Клиенты держат открытые соединения (keep-alive) и в течение заданного
+# времени отправляют запросы: чтение задачи по id, выборку по категории
+# и, с долей --writes, изменение задачи. Выводятся запросы в секунду
+# и задержки (медиана, 95-й и 99-й процентили) по видам запросов.
+#
+# Запуск (из корня проекта):
+#     python3 benchmarks/bench_server.py --size 10000 --clients 32 --seconds 5
+
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from datagen import write_database
+
+
+SERVER = os.path.join(os.path.dirname(__file__), "..", "app", "server.py")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def request(reader, writer, method: str, path: str, body: dict = None) -> int:
+    """Отправляет запрос по открытому соединению и читает ответ
+
+    Returns:
+        int: код ответа
+    """
+    data = b"" if body is None else json.dumps(body).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+    )
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(port: int, size: int, writes: float, deadline: float, latencies: dict) -> None:
+    """Отправляет запросы, пока не наступит deadline"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            task_id = random.randint(1, size)
+            roll = random.random()
+            if roll < writes:
+                kind, method, path, body = "change", "PATCH", f"/tasks/{task_id}", {"title": f"title {roll}"}
+            elif roll < (1 + writes) / 2:
+                kind, method, path, body = "get", "GET", f"/tasks/{task_id}", None
+            else:
+                category = quote(f"Категория {task_id % 50}")
+                kind, method, path, body = "query", "GET", f"/tasks?category={category}&limit=20", None
+            start = time.perf_counter()
+            status = await request(reader, writer, method, path, body)
+            if status != 200:
+                raise RuntimeError(f"{method} {path}: {status}")
+            latencies.setdefault(kind, []).append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+def percentile(values: list[float], share: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def load(port: int, args: argparse.Namespace, clients: int) -> dict:
+    latencies: dict[str, list[float]] = {}
+    deadline = time.perf_counter() + args.seconds
+    await asyncio.gather(*(
+        client(port, args.size, args.writes, deadline, latencies) for _ in range(clients)
+    ))
+    return latencies
+
+
+def run_load(port: int, args: argparse.Namespace, clients: int) -> dict:
+    """Процесс-генератор нагрузки: один клиент на Python не успевает
+    загрузить сервер, поэтому клиенты распределяются по процессам"""
+    return asyncio.run(load(port, args, clients))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест HTTP-сервера")
+    parser.add_argument("--size", type=int, default=10000, help="количество задач в базе данных")
+    parser.add_argument("--clients", type=int, default=32, help="количество одновременных клиентов")
+    parser.add_argument("--seconds", type=float, default=5, help="длительность теста")
+    parser.add_argument("--processes", type=int, default=4, help="количество процессов с клиентами")
+    parser.add_argument("--writes", type=float, default=0.1, help="доля запросов на изменение")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="task-manager-server-")
+    file = os.path.join(directory, "tasks.json")
+    write_database(file, args.size)
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, SERVER, "--db", file, "--port", str(port)],
+        stderr=subprocess.PIPE, text=True
+    )
+    try:
+        # Сервер сообщает о запуске после загрузки задач
+        while "Сервер запущен" not in server.stderr.readline():
+            if server.poll() is not None:
+                raise RuntimeError("Сервер не запустился")
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.starmap(run_load, [
+                (port, args, args.clients // args.processes + (number < args.clients % args.processes))
+                for number in range(args.processes)
+            ])
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(directory)
+
+    latencies: dict[str, list[float]] = {}
+    for result in results:
+        for kind, values in result.items():
+            latencies.setdefault(kind, []).extend(values)
+    total = sum(len(values) for values in latencies.values())
+    print(f"Клиентов: {args.clients}, задач: {args.size}, доля изменений: {args.writes}")
+    print(f"Запросов в секунду: {total / args.seconds:.0f}")
+    print(f"{'Запрос':<10}{'Количество':>12}{'Медиана, мс':>14}{'p95, мс':>10}{'p99, мс':>10}")
+    for kind, values in sorted(latencies.items()):
+        values.sort()
+        print(
+            f"{kind:<10}{len(values):>12}{statistics.median(values) * 1000:>14.2f}"
+            f"{percentile(values, 0.95) * 1000:>10.2f}{percentile(values, 0.99) * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
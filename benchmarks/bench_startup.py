@@ -0,0 +1,84 @@
+# Бенчмарк холодного запуска: каждое измерение выполняется в новом
+# процессе интерпретатора.
+#
+# Измеряются импорт модулей приложения, первое чтение JSON-базы данных
+# и первое чтение из бинарного снимка. Из всех времен вычитается время
+# запуска пустого интерпретатора.
+#
+# Запуск (из корня проекта):
+#     python3 benchmarks/bench_startup.py --sizes 1000 100000
+
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from datagen import write_database
+
+
+APP = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+IMPORTS = "import menu, managers"
+FIRST_READ = (
+    "import contextlib, io\n"
+    "from managers import TaskManager\n"
+    "with contextlib.redirect_stdout(io.StringIO()):\n"
+    "    manager = TaskManager({file!r}, snapshot={snapshot})\n"
+    "manager.tasks\n"
+)
+
+
+def run(code: str, repeat: int) -> float:
+    """Возвращает медианное время выполнения кода в новом процессе
+
+    Args:
+        code (str): код на Python
+        repeat (int): количество запусков
+
+    Returns:
+        float: время в секундах
+    """
+    environment = dict(os.environ, PYTHONPATH=APP)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, env=environment)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Время холодного запуска")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000],
+                        help="размеры баз данных")
+    parser.add_argument("--repeat", type=int, default=10, help="количество запусков")
+    args = parser.parse_args()
+
+    interpreter = run("pass", args.repeat)
+    print(f"{'Пустой интерпретатор':<36}{interpreter * 1000:10.1f} мс")
+    print(f"{'Импорт модулей приложения':<36}{(run(IMPORTS, args.repeat) - interpreter) * 1000:10.1f} мс")
+
+    directory = tempfile.mkdtemp(prefix="task-manager-startup-")
+    try:
+        for size in args.sizes:
+            file = os.path.join(directory, f"tasks-{size}.json")
+            write_database(file, size)
+            json_time = run(FIRST_READ.format(file=file, snapshot=False), args.repeat)
+            # Первый запуск со снимком создает его
+            run(FIRST_READ.format(file=file, snapshot=True), 1)
+            snapshot_time = run(FIRST_READ.format(file=file, snapshot=True), args.repeat)
+            print(f"{f'Первое чтение, {size} задач, JSON':<36}{(json_time - interpreter) * 1000:10.1f} мс")
+            print(f"{f'Первое чтение, {size} задач, снимок':<36}{(snapshot_time - interpreter) * 1000:10.1f} мс")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# Нагрузочный тест TaskManager(thread_safe=True) из нескольких потоков.
+#
+# Потоки одного процесса в течение заданного времени вызывают методы
+# общего менеджера задач: чтение задачи по id, выборку по категории,
+# поиск и, с долей --writes, изменение задачи. Для каждого количества
+# потоков выводятся операции в секунду и количество ошибок. С ключом
+# --unsafe менеджер создается без thread_safe (для сравнения).
+# Изменение перезаписывает JSON-файл целиком, поэтому при большой
+# доле изменений стоит сравнить хранилища (--backend sqlite).
+#
+# Запуск (из корня проекта):
+#     python3 benchmarks/bench_threads.py --size 10000 --threads 1 2 4 8 16 --seconds 3
+
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from datagen import write_database
+from managers import TaskManager
+from storages import backends, migrate
+
+
+def worker(manager: TaskManager, size: int, writes: float, deadline: float, result: dict) -> None:
+    """Вызывает методы менеджера, пока не наступит deadline"""
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        task_id = rng.randint(1, size)
+        roll = rng.random()
+        try:
+            if roll < writes:
+                manager.change_task(task_id, title=f"Задача {roll}")
+                result['writes'] += 1
+                continue
+            if roll < (1 + writes) / 3:
+                manager.get_task_from_id(task_id)
+            elif roll < 2 * (1 + writes) / 3:
+                if not manager.tasks_for_category(f"Категория {task_id % 50}"):
+                    result['empty'] += 1
+            else:
+                manager.search_task("задача")
+            result['reads'] += 1
+        except Exception as e:
+            result['errors'] += 1
+            result['error'] = repr(e)
+
+
+def run(file: str, args: argparse.Namespace, threads: int) -> dict:
+    """Запускает threads потоков на копии базы данных
+
+    Returns:
+        dict: количество операций чтения, изменения, пустых выборок и ошибок
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = TaskManager(file, args.backend, thread_safe=not args.unsafe)
+    manager.tasks
+    results = [{"reads": 0, "writes": 0, "empty": 0, "errors": 0} for _ in range(threads)]
+    deadline = time.perf_counter() + args.seconds
+    workers = [
+        threading.Thread(target=worker, args=(manager, args.size, args.writes, deadline, result))
+        for result in results
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    manager.close()
+    total = {key: sum(result[key] for result in results) for key in results[0]}
+    total['error'] = next((result['error'] for result in results if 'error' in result), "")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный тест TaskManager из нескольких потоков")
+    parser.add_argument("--size", type=int, default=10000, help="количество задач в базе данных")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="количество потоков")
+    parser.add_argument("--seconds", type=float, default=3, help="длительность каждого теста")
+    parser.add_argument("--writes", type=float, default=0.05, help="доля изменений")
+    parser.add_argument("--backend", choices=backends, default="json", help="тип хранилища")
+    parser.add_argument("--unsafe", action="store_true", help="менеджер без thread_safe")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="task-manager-threads-")
+    source = os.path.join(directory, "source.json")
+    write_database(source, args.size)
+    print(
+        f"Задач: {args.size}, хранилище: {args.backend}, доля изменений: {args.writes}, "
+        f"thread_safe: {not args.unsafe}"
+    )
+    print(f"{'Потоков':<10}{'Операций/с':>12}{'Чтений/с':>12}{'Изменений/с':>14}{'Пустых':>8}{'Ошибок':>8}")
+    try:
+        for threads in args.threads:
+            file = os.path.join(directory, f"tasks-{threads}.{args.backend}")
+            if args.backend == "json":
+                shutil.copyfile(source, file)
+            else:
+                migrate(source, file, target_backend=args.backend)
+            total = run(file, args, threads)
+            print(
+                f"{threads:<10}{(total['reads'] + total['writes']) / args.seconds:>12.0f}"
+                f"{total['reads'] / args.seconds:>12.0f}{total['writes'] / args.seconds:>14.1f}"
+                f"{total['empty']:>8}{total['errors']:>8}  {total['error'][:60]}"
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Генератор синтетической базы данных задач для бенчмарков
+
+
+import json
+import random
+from datetime import date, timedelta
+from typing import Iterator
+
+
+priorities = ["высокий", "средний", "низкий"]
+statuses = ["выполнена", "не выполнена"]
+
+
+def generate_tasks(
+    count: int,
+    categories: int = 50,
+    vocabulary: int = 2000,
+    title_words: int = 4,
+    description_words: int = 12,
+    seed: int = 0
+) -> Iterator[dict]:
+    """Генерирует задачи в формате базы данных
+
+    Args:
+        count (int): количество задач
+        categories (int, optional): количество различных категорий. По умолчанию 50.
+        vocabulary (int, optional): количество различных слов в заголовках
+            и описаниях. По умолчанию 2000.
+        title_words (int, optional): количество слов в заголовке. По умолчанию 4.
+        description_words (int, optional): количество слов в описании. По умолчанию 12.
+        seed (int, optional): начальное значение генератора случайных чисел
+
+    Yields:
+        dict: задача
+    """
+    rng = random.Random(seed)
+    words = [f"слово{i}" for i in range(vocabulary)]
+    category_names = [f"Категория {i}" for i in range(categories)]
+    start = date(2024, 1, 1)
+    for task_id in range(1, count + 1):
+        yield {
+            "id": task_id,
+            "status": rng.choice(statuses),
+            "title": " ".join(rng.choices(words, k=title_words)),
+            "description": " ".join(rng.choices(words, k=description_words)),
+            "category": rng.choice(category_names),
+            "due_date": str(start + timedelta(days=rng.randrange(3 * 365))),
+            "priority": rng.choice(priorities)
+        }
+
+
+def write_database(path: str, count: int, **options) -> None:
+    """Записывает синтетическую базу данных в формате JSON
+
+    Args:
+        path (str): путь к файлу
+        count (int): количество задач
+        options: параметры generate_tasks
+    """
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(list(generate_tasks(count, **options)), json_file, ensure_ascii=False, indent=4)
@@ -0,0 +1,22 @@
+from app.cache import ResultCache
+
+
+def test_lru_and_ttl():
+    """Кэш вытесняет давно не использовавшиеся результаты и устаревшие по времени"""
+
+    now = [0.0]
+    cache = ResultCache(size=2, ttl=10, clock=lambda: now[0])
+    cache.put("a", [1])
+    cache.put("b", [2])
+    assert [1] == cache.get("a")
+    cache.put("c", [3])
+    assert cache.get("b") is None
+    assert [1] == cache.get("a")
+
+    now[0] = 15
+    assert cache.get("a") is None
+    assert {"size": 1, "hits": 2, "misses": 2, "evictions": 1, "expirations": 1} == cache.stats()
+
+    disabled = ResultCache(size=0)
+    disabled.put("a", [1])
+    assert disabled.get("a") is None
@@ -0,0 +1,31 @@
+import json
+
+from app.columns import TaskColumns
+from app.models import Task, compact_record
+
+
+def test_roundtrip():
+    """Колоночное хранилище возвращает задачи в формате Task.to_json"""
+
+    with open("tests/test_data.json", "r", encoding="utf-8") as json_file:
+        tasks = json.load(json_file)
+    tasks[0]['title'] = "Заголовок с юникодом ✓"
+
+    columns = TaskColumns(tasks)
+    assert 3 == len(columns)
+    assert ["Work", "Personal"] == columns.categories
+    assert tasks == list(columns)
+    assert "Description for Task 3" == columns.task(2).description
+
+
+def test_compact_record():
+    """Одинаковые значения категории, статуса и приоритета хранятся один раз"""
+
+    first = compact_record(json.loads('{"id": 1, "category": "Work", "status": "done"}'))
+    second = compact_record(json.loads('{"id": 2, "category": "Work", "status": "done"}'))
+    assert first['category'] is second['category']
+    assert first['status'] is second['status']
+
+
+def test_task_slots():
+    assert not hasattr(Task("t", "d", "c", None, None), "__dict__")
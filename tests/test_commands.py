@@ -0,0 +1,144 @@
+import io
+import json
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+import app.commands
+from app.commands import run_commands
+from app.managers import TaskManager
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура создает копию тестовой базы данных во временном каталоге"""
+
+    file = tmp_path / "tasks.json"
+    shutil.copy("tests/test_data.json", file)
+    return str(file)
+
+
+COMMANDS = [
+    '{"op": "add", "title": "Отчет", "category": "Work", "due_date": "2124-01-01", "priority": "high"}',
+    '{"op": "change", "id": 4, "description": "Квартальный", "priority": "низкий"}',
+    '{"op": "done", "id": 1}',
+    '',
+    '# комментарий',
+    '{"op": "delete", "id": 123}',
+    '{"op": "delete", "id": 2}',
+    '{"op": "search", "query": "квартальный"}',
+    '{"op": "query", "status": "done", "order_by": "id"}',
+    '{"op": "unknown"}',
+    '{"op": "add", "title": "Без срока", "category": "Work", "priority": "high"}',
+]
+
+
+def test_run_commands(database):
+    """Команды выполняются одним пакетом, на каждую выводится результат"""
+
+    manager = TaskManager(file=database)
+    output = io.StringIO()
+    summary = run_commands(manager, COMMANDS, output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [1, 2, 3, 6, 7, 8, 9, 10, 11] == [result['line'] for result in results]
+    assert [True, True, True, False, True, True, True, False, False] == [result['ok'] for result in results]
+    assert 4 == results[0]['id']
+    assert "Задачи с id '123' не существует" == results[3]['error']
+    assert [4] == [task['id'] for task in results[5]['tasks']]
+    assert [1, 3] == [task['id'] for task in results[6]['tasks']]
+    assert {"commands": 9, "errors": 3} == {key: summary[key] for key in ("commands", "errors")}
+
+    tasks = {task['id']: task for task in TaskManager(file=database).tasks}
+    assert [1, 3, 4] == sorted(tasks)
+    assert "низкий" == tasks[4]['priority']
+    assert "выполнена" == tasks[1]['status']
+
+
+def test_wrong_types(database):
+    """Параметр неверного типа - ошибка этой команды, остальные выполняются"""
+
+    manager = TaskManager(file=database)
+    output = io.StringIO()
+    summary = run_commands(manager, [
+        '{"op": "add", "title": "Отчет", "category": 123, "due_date": "2124-01-01", "priority": "high"}',
+        '{"op": "add", "title": ["Отчет"], "category": "Work", "due_date": "2124-01-01", "priority": "high"}',
+        '{"op": "change", "id": 1, "category": {"name": "Work"}}',
+        '{"op": "delete_category", "category": 1}',
+        '{"op": "search", "query": 1}',
+        '{"op": "done", "id": 2}',
+    ], output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [False, False, False, False, False, True] == [result['ok'] for result in results]
+    assert "Параметр 'category'" in results[0]['error']
+    assert 5 == summary['errors']
+    tasks = {task['id']: task for task in TaskManager(file=database).tasks}
+    assert [1, 2, 3] == sorted(tasks)
+    assert "выполнена" == tasks[2]['status']
+
+
+def test_wrong_query_types(database):
+    """Запрос с параметрами неверного типа - ошибка только этого запроса,
+    изменения той же порции сохраняются"""
+
+    manager = TaskManager(file=database)
+    output = io.StringIO()
+    summary = run_commands(manager, [
+        '{"op": "add", "title": "Отчет", "category": "Work", "due_date": "2124-01-01", "priority": "high"}',
+        '{"op": "query", "category": 5}',
+        '{"op": "query", "text": ["отчет"]}',
+        '{"op": "query", "order_by": 1}',
+        '{"op": "query", "due_before": 20240101}',
+        '{"op": "query", "limit": "10"}',
+        '{"op": "add", "title": "План", "category": "Work", "due_date": "2124-01-01", "priority": "low"}',
+        '{"op": "query", "category": "work", "due_after": "2100-01-01", "order_by": ["-id"]}',
+    ], output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert [True, False, False, False, False, False, True, True] == [result['ok'] for result in results]
+    assert "Параметр 'category'" in results[1]['error']
+    assert [5, 4] == [task['id'] for task in results[7]['tasks']]
+    assert 5 == summary['errors']
+    assert [1, 2, 3, 4, 5] == [task['id'] for task in TaskManager(file=database).tasks]
+
+
+def test_results_after_save(database, monkeypatch):
+    """Результаты выводятся только после сохранения порции: если
+    сохранить ее не удалось, команды порции выводятся с ошибкой"""
+
+    execute = app.commands.execute
+
+    def execute_and_delete(manager, batch):
+        results = execute(manager, batch)
+        # Другой процесс удаляет задачу, пока изменения порции не сохранены
+        TaskManager(file=database).delete_task_by_id(2)
+        return results
+
+    monkeypatch.setattr(app.commands, "execute", execute_and_delete)
+    output = io.StringIO()
+    summary = run_commands(TaskManager(file=database), ['{"op": "done", "id": 2}'], output)
+    result = json.loads(output.getvalue())
+
+    assert not result['ok']
+    assert "Изменения не сохранены" in result['error']
+    assert 1 == summary['errors']
+    assert [1, 3] == [task['id'] for task in TaskManager(file=database).tasks]
+
+
+def test_exec_from_stdin(database):
+    """main.py --exec - читает команды из stdin, в stdout - только результаты"""
+
+    process = subprocess.run(
+        [sys.executable, "app/main.py", "--db", database, "--exec", "-"],
+        input='{"op": "done", "id": 2}\n{"op": "get", "id": 2}\n',
+        capture_output=True, text=True, encoding="utf-8"
+    )
+    assert 0 == process.returncode
+    results = [json.loads(line) for line in process.stdout.splitlines()]
+    assert "выполнена" == results[1]['task']['status']
+    assert 2 == json.loads(process.stderr.splitlines()[-1])['commands']
+    # Вывод не в терминал - без цветовых кодов
+    assert "\x1b[" not in process.stderr
@@ -1,4 +1,6 @@
 import json
+import os
+import threading
 import pytest
 from datetime import date
 
@@ -16,6 +18,20 @@ def reset_test_data():
     with open("tests/test_tasks.json", "w", encoding="utf-8") as test_tasks:
         json.dump(data, test_tasks, ensure_ascii=False, indent=4)
 
+    remove_sidecars()
+    yield
+    remove_sidecars()
+
+
+def remove_sidecars() -> None:
+    """Удаляет служебные файлы (блокировки, метаданные, удаленные задачи),
+    которые хранилище создает рядом с тестовыми базами данных"""
+
+    for file in ("tests/test_tasks.json", "tests/test_tasks_EMPTY.json", "tests/test_data.json"):
+        for suffix in (".lock", ".meta", ".tombstones"):
+            if os.path.exists(file + suffix):
+                os.remove(file + suffix)
+
 
 @pytest.mark.usefixtures("reset_test_data")
 class TestTaskManager:
@@ -135,6 +151,50 @@ class TestTaskManager:
         assert expected_json == tasks
         
 
+    def test_patch(self):
+        """patch проверяет значения и изменяет только переданные поля"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        manager.patch(2, status=Status.done, due_date="2023-12-01", priority="высокий", title=None)
+        task = manager.get_task_from_id(2)
+        assert (Status.done, date(2023, 12, 1), Priority.high, "Task 2") == (
+            task.status, task.due_date, task.priority, task.title
+        )
+
+        for fields in ({"status": "готово"}, {"due_date": "1 декабря"}, {"title": ""}, {"id": 5}):
+            with pytest.raises(ValueError):
+                manager.patch(2, **fields)
+        with pytest.raises(ValueError):
+            manager.patch(4, status=Status.done)
+
+        # Без изменений хранилище не перезаписывается
+        signature = manager.storage.signature()
+        manager.patch(2, status=Status.done)
+        assert signature == manager.storage.signature()
+        assert TaskManager(file="tests/test_tasks.json").tasks == manager.tasks
+
+
+    def test_result_cache(self):
+        """Изменение задач одной категории не сбрасывает результаты других"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        assert [1, 3] == [task['id'] for task in manager.tasks_for_category("work")]
+        assert [2] == [task['id'] for task in manager.tasks_for_category("PERSONAL")]
+        assert [1, 2, 3] == [task['id'] for task in manager.search_task("task")]
+        manager.tasks_for_category("Work")
+        manager.search_task("  TASK ")
+        assert (2, 3) == (manager.cache_stats()['hits'], manager.cache_stats()['misses'])
+
+        manager.patch(2, title="Changed")
+        assert [2] == [task['id'] for task in manager.tasks_for_category("personal")]
+        assert [1, 3] == [task['id'] for task in manager.tasks_for_category("work")]
+        assert "Changed" == manager.tasks_for_category("personal")[0]['title']
+        assert [1, 3, 2] == [task['id'] for task in manager.search_task("task")]
+        assert (4, 5) == (manager.cache_stats()['hits'], manager.cache_stats()['misses'])
+
+        manager.patch(2, category="Work")
+        assert [1, 2, 3] == sorted(task['id'] for task in manager.tasks_for_category("work"))
+        assert [] == manager.tasks_for_category("personal")
+
+
     def test_delete_by_id(self):
         """Удаление задачи по id"""
         manager = TaskManager(file="tests/test_tasks.json")
@@ -161,3 +221,242 @@ class TestTaskManager:
             
         assert expected_json == tasks
         assert 2 == number_of_deleted_tasks
+
+
+    def test_cache_hits(self):
+        """Повторное чтение не перечитывает неизмененный файл"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        manager.tasks
+        manager.task_exists(1)
+        manager.get_new_id()
+
+        assert 1 == manager.cache_reloads
+        assert 2 == manager.cache_hits
+
+
+    def test_cache_reload_on_external_change(self):
+        """Кэш сбрасывается, если файл изменен другим процессом"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        assert 3 == len(manager.tasks)
+
+        with open("tests/test_tasks.json", "w", encoding="utf-8") as json_file:
+            json.dump([], json_file)
+
+        assert [] == manager.tasks
+        assert 2 == manager.cache_reloads
+
+
+    def test_cache_after_own_write(self):
+        """После записи менеджер не перечитывает собственные изменения"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        manager.delete_task_by_id(task_id=1)
+        reloads = manager.cache_reloads
+        assert [2, 3] == [task['id'] for task in manager.tasks]
+        assert reloads == manager.cache_reloads
+
+        manager.invalidate()
+        manager.tasks
+        assert reloads + 1 == manager.cache_reloads
+
+
+    def test_indexes(self):
+        """Выборки по категории, статусу и приоритету используют индексы,
+        которые обновляются при каждом изменении"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        assert [1, 3] == [task['id'] for task in manager.tasks_for_category("work")]
+        assert [2] == [task['id'] for task in manager.tasks_with_status(Status.not_done)]
+        assert [3] == [task['id'] for task in manager.tasks_with_priority(Priority.low)]
+
+        manager.change_task(task_id=2, category="WORK", status=Status.done)
+        manager.delete_task_by_id(task_id=1)
+
+        assert [3, 2] == [task['id'] for task in manager.tasks_for_category("Work")]
+        assert [] == manager.tasks_for_category("personal")
+        assert [] == manager.tasks_with_status(Status.not_done)
+        assert 1 == manager.cache_reloads
+
+
+    def test_search(self):
+        """Полнотекстовый поиск по заголовку и описанию"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        manager.change_task(task_id=2, title="Buy milk", description="and bread")
+        manager.change_task(task_id=3, description="Milky way")
+
+        def search(query, limit=None):
+            return [task['id'] for task in manager.search_task(query, limit)]
+
+        assert [2] == search("milk")
+        assert [2] == search("MILK bread")
+        assert [2, 3] == search("milk*")
+        assert [1, 2] == search("bread | 1")  # "1" есть и в заголовке, и в описании
+        assert [] == search("milk 1")
+        assert [1, 3] == search("work")
+        assert [2] == search("не выполнена")
+        assert [2] == search("milk*", limit=1)
+
+        manager.delete_task_by_id(task_id=2)
+        assert [3] == search("milk*")
+
+
+    def test_batch(self):
+        """Изменения внутри пакета сохраняются одной записью при выходе из него"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        with open("tests/test_tasks.json", "r", encoding="utf-8") as json_file:
+            before = json.load(json_file)
+
+        with manager.batch():
+            ids = manager.add_tasks(
+                Task(f"Bulk {i}", "", "Bulk", date(2124, 1, 1), Priority.low) for i in range(3)
+            )
+            manager.change_tasks({1: {"title": "Changed"}, 4: {"status": Status.done}})
+            assert 1 == manager.delete_tasks([2])
+            assert [5, 6] == [task['id'] for task in manager.tasks_for_category("bulk")][1:]
+
+            with open("tests/test_tasks.json", "r", encoding="utf-8") as json_file:
+                assert before == json.load(json_file)
+
+        assert [4, 5, 6] == ids
+        with open("tests/test_tasks.json", "r", encoding="utf-8") as json_file:
+            tasks = json.load(json_file)
+        assert [1, 3, 4, 5, 6] == [task['id'] for task in tasks]
+        assert "Changed" == tasks[0]['title']
+        assert "выполнена" == tasks[2]['status']
+
+
+    def test_batch_rollback(self):
+        """Исключение внутри пакета отменяет все его изменения"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        before = manager.tasks
+
+        with pytest.raises(ValueError):
+            with manager.transaction():
+                manager.delete_task_by_category("Work")
+                manager.delete_tasks([2, 123])
+
+        assert before == manager.tasks
+        assert 3 == len(manager.tasks_for_category("work") + manager.tasks_for_category("personal"))
+
+
+    def test_ids_not_reused(self):
+        """id удаленной задачи с наибольшим id не выдается повторно"""
+        manager = TaskManager(file="tests/test_tasks.json")
+        manager.delete_task_by_id(task_id=3)
+        assert 4 == manager.get_new_id()
+
+        manager.add_task(Task("t", "d", "c", date(2124, 1, 1), Priority.low))
+        manager.delete_task_by_id(task_id=4)
+        manager = TaskManager(file="tests/test_tasks.json")
+        assert 5 == manager.get_new_id()
+        assert [5, 6] == manager.add_tasks(
+            [Task("t", "d", "c", date(2124, 1, 1), Priority.low)] * 2
+        )
+
+
+    def test_query(self):
+        """Запрос выбирает самый избирательный индекс и проверяет все условия"""
+        manager = TaskManager(file="tests/test_tasks.json")
+
+        def query(**conditions):
+            return [task['id'] for task in manager.query(**conditions)]
+
+        assert [1, 3] == query(category="WORK")
+        assert [3] == query(category="work", due_after="2023-11-01")
+        assert [1] == query(category="work", status=Status.done, due_before=date(2023, 11, 8))
+        assert [3, 1] == query(category="work", order_by="-due_date")
+        assert [3, 2, 1] == query(order_by="-priority")
+        assert [3, 1] == query(order_by=["status", "-id"], limit=2)
+        assert [1, 3] == query(text="task", status=Status.done)
+        assert [3] == query(text="task", priority=Priority.low)
+
+        assert "index:status" == manager.explain(category="work", status=Status.not_done)
+        assert "text" == manager.explain(text="2", category="work")
+        assert "index:due_date" == manager.explain(due_before="2023-11-02", category="work")
+        assert "scan" == manager.explain(order_by="due_date")
+        with pytest.raises(ValueError):
+            manager.query(order_by="unknown")
+
+
+    def test_update_and_delete_where(self):
+        """Пакетное изменение и удаление по условиям запроса"""
+        manager = TaskManager(file="tests/test_tasks.json")
+
+        assert 2 == manager.update_where({"status": Status.not_done}, category="work")
+        assert [1, 2, 3] == [task['id'] for task in manager.query(status=Status.not_done)]
+
+        assert 2 == manager.delete_where(due_after="2023-11-01")
+        with pytest.raises(ValueError):
+            manager.delete_where()
+
+        with open("tests/test_tasks.json", "r", encoding="utf-8") as json_file:
+            tasks = json.load(json_file)
+        assert [(1, "не выполнена")] == [(task['id'], task['status']) for task in tasks]
+
+
+    def test_due_dates(self):
+        """Упорядоченный индекс по сроку выполнения обновляется при изменениях"""
+        manager = TaskManager(file="tests/test_tasks.json")
+
+        def ids(tasks):
+            return [task['id'] for task in tasks]
+
+        assert [1, 2, 3] == ids(manager.tasks_due())
+        assert [2, 3] == ids(manager.tasks_due(date(2023, 11, 2), date(2023, 11, 8)))
+        assert [2] == ids(manager.overdue_tasks(today=date(2023, 11, 10)))
+        assert [] == ids(manager.overdue_tasks(today=date(2023, 11, 5)))
+        assert [2] == ids(manager.upcoming_tasks(7, today=date(2023, 10, 29)))
+
+        manager.change_task(3, status=Status.not_done)
+        manager.change_task(1, status=Status.not_done, due_date=date(2023, 11, 20))
+        manager.add_task(Task("t", "d", "c", date(2023, 11, 6), Priority.low))
+        assert [2, 4, 3, 1] == ids(manager.tasks_due())
+        assert [2, 4] == ids(manager.nearest_deadlines(2, today=date(2023, 11, 1)))
+        assert [3, 1] == ids(manager.nearest_deadlines(5, today=date(2023, 11, 7)))
+
+        manager.delete_task_by_id(4)
+        assert [2, 3, 1] == ids(manager.tasks_due())
+
+
+    def test_thread_safe(self):
+        """Потоки изменяют задачи и одновременно читают их через общий менеджер"""
+        manager = TaskManager(file="tests/test_tasks.json", thread_safe=True)
+        errors = []
+
+        def write(number):
+            try:
+                for attempt in range(10):
+                    [task_id] = manager.add_tasks([Task(f"t{number}", "d", "Threads", date(2123, 1, 1), Priority.low)])
+                    manager.change_task(task_id, title=f"t{number}-{attempt}")
+            except Exception as e:
+                errors.append(e)
+
+        def read():
+            try:
+                for _ in range(50):
+                    assert len(manager.tasks) >= 3
+                    assert manager.get_task_from_id(1).title == "Task 1"
+                    manager.tasks_for_category("threads")
+                    manager.search_task("t0-1")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(number,)) for number in range(4)]
+        threads += [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert [] == errors
+        titles = sorted(task['title'] for task in TaskManager(file="tests/test_tasks.json").tasks_for_category("threads"))
+        assert [f"t{number}-{attempt}" for number in range(4) for attempt in range(10)] == titles
+        assert 43 == len(manager.tasks)
+
+
+    def test_corrupted_database(self, tmp_path):
+        """Поврежденный файл не считается пустой базой данных"""
+        file = tmp_path / "tasks.json"
+        file.write_text('[{"id": 1, "title"')
+        manager = TaskManager(file=str(file))
+        with pytest.raises(ValueError):
+            manager.tasks
+        assert '[{"id": 1, "title"' == file.read_text()
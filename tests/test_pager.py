@@ -0,0 +1,97 @@
+import sys
+from itertools import count
+
+from app.pager import Pager, browse, iter_table
+from app.table import PlainTable, fit, text_width, wrap
+
+
+def rows(number: int):
+    for task_id in range(1, number + 1):
+        yield [task_id, "не выполнена", f"Задача {task_id}", "", "Work", "2124-01-01", "высокий"]
+
+
+def test_text_width():
+    """Ширина ASCII и кириллицы - длина строки, wcwidth нужен только для
+    широких и комбинируемых символов"""
+
+    sys.modules.pop("wcwidth", None)
+    assert 5 == text_width("Hello")
+    assert 6 == text_width("Привет")
+    assert "wcwidth" not in sys.modules
+    assert 4 == text_width("漢字")
+    assert 1 == text_width("е́")
+    assert "漢… " == fit("漢字漢字", 4)
+    assert "Зада…" == fit("Задача", 5)
+
+
+def test_plain_table():
+    """Таблица выглядит так же, как таблица PrettyTable"""
+
+    table = PlainTable.from_sample([[1, "да"], [22, "нет"]], names=["ID", "Статус"])
+    assert "\n".join([
+        "+----+--------+",
+        "| ID | Статус |",
+        "+----+--------+",
+        "| 1  |   да   |",
+        "| 22 |  нет   |",
+        "+----+--------+",
+    ]) == table.render([[1, "да"], [22, "нет"]])
+
+
+def test_navigation():
+    pager = Pager(rows(25), page_size=10, sample=10)
+    assert 1 == pager.rows(0)[0][0]
+    assert pager.pages is None
+    assert pager.next() and 11 == pager.rows(pager.page)[0][0]
+    assert pager.jump(2) and [21, 22, 23, 24, 25] == [row[0] for row in pager.rows(pager.page)]
+    assert not pager.next()
+    assert 3 == pager.pages
+    assert pager.prev() and 1 == pager.page
+    assert not pager.jump(5)
+    assert "Страница 2 из 3" == pager.status()
+
+
+def test_streaming():
+    """Строки читаются из итератора только по мере перелистывания"""
+
+    produced = count()
+    source = (row for row in rows(100000) if next(produced) is not None)
+    pager = Pager(source, page_size=20, sample=50)
+    assert 50 == next(produced)
+
+    pages = []
+    commands = iter(["n", "p", "3", "q"])
+    browse(pager, read=lambda prompt: next(commands), write=pages.append)
+    assert 4 == len(pages)
+    assert pages[0] == pages[2]
+    assert "Задача 41" in pages[3].splitlines()[3]
+    assert 61 >= next(produced)
+
+    lines = iter_table(rows(1000), sample=10)
+    assert "+" == next(lines)[0]
+    assert 1000 + 4 == 1 + sum(1 for _ in lines)
+
+
+def test_long_values_wrap():
+    """Длинные значения переносятся, а не обрезаются: ширина таблицы
+    ограничена только в терминале (max_width)"""
+
+    description = "очень длинное описание задачи " * 5
+    row = [1, "не выполнена", "Задача", description, "Work", "2124-01-01", "высокий"]
+    assert description.strip() == " ".join(wrap(description.strip(), 20))
+    assert ["漢字", "漢"] == wrap("漢字漢", 4)
+
+    table = PlainTable.from_sample([row])
+    assert 1 == len(table.format_row(row).splitlines())
+
+    table = PlainTable.from_sample([row], max_width=80)
+    lines = table.render([row]).splitlines()
+    assert all(80 >= text_width(line) for line in lines)
+    assert "…" not in "".join(lines)
+    text = " ".join(line.split("|")[4].strip() for line in lines[3:-1])
+    assert description.strip() == text
+
+    # Значение длиннее образца без ограничения ширины тоже переносится целиком
+    long_row = [2, "не выполнена", "Задача с длинным заголовком", "", "Work", "2124-01-01", "высокий"]
+    lines = "\n".join(iter_table([*rows(1), long_row], sample=1)).splitlines()
+    assert ["Задача с", "длинным", "заголовко", "м"] == [line.split("|")[3].strip() for line in lines[4:8]]
@@ -0,0 +1,138 @@
+import asyncio
+import json
+import shutil
+
+import pytest
+
+from app.server import TaskServer
+# Сервер импортирует модули приложения из каталога app, как при запуске
+# app/server.py: менеджер и его исключения берутся из тех же модулей
+from managers import TaskManager, stats
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура создает копию тестовой базы данных во временном каталоге"""
+
+    file = tmp_path / "tasks.json"
+    shutil.copy("tests/test_data.json", file)
+    return str(file)
+
+
+async def request(port: int, method: str, path: str, body: dict = None) -> tuple[int, dict]:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    data = b"" if body is None else json.dumps(body).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+        f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+    )
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def run_server(database: str, scenario) -> None:
+    async def main():
+        server = TaskServer(TaskManager(database, exclusive=True))
+        listener = await server.start(port=0)
+        try:
+            await scenario(listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            await server.stop()
+    asyncio.run(main())
+
+
+def test_routes(database):
+    """Маршруты API выполняют команды менеджера"""
+
+    async def scenario(port):
+        status, result = await request(port, "GET", "/tasks/2")
+        assert (200, {
+            "title": "Task 2", "description": "Description for Task 2", "category": "Personal",
+            "due_date": "2023-11-05", "priority": "средний", "id": 2, "status": "не выполнена"
+        }) == (status, result['task'])
+        status, result = await request(port, "POST", "/tasks", {
+            "title": "Отчет", "category": "Work", "due_date": "2124-01-01", "priority": "high"
+        })
+        assert (200, 4) == (status, result['id'])
+        assert 200 == (await request(port, "POST", "/tasks/4/done"))[0]
+        assert 200 == (await request(port, "PATCH", "/tasks/1", {"title": "Новый"}))[0]
+        assert 404 == (await request(port, "DELETE", "/tasks/123"))[0]
+        assert 404 == (await request(port, "GET", "/tasks/123"))[0]
+        assert 400 == (await request(port, "PATCH", "/tasks/1", {"title": 1}))[0]
+        assert 404 == (await request(port, "GET", "/unknown"))[0]
+        status, result = await request(port, "GET", "/tasks?category=work&order_by=-id&limit=2")
+        assert [4, 3] == [task['id'] for task in result['tasks']]
+        status, result = await request(port, "GET", "/search?query=%D0%BD%D0%BE%D0%B2%D1%8B%D0%B9")
+        assert [1] == [task['id'] for task in result['tasks']]
+        status, result = await request(port, "DELETE", "/categories/Work")
+        assert (200, 3) == (status, result['deleted'])
+
+    run_server(database, scenario)
+    tasks = TaskManager(database).tasks
+    assert [2] == [task['id'] for task in tasks]
+
+
+def test_group_commit(database):
+    """Одновременные изменения сохраняются меньшим числом записей"""
+
+    async def scenario(port):
+        results = await asyncio.gather(*(
+            request(port, "POST", "/tasks", {
+                "title": f"task {i}", "category": "Work", "due_date": "2124-01-01", "priority": "low"
+            })
+            for i in range(50)
+        ))
+        assert sorted(result['id'] for _, result in results) == list(range(4, 54))
+
+    stats.reset()
+    run_server(database, scenario)
+    counters = stats.snapshot()['counters']
+    assert 50 == counters['group_commit_requests']
+    assert counters['group_commits'] < 50
+    assert 53 == len(TaskManager(database).tasks)
+
+
+def test_bad_request_in_group(database):
+    """Неверный запрос в групповой фиксации получает ошибку,
+    остальные изменения группы выполняются и сохраняются"""
+
+    manager = TaskManager(database, exclusive=True)
+    patch = manager.patch
+
+    def failing_patch(task_id, *args, **kwargs):
+        if task_id == 1:
+            raise RuntimeError("сбой")
+        return patch(task_id, *args, **kwargs)
+
+    manager.patch = failing_patch
+
+    async def main():
+        server = TaskServer(manager)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            results = await asyncio.gather(
+                request(port, "POST", "/tasks", {
+                    "title": "task", "category": "Work", "due_date": "2124-01-01", "priority": "low"
+                }),
+                request(port, "POST", "/tasks", {
+                    "title": "bad", "category": ["Work"], "due_date": "2124-01-01", "priority": "low"
+                }),
+                request(port, "POST", "/tasks/1/done"),
+                request(port, "POST", "/tasks/2/done"),
+            )
+        finally:
+            listener.close()
+            await server.stop()
+        return results
+
+    results = asyncio.run(main())
+    assert [200, 400, 500, 200] == [status for status, _ in results]
+    assert "Параметр 'category'" in results[1][1]['error']
+    tasks = {task['id']: task for task in TaskManager(database).tasks}
+    # id, зарезервированные отмененной группой, повторно не выдаются
+    assert [1, 2, 3, results[0][1]['id']] == sorted(tasks)
+    assert "выполнена" == tasks[2]['status']
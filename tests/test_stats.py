@@ -0,0 +1,68 @@
+import json
+import pstats
+
+from app.managers import TaskManager, stats
+from app.stats import Stats, install_hooks
+
+
+def test_timers_and_counters():
+    """Таймер учитывает вызовы и время, счетчики суммируются"""
+
+    local = Stats()
+
+    @local.timed()
+    def operation(value):
+        return value * 2
+
+    assert 4 == operation(2)
+    operation(3)
+    with local.timer("block"):
+        pass
+    local.count("bytes_read", 10)
+    local.count("bytes_read", 5)
+
+    snapshot = local.snapshot()
+    assert 2 == snapshot['timers']['test_timers_and_counters.<locals>.operation']['calls']
+    assert 1 == snapshot['timers']['block']['calls']
+    assert {"bytes_read": 15} == snapshot['counters']
+    assert "bytes_read" in local.report()
+
+    local.reset()
+    assert {"timers": {}, "counters": {}} == local.snapshot()
+
+
+def test_manager_operations(tmp_path):
+    """Операции менеджера и хранилища попадают в статистику"""
+
+    file = tmp_path / "tasks.json"
+    with open("tests/test_data.json", "r", encoding="utf-8") as test_data:
+        file.write_text(test_data.read(), encoding="utf-8")
+
+    stats.reset()
+    manager = TaskManager(str(file))
+    manager.get_task_from_id(1)
+    manager.delete_task_by_id(2)
+
+    snapshot = stats.snapshot()
+    assert 1 == snapshot['timers']['TaskManager.get_task_from_id']['calls']
+    assert 1 == snapshot['timers']['JsonStorage.load']['calls']
+    assert 1 == snapshot['timers']['JsonStorage.commit']['calls']
+    assert 1 == snapshot['counters']['parses']
+    assert 1 == snapshot['counters']['rewrites']
+    assert 3 == snapshot['counters']['records_scanned']
+    assert file.stat().st_size == snapshot['counters']['bytes_written']
+
+
+def test_profile_hook(tmp_path):
+    """Переменная окружения TASK_MANAGER_PROFILE включает cProfile"""
+
+    assert install_hooks({}) is None
+
+    target = tmp_path / "profile.out"
+    profiler = install_hooks({"TASK_MANAGER_PROFILE": str(target)})
+    try:
+        json.dumps([{"id": i} for i in range(100)])
+    finally:
+        profiler.disable()
+    profiler.dump_stats(str(target))
+    assert pstats.Stats(str(target)).total_calls > 0
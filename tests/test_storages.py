@@ -0,0 +1,618 @@
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tracemalloc
+import pytest
+from datetime import date
+
+from app.managers import ConflictError, TaskManager
+from app.models import Task, Priority, Status
+from app.storages import migrate, open_storage, write_json_tasks
+from app.streams import iter_json_array
+
+
+@pytest.fixture
+def database(tmp_path):
+    """Фикстура создает копию тестовой базы данных во временном каталоге"""
+
+    file = tmp_path / "tasks.json"
+    shutil.copy("tests/test_data.json", file)
+    return str(file)
+
+
+def read_json(file: str) -> list[dict]:
+    with open(file, "r", encoding="utf-8") as json_file:
+        return json.load(json_file)
+
+
+def new_task(title: str = "new title") -> Task:
+    return Task(
+        title=title,
+        description="new description",
+        category="new category",
+        due_date=date(2124, 1, 1),
+        priority=Priority.high
+    )
+
+
+class TestJournalStorage:
+
+    def test_changes_go_to_journal(self, database):
+        """Изменения дописываются в журнал, снимок не перезаписывается"""
+
+        base = read_json(database)
+        manager = TaskManager(file=database, backend="journal")
+        manager.add_task(new_task())
+        manager.change_task(task_id=2, status=Status.done)
+        manager.delete_task_by_id(task_id=1)
+
+        assert base == read_json(database)
+        with open(f"{database}.journal", "r", encoding="utf-8") as journal:
+            entries = [json.loads(line) for line in journal]
+        assert ["add", "patch", "delete"] == [entry['op'] for entry in entries]
+        assert {"status": "выполнена"} == entries[1]['fields']
+
+    def test_replay(self, database):
+        """Новый менеджер восстанавливает состояние из снимка и журнала"""
+
+        manager = TaskManager(file=database, backend="journal")
+        manager.add_task(new_task())
+        manager.change_task(task_id=2, title="Changed")
+        manager.delete_task_by_category(category="Work")
+        expected = manager.tasks
+
+        assert expected == TaskManager(file=database, backend="journal").tasks
+        assert [2, 4] == [task['id'] for task in expected]
+
+    def test_compact(self, database):
+        """Уплотнение переносит журнал в снимок обычного формата"""
+
+        manager = TaskManager(file=database, backend="journal")
+        manager.delete_task_by_id(task_id=3)
+        manager.compact()
+
+        assert [1, 2] == [task['id'] for task in read_json(database)]
+        with open(f"{database}.journal", "r", encoding="utf-8") as journal:
+            assert "" == journal.read()
+        assert manager.tasks == TaskManager(file=database, backend="journal").tasks
+
+    def test_compact_on_threshold(self, database):
+        """Журнал уплотняется автоматически при превышении порога"""
+
+        manager = TaskManager(file=database, backend="journal")
+        manager.storage.compact_threshold = 1
+        manager.add_task(new_task())
+        manager.storage.wait()
+
+        assert 4 == len(read_json(database))
+        assert manager.tasks == read_json(database)
+
+    def test_unknown_backend(self, database):
+        with pytest.raises(ValueError):
+            TaskManager(file=database, backend="unknown")
+
+
+@pytest.fixture
+def sqlite_database(database, tmp_path):
+    """Фикстура переносит тестовую базу данных в SQLite"""
+
+    file = str(tmp_path / "tasks.sqlite3")
+    assert 3 == migrate(database, file)
+    return file
+
+
+class TestSQLiteStorage:
+
+    def test_backend_by_extension(self, sqlite_database):
+        manager = TaskManager(file=sqlite_database)
+        assert "SQLiteStorage" == type(manager.storage).__name__
+        assert read_json("tests/test_data.json") == manager.tasks
+
+    def test_native_queries(self, sqlite_database):
+        """Поиск по id и категории выполняется без загрузки всех задач"""
+
+        manager = TaskManager(file=sqlite_database)
+        assert "Task 2" == manager.get_task_from_id(2).title
+        assert not manager.task_exists(123)
+        assert [1, 3] == [task['id'] for task in manager.tasks_for_category("work")]
+        assert "storage" == manager.explain(category="work", status="выполнена")
+        assert [3, 1] == [task['id'] for task in manager.query(category="work", order_by="-id")]
+        assert 2 == manager.delete_task_by_category("Work")
+        assert 0 == manager.cache_reloads
+
+        assert [2] == [task['id'] for task in manager.tasks]
+
+    def test_changes(self, sqlite_database):
+        manager = TaskManager(file=sqlite_database)
+        manager.add_task(new_task())
+        manager.change_task(task_id=1, title="Changed", status=Status.not_done)
+        manager.delete_task_by_id(task_id=2)
+        expected = manager.tasks
+        manager.close()
+
+        tasks = TaskManager(file=sqlite_database).tasks
+        assert expected == tasks
+        assert [1, 3, 4] == [task['id'] for task in tasks]
+        assert ("Changed", "не выполнена") == (tasks[0]['title'], tasks[0]['status'])
+
+    def test_migrate_into_not_empty(self, database, sqlite_database):
+        with pytest.raises(ValueError):
+            migrate(database, sqlite_database)
+
+
+class TestStreams:
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+    def test_iter_json_array(self, database, chunk_size):
+        """Потоковый разбор дает тот же результат, что и json.load"""
+
+        assert read_json(database) == list(iter_json_array(database, chunk_size))
+
+    def test_iter_json_array_numbers(self, tmp_path):
+        file = tmp_path / "numbers.json"
+        file.write_text("[1, 22, 333 ,4444]")
+        assert [1, 22, 333, 4444] == list(iter_json_array(str(file), chunk_size=2))
+
+        file.write_text("")
+        assert [] == list(iter_json_array(str(file)))
+
+        file.write_text("[1, 2")
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_json_array(str(file)))
+
+    def test_manager_iter_tasks(self, database):
+        """iter_tasks читает файл потоково, не загружая задачи в кэш"""
+
+        manager = TaskManager(file=database)
+        tasks = manager.iter_tasks(lambda task: task['category'] == "Work")
+        assert 1 == next(tasks)['id']
+        assert [3] == [task['id'] for task in tasks]
+        assert 0 == manager.cache_reloads
+
+        manager.tasks
+        assert [1, 2, 3] == [task['id'] for task in manager.iter_tasks()]
+        assert 1 == manager.cache_reloads
+
+    def test_jsonl_storage(self, database, tmp_path):
+        file = str(tmp_path / "tasks.jsonl")
+        assert 3 == migrate(database, file)
+
+        manager = TaskManager(file=file)
+        manager.add_task(new_task())
+        with open(file, "r", encoding="utf-8") as jsonl_file:
+            assert 4 == len(jsonl_file.readlines())
+
+        manager.delete_task_by_id(task_id=1)
+        assert [2, 3, 4] == [task['id'] for task in TaskManager(file=file).iter_tasks()]
+
+
+def allocate(file: str, count: int) -> list[int]:
+    storage = open_storage(file)
+    ids = []
+    for _ in range(count):
+        start = storage.allocate_ids(2)
+        ids.extend([start, start + 1])
+    storage.close()
+    return ids
+
+
+class TestIdAllocation:
+
+    @pytest.mark.parametrize("name", ["tasks.json", "tasks.sqlite3"])
+    def test_concurrent_allocation(self, tmp_path, name):
+        """Процессы, одновременно выделяющие id, получают разные id"""
+
+        file = str(tmp_path / name)
+        open_storage(file).close()
+        with multiprocessing.Pool(4) as pool:
+            results = pool.starmap(allocate, [(file, 50)] * 4)
+
+        ids = sorted(itertools.chain.from_iterable(results))
+        assert list(range(1, 401)) == ids
+        assert 401 == open_storage(file).next_id()
+
+    def test_migrate_keeps_counter(self, database, tmp_path):
+        manager = TaskManager(file=database)
+        manager.delete_task_by_id(task_id=3)
+
+        file = str(tmp_path / "tasks.sqlite3")
+        migrate(database, file)
+        assert 4 == TaskManager(file=file).get_new_id()
+
+
+class TestSnapshot:
+
+    def test_snapshot_is_used_while_fresh(self, database):
+        """Снимок читается вместо JSON, пока файл не изменился"""
+
+        manager = TaskManager(file=database, snapshot=True)
+        assert read_json(database) == manager.tasks
+
+        storage = open_storage(database, snapshot=True)
+        tasks = storage.load()
+        assert read_json(database) == tasks
+        assert storage.compact_records
+
+        manager.add_task(new_task())
+        assert read_json(database) == open_storage(database, snapshot=True).load()
+
+    def test_stale_or_broken_snapshot(self, database):
+        """Устаревший или поврежденный снимок не используется"""
+
+        open_storage(database, snapshot=True).load()
+        tasks = read_json(database)[:1]
+        with open(database, "w", encoding="utf-8") as json_file:
+            json.dump(tasks, json_file)
+        assert tasks == open_storage(database, snapshot=True).load()
+
+        with open(f"{database}.snapshot", "r+b") as snapshot_file:
+            snapshot_file.seek(-1, 2)
+            snapshot_file.write(b"\0")
+        assert tasks == open_storage(database, snapshot=True).load()
+
+
+@pytest.fixture
+def mapped_database(database, tmp_path):
+    """Фикстура переносит тестовую базу данных в файл записей фиксированного размера"""
+
+    file = str(tmp_path / "tasks.tmdb")
+    migrate(database, file)
+    return file
+
+
+class TestMappedStorage:
+
+    def test_native_queries(self, mapped_database):
+        """Чтение по id, категории и статусу не загружает все задачи"""
+
+        manager = TaskManager(file=mapped_database)
+        assert "MappedStorage" == type(manager.storage).__name__
+        assert "Task 2" == manager.get_task_from_id(2).title
+        assert not manager.task_exists(123)
+        assert [1, 3] == [task['id'] for task in manager.tasks_for_category("WORK")]
+        assert [2] == [task['id'] for task in manager.tasks_with_status(Status.not_done)]
+        assert 0 == manager.cache_reloads
+        assert read_json("tests/test_data.json") == manager.tasks
+
+    def test_mark_as_done_in_place(self, mapped_database):
+        """Отметка о выполнении не меняет размер файлов"""
+
+        manager = TaskManager(file=mapped_database)
+        sizes = [os.path.getsize(mapped_database), os.path.getsize(f"{mapped_database}.heap.0")]
+        manager.change_task(2, status=Status.done)
+        assert sizes == [os.path.getsize(mapped_database), os.path.getsize(f"{mapped_database}.heap.0")]
+        assert "выполнена" == open_storage(mapped_database).get(2)['status']
+
+    def test_changes_and_compact(self, mapped_database):
+        manager = TaskManager(file=mapped_database)
+        other = open_storage(mapped_database)
+        other.get(1)
+
+        manager.add_task(new_task())
+        manager.change_task(1, title="Changed", category="Home")
+        manager.delete_task_by_category("Work")
+        expected = manager.tasks
+        assert [1, 2, 4] == [task['id'] for task in expected]
+        assert expected == other.load()
+
+        manager.compact()
+        assert not os.path.exists(f"{mapped_database}.heap.0")
+        assert expected == other.load()
+        assert [1] == [task['id'] for task in other.find(category="home")]
+        assert 5 == TaskManager(file=mapped_database).get_new_id()
+
+
+class TestShardedStorage:
+
+    def test_shards(self, database, tmp_path):
+        """Каждая категория хранится в своем файле, выборка и удаление
+        по категории затрагивают только его"""
+
+        directory = str(tmp_path / "tasks.shards")
+        assert 3 == migrate(database, directory)
+        manager = TaskManager(file=directory)
+        assert "ShardedStorage" == type(manager.storage).__name__
+        assert read_json(database) == manager.tasks
+        assert 2 == len(glob.glob(os.path.join(directory, "shard-*.json")))
+
+        manager = TaskManager(file=directory)
+        assert [1, 3] == [task['id'] for task in manager.tasks_for_category("work")]
+        personal = os.path.join(directory, manager.storage._read_manifest()['shards']['personal']['file'])
+        before = os.path.getmtime(personal)
+        assert 2 == manager.delete_task_by_category("Work")
+        assert 0 == manager.cache_reloads
+        assert ["personal"] == list(manager.storage._read_manifest()['shards'])
+        assert before == os.path.getmtime(personal)
+
+        manager.change_task(2, category="Work")
+        manager.add_task(new_task())
+        assert [2, 4] == [task['id'] for task in TaskManager(file=directory).iter_tasks()]
+        assert [2] == [task['id'] for task in TaskManager(file=directory).tasks_for_category("WORK")]
+        assert not os.path.exists(personal)
+
+    def test_read_while_shards_removed(self, database, tmp_path):
+        """Чтение в другом процессе не видит шарды, удаленные писателем"""
+
+        directory = str(tmp_path / "tasks.shards")
+        migrate(database, directory)
+        writer = multiprocessing.Process(target=churn_shards, args=(directory, 30))
+        writer.start()
+        try:
+            while writer.is_alive():
+                storage = open_storage(directory)
+                assert {1, 2, 3} <= {task['id'] for task in storage.load()}
+                assert {1, 2, 3} <= {task['id'] for task in storage.iter_tasks()}
+                storage.find(category="temporary")
+        finally:
+            writer.join()
+        assert 0 == writer.exitcode
+
+
+class TestTombstones:
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        manager = TaskManager(file=str(tmp_path / "tasks.json"))
+        manager.add_tasks(new_task(f"task {i}") for i in range(10))
+        return manager
+
+    def test_delete_writes_tombstone(self, manager):
+        """Удаление дописывает надгробие, не перезаписывая файл"""
+
+        manager.delete_task_by_id(1)
+        assert 10 == len(read_json(manager.file))
+        assert os.path.exists(f"{manager.file}.tombstones")
+        assert 1 not in [task['id'] for task in manager.tasks]
+        assert 9 == len(TaskManager(file=manager.file).tasks)
+        assert 9 == len(list(TaskManager(file=manager.file).iter_tasks()))
+        assert 1 == manager.compaction_stats()['tombstones']
+
+        manager.compact()
+        assert 9 == len(read_json(manager.file))
+        assert not os.path.exists(f"{manager.file}.tombstones")
+        assert {"compactions": 1, "reclaimed": 1, "tombstones": 0} == {
+            key: value for key, value in manager.compaction_stats().items()
+            if key in ("compactions", "reclaimed", "tombstones")
+        }
+
+    @pytest.mark.parametrize("background", [False, True])
+    def test_compact_on_ratio(self, tmp_path, background):
+        """При доле надгробий compact_ratio файл уплотняется"""
+
+        file = str(tmp_path / "tasks.json")
+        manager = TaskManager(file=file, background=background)
+        manager.add_tasks(new_task(f"task {i}") for i in range(10))
+        manager.delete_tasks([1, 2])
+        assert 10 == len(read_json(file))
+        manager.delete_task_by_id(3)
+        manager.close()
+        assert [task['id'] for task in manager.tasks] == [task['id'] for task in read_json(file)]
+        assert 7 == len(read_json(file))
+        assert 3 == manager.compaction_stats()['reclaimed']
+
+    def test_other_changes_compact(self, manager):
+        """Перезапись файла при других изменениях убирает удаленные задачи"""
+
+        manager.delete_task_by_id(1)
+        manager.add_task(new_task("added"))
+        assert 10 == len(read_json(manager.file))
+        assert 0 == manager.compaction_stats()['tombstones']
+
+    def test_patch_appends_fields(self, manager):
+        """Изменение дописывает заплатку с измененными полями, не перезаписывая файл"""
+
+        before = read_json(manager.file)
+        manager.patch(2, status=Status.done)
+        manager.change_task(2, title="changed")
+        manager.delete_task_by_id(3)
+        assert before == read_json(manager.file)
+        with open(f"{manager.file}.tombstones", encoding="utf-8") as tombstones_file:
+            assert ['{"id": 2, "status": "выполнена"}', '{"id": 2, "title": "changed"}', "3"] == (
+                tombstones_file.read().splitlines()[1:]
+            )
+
+        for tasks in (TaskManager(file=manager.file).tasks, list(TaskManager(file=manager.file).iter_tasks())):
+            assert [1, 2, 4] == [task['id'] for task in tasks[:3]]
+            assert ("changed", "выполнена") == (tasks[1]['title'], tasks[1]['status'])
+        assert {"tombstones": 1, "patches": 1} == {
+            key: value for key, value in manager.compaction_stats().items() if key in ("tombstones", "patches")
+        }
+
+        manager.compact()
+        assert manager.tasks == read_json(manager.file)
+        assert ("changed", "выполнена") == (read_json(manager.file)[1]['title'], read_json(manager.file)[1]['status'])
+
+    def test_compact_stale_tasks(self, manager):
+        """Уплотнение не записывает список задач, устаревший из-за
+        изменений другого процесса: задачи читаются из файла"""
+
+        tasks = manager.tasks
+        signature = manager.storage.signature()
+        other = TaskManager(file=manager.file)
+        other.delete_task_by_id(1)
+        other.patch(2, title="other")
+
+        manager.storage.compact(tasks, signature)
+        assert not os.path.exists(f"{manager.file}.tombstones")
+        on_disk = read_json(manager.file)
+        assert 1 not in [task['id'] for task in on_disk]
+        assert "other" == on_disk[0]['title']
+
+    def test_stale_tombstones(self, manager):
+        """Надгробия не относятся к файлу, измененному в обход хранилища"""
+
+        manager.delete_task_by_id(1)
+        tasks = read_json(manager.file)
+        with open(manager.file, "w", encoding="utf-8") as json_file:
+            json.dump(tasks[:5], json_file)
+        assert [1, 2, 3, 4, 5] == [task['id'] for task in TaskManager(file=manager.file).tasks]
+
+
+def churn_shards(directory: str, count: int) -> None:
+    """Создает и удаляет шард категории count раз"""
+    manager = TaskManager(file=directory)
+    for _ in range(count):
+        manager.add_task(Task(
+            title="temporary", description="", category="Temporary",
+            due_date=date(2124, 1, 1), priority=Priority.low
+        ))
+        manager.delete_task_by_category("Temporary")
+
+
+def add_and_change(file: str, worker: int, count: int, options: dict) -> None:
+    manager = TaskManager(file=file, **options)
+    for i in range(count):
+        manager.add_task(new_task(f"{worker}-{i}"))
+        # Каждый процесс меняет у общих задач свое поле
+        if worker == 0:
+            manager.change_task(1 + i % 3, title=f"title {i}")
+        elif worker == 1:
+            manager.change_task(1 + i % 3, description=f"description {i}")
+        else:
+            manager.change_task(1 + i % 3, category=f"category {worker}")
+
+
+class TestConcurrentAccess:
+
+    @pytest.mark.parametrize("name, options", [
+        ("shared.json", {}),
+        ("shared.jsonl", {}),
+        ("shared.sqlite3", {}),
+        # Журнал уплотняется в фоне почти после каждого изменения
+        ("shared.json", {"backend": "journal", "compact_threshold": 256}),
+    ], ids=["json", "jsonl", "sqlite", "journal"])
+    def test_processes_do_not_lose_updates(self, database, tmp_path, name, options):
+        """Изменения нескольких процессов в одном файле не теряются"""
+
+        file = str(tmp_path / name)
+        migrate(database, file)
+        with multiprocessing.Pool(4) as pool:
+            pool.starmap(add_and_change, [(file, worker, 20, options) for worker in range(4)])
+
+        tasks = {task['id']: task for task in TaskManager(file=file, **options).tasks}
+        assert list(range(1, 84)) == sorted(tasks)
+        assert {f"{worker}-{i}" for worker in range(4) for i in range(20)} == {
+            tasks[task_id]['title'] for task_id in range(4, 84)
+        }
+        for task_id in (1, 2, 3):
+            assert tasks[task_id]['title'].startswith("title")
+            assert tasks[task_id]['description'].startswith("description")
+
+    def test_optimistic_versions(self, database):
+        """Изменение по устаревшей версии задачи отклоняется"""
+
+        first = TaskManager(file=database)
+        second = TaskManager(file=database)
+        version = first.task_version(1)
+        first.tasks
+
+        second.change_task(1, description="second")
+        with pytest.raises(ConflictError):
+            first.change_task(1, version=version, title="first")
+        assert version != first.task_version(1)
+
+        first.change_task(1, version=first.task_version(1), title="first")
+        task = TaskManager(file=database).get_task_from_id(1)
+        assert ("first", "second") == (task.title, task.description)
+
+    def test_optimistic_versions_in_batch(self, database):
+        """Изменение по версии в пакете отклоняется, если задачу
+        изменили до сохранения пакета"""
+
+        manager = TaskManager(file=database)
+        version = manager.task_version(1)
+        with pytest.raises(ConflictError):
+            with manager.batch():
+                manager.patch(1, version=version, title="first")
+                TaskManager(file=database).change_task(1, description="second")
+
+        task = TaskManager(file=database).get_task_from_id(1)
+        assert ("Task 1", "second") == (task.title, task.description)
+
+    def test_failed_batch_not_saved(self, database):
+        """Пакет, который не удалось наложить на чужие изменения, отменяется
+        целиком: следующая запись не сохраняет его изменения"""
+
+        manager = TaskManager(file=database)
+        with pytest.raises(ValueError):
+            with manager.batch():
+                manager.add_task(new_task("phantom-add"))
+                manager.patch(1, title="PHANTOM")
+                manager.patch(2, title="changed")
+                TaskManager(file=database).delete_task_by_id(2)
+
+        manager.add_task(new_task("real"))
+        tasks = TaskManager(file=database).tasks
+        assert ["Task 1", "Task 3", "real"] == [task['title'] for task in tasks]
+
+    def test_atomic_write(self, database, monkeypatch):
+        """Сбой во время записи не повреждает файл базы данных"""
+
+        manager = TaskManager(file=database)
+        before = read_json(database)
+
+        def fail(*args, **kwargs):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(os, "fsync", fail)
+        with pytest.raises(OSError):
+            manager.change_task(1, title="changed")
+        monkeypatch.undo()
+        assert before == read_json(database)
+        assert before == manager.tasks
+
+
+class TestStreamingRewrite:
+
+    budget = 2 * 1024 * 1024
+
+    @pytest.fixture
+    def large_database(self, tmp_path):
+        """База данных, которая в несколько раз больше бюджета памяти"""
+
+        file = str(tmp_path / "tasks.json")
+        write_json_tasks(file, (
+            {
+                "id": task_id, "title": f"Задача {task_id}", "description": "описание " * 10,
+                "category": f"Категория {task_id % 10}", "due_date": "2124-01-01",
+                "status": "не выполнена", "priority": "высокий"
+            }
+            for task_id in range(1, 12001)
+        ))
+        assert os.path.getsize(file) > 2 * self.budget
+        return file
+
+    def test_peak_memory(self, large_database):
+        """Уплотнение и удаление категории незагруженной базы данных
+        перезаписывают файл потоково: пиковая память меньше бюджета"""
+
+        TaskManager(file=large_database).patch(5, title="changed")
+        tracemalloc.start()
+        try:
+            TaskManager(file=large_database).compact()
+            assert not os.path.exists(f"{large_database}.tombstones")
+            assert 1200 == TaskManager(file=large_database).delete_task_by_category("Категория 3")
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak < self.budget
+
+        tasks = list(iter_json_array(large_database))
+        assert 10800 == len(tasks)
+        assert not any(task['category'] == "Категория 3" for task in tasks)
+        assert "changed" == tasks[3]['title']
+        assert not os.path.exists(f"{large_database}.tmp")
+        assert 12001 == TaskManager(file=large_database).get_new_id()
+
+    def test_same_format(self, database):
+        """Потоковая перезапись пишет файл в том же виде, что json.dump"""
+
+        manager = TaskManager(file=database)
+        tasks = [task for task in read_json(database) if task['category'] != "Work"]
+        assert 2 == manager.delete_task_by_category("Work")
+        with open(database, "r", encoding="utf-8") as json_file:
+            assert json.dumps(tasks, ensure_ascii=False, indent=4) == json_file.read()
+        assert 0 == TaskManager(file=database).delete_task_by_category("Work")